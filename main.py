@@ -1,24 +1,99 @@
+import argparse
+import functools
+import json
 import os
 import shutil
+import sys
+import tempfile
 import time
 from collections import Counter
-import gc
 import numpy as np
-import random
-
-import pandas as pd
-from matplotlib import pyplot as plt
-
-from server.server import plot_server_load_distribution
-from server.user_db import get_user_position
-from server.user_simulation import UserSimulation, calculate_response_time_std
-from server.server_initialization import initialize_servers, generate_positions, generate_adaptive_hexagonal_grid
-from server.user_initialization import initialize_users, generate_user_requests_zipf, generate_zipf_distribution, \
-    generate_user_requests
-from server.file_operations import create_fixed_files, configure_servers_without_files
-from server.plotting import plot_positions
-from modules.distance_round_robin import DistanceRoundRobinScheduler
-from modules.nearest_server import NearestServerScheduler
+
+from server.latency import LatencyModel
+from server.adaptive_sweep import adaptive_server_counts
+from server.analytical import estimate_cell, policy_model
+from server.plot_worker import PlotWorker
+from server.prefetch import PopularityPrefetcher
+from server.replication import run_replications
+from server.results_store import ResultsStore, build_cell_record, cell_variant
+from server.rng import RandomStreams
+from server.user_simulation import UserSimulation
+from server.metrics import MetricsExporter
+from server.snapshot import load_snapshot, save_snapshot
+from server.topology import IncrementalCluster
+from server.workload import StreamingWorkload
+from server.timing import PhaseTimer, phase, profile_call, profile_method
+from server.work_queue import WorkQueue, default_worker_id, run_worker
+from server.server_initialization import initialize_servers, generate_positions, attach_regions, attach_origins, \
+    attach_peers, enable_content_serving
+from server.user_initialization import initialize_users, generate_user_requests_zipf
+
+# 默认扫描参数，可被配置文件和命令行参数覆盖
+DEFAULT_CONFIG = {
+    'num_users': 35000,
+    'num_requests_per_user': 5,
+    'max_files_per_server': 20,
+    'cache_strategies': ['ARC', 'LFU', 'FIFO'],
+    'scheduler_types': ['distance_round_robin'],
+    'min_servers': 6,
+    'max_servers': 64,
+    'seeds': [None],
+    'headless': False,
+    'output_dir': 'results',
+    'results_file': None,
+    'replicate': False,
+    'min_replications': 3,
+    'max_replications': 20,
+    'relative_precision': 0.05,
+    # 可选的区域（二级）缓存层，例如 [{"position": [250, 250], "cache_strategy": "LRU", "cache_size": 50}]
+    'regions': None,
+    # 可选的协作缓存，例如 {"radius": 300, "digest_interval": 500, "fp_rate": 0.01}
+    'peers': None,
+    # 请求到达速率（每秒请求数）；设置后仿真带时间，回源进行中的同一文件请求会并发
+    'arrival_rate': None,
+    # 为 True 时边缘节点合并并发的未命中（需要 arrival_rate）
+    'coalesce': None,
+    # 在线流行度跟踪与主动推送，例如 {"half_life": 1000, "interval": 200, "push_budget": 4194304}；
+    # 启用后不再用离线统计的 top_n_files 预热边缘节点
+    'prefetch': None,
+    # 考虑文件大小、链路带宽和排队的时延模型参数，例如 {"service_rate": 500, "bandwidth": {"edge": 6.25e6}}
+    'latency_model': None,
+    # 为 True 时服务器通过 mmap 零拷贝地提供 data_dir 中的真实文件内容，并统计每台服务器的吞吐量
+    'serve_content': None,
+    # 每个用户的预热请求数：每种缓存策略和服务器数量预热一次并保存快照，各调度器从同一预热状态开始测量
+    'warmup': None,
+    # 多个地理分布的源站，例如 {"positions": [[-400, -400], [400, 400]], "replicas": 1}：第一个位置为主源站，
+    # 文件目录分片到各源站（replicas > 1 时每个文件保存 replicas 份），未命中从最近的保存了该文件的源站获取
+    'origins': None,
+    # 随时间变化的流式工作负载，替代按用户预先生成的请求序列，例如
+    # {"rate": 200, "diurnal_amplitude": 0.5, "diurnal_period": 60, "churn_interval": 10,
+    #  "flash_crowds": [{"file": "fixed_file_50.txt", "start": 20, "duration": 5, "rate": 400,
+    #                    "center": [0, 0], "radius": 200}]}
+    'workload': None,
+    # 需要用 cProfile 分析的服务器数量，例如 [16, 64]；profile_target 为 cell 或 send_request
+    'profile_servers': None,
+    'profile_target': 'cell',
+    # 实时指标：Prometheus 文本文件路径和/或 localhost 端口，以及两次发布之间的最短间隔（秒）
+    'metrics_file': None,
+    'metrics_port': None,
+    'metrics_interval': 5.0,
+    # 为 True 时在各服务器数量之间复用源站、文件和边缘节点，只增量更新用户的最近服务器
+    'incremental': False,
+    # 为 True 时对有近似模型的缓存策略给出解析估计（Che 近似），与仿真结果一起打印并叠加到可扩展性图上
+    'analytical': False,
+    # 为 True 时自适应选择服务器数量：先取 adaptive_points 个粗粒度的值，只在曲线弯曲或策略相交处加密
+    'adaptive': False,
+    'adaptive_points': 5,
+    'adaptive_tolerance': 0.03,
+    # 多主机执行：共享路径上的任务队列文件；worker 为 True 时作为 worker 领取任务，否则作为驱动进程
+    'queue': None,
+    'worker': False,
+    'lease_seconds': 600.0,
+}
+
+# 改变仿真拓扑或行为的可选参数，非 None 时写入结果键的 variant 列
+SIMULATION_OPTIONS = ('regions', 'peers', 'arrival_rate', 'coalesce', 'prefetch', 'latency_model',
+                      'serve_content', 'warmup', 'workload', 'origins')
 
 def get_top_n_files(user_requests, n=20):
     """
@@ -35,331 +110,6 @@ def get_top_n_files(user_requests, n=20):
 
     return top_n_files
 
-def plot_server_request_distribution(servers, output_dir, filename="server_request_distribution.png"):
-    """
-    绘制每个服务器的请求分布图，并保存到指定的文件夹中
-    :param servers: 服务器对象列表
-    :param output_dir: 保存图表的文件夹路径
-    :param filename: 保存图表的文件名
-    """
-    # for i, server in enumerate(servers):
-    #     print(f"Server {i + 1} has {server.request_count} requests.")
-
-    # 创建子文件夹用于保存负载分布图表
-    server_distribution_dir = os.path.join(output_dir, "server_load_distribution")
-    os.makedirs(server_distribution_dir, exist_ok=True)
-
-    server_ids = [f"Server {i+1}" for i in range(len(servers))]
-    request_counts = [server.request_count for server in servers]
-
-    plt.figure(figsize=(12, 6))
-    plt.bar(server_ids, request_counts, color='skyblue')
-    plt.xlabel('Servers')
-    plt.ylabel('Number of Requests')
-    plt.title('Server Request Distribution')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-
-    # 保存图表到指定文件夹
-    save_path = os.path.join(server_distribution_dir, filename)
-    plt.savefig(save_path)
-    plt.close()
-
-def plot_scalability_analysis(results, filename="scalability_analysis.png"):
-    """
-    绘制服务器数量与平均响应时间和标准差的关系图。
-
-    :param results: 包含每个服务器数量对应的总响应时间和标准差的列表
-    :param filename: 保存图表的文件名
-    """
-    num_servers_list = [r[0] for r in results]
-    average_response_times = [r[1] * 1000 / (r[3]) for r in results]  # r[3] 是总请求数
-    response_time_stds = [r[2] for r in results]
-
-    fig, ax1 = plt.subplots()
-
-    color = 'tab:blue'
-    ax1.set_xlabel('Number of Servers')
-    ax1.set_ylabel('Average Response Time (ms)', color=color)
-    ax1.plot(num_servers_list, average_response_times, 'o-', color=color, label='Avg Response Time')
-    ax1.tick_params(axis='y', labelcolor=color)
-
-    # Manually adjust the y-axis limits if needed
-    ax1.set_ylim([min(average_response_times) - 10, max(average_response_times) + 10])
-
-    ax2 = ax1.twinx()
-    color = 'tab:orange'
-    ax2.set_ylabel('Standard Deviation (s)', color=color)
-    ax2.plot(num_servers_list, response_time_stds, 'o--', color=color, label='Std Dev')
-    ax2.tick_params(axis='y', labelcolor=color)
-
-    # Ensure the right y-axis is in a comparable range
-    ax2.set_ylim([min(response_time_stds) - 0.01, max(response_time_stds) + 0.01])
-
-    fig.tight_layout(rect=[0, 0, 1, 0.95])  # Adjust the layout to make space for the title
-    plt.title('Scalability Analysis: Servers vs Response Time')
-    fig.legend(loc="upper left", bbox_to_anchor=(0.1, 0.9))
-    plt.subplots_adjust(top=0.9)  # Manually adjust the top space to fit the title
-    plt.savefig(filename)
-    plt.close()
-
-def plot_rectangular_response_time(num_servers_list, average_response_time_list, std_dev_list, filename):
-    """绘制仅当节点排列为矩形时的平均响应时间和标准差"""
-    fig, ax1 = plt.subplots()
-
-    color = 'tab:blue'
-    ax1.set_xlabel('Number of Servers')
-    ax1.set_ylabel('Average Response Time (ms)', color=color)
-    ax1.plot(num_servers_list, average_response_time_list, color=color, label='Avg Response Time', marker='o')
-    ax1.tick_params(axis='y', labelcolor=color)
-
-    # Manually adjust the y-axis limits if needed
-    ax1.set_ylim([min(average_response_time_list) - 10, max(average_response_time_list) + 10])
-
-    ax2 = ax1.twinx()
-    color = 'tab:orange'
-    ax2.set_ylabel('Standard Deviation (s)', color=color)
-    ax2.plot(num_servers_list, std_dev_list, color=color, linestyle='--', label='Std Dev', marker='o')
-    ax2.tick_params(axis='y', labelcolor=color)
-
-    # Ensure the right y-axis is in a comparable range
-    ax2.set_ylim([min(std_dev_list) - 0.01, max(std_dev_list) + 0.01])
-
-    fig.tight_layout(rect=[0, 0, 1, 0.95])  # Adjust layout to not cut off title
-    plt.title('Rectangular Grid - Average Response Time & Std Dev')
-    fig.legend(loc="upper left", bbox_to_anchor=(0.1, 0.9))
-    plt.savefig(filename)
-    plt.close()
-
-
-#
-# def plot_hexagonal_response_time(num_servers_list, average_response_time_list, std_dev_list, filename):
-#     """绘制完整六边形网格布局的平均响应时间和标准差"""
-#     # 完整六边形的服务器数量
-#     valid_num_servers = {6, 18, 36, 60}
-#
-#     # 筛选出有效的服务器数量对应的数据
-#     filtered_servers = [num for num in num_servers_list if num in valid_num_servers]
-#     filtered_avg_time = [average_response_time_list[i] for i, num in enumerate(num_servers_list) if num in valid_num_servers]
-#     filtered_std_dev = [std_dev_list[i] for i, num in enumerate(num_servers_list) if num in valid_num_servers]
-#
-#     fig, ax1 = plt.subplots()
-#
-#     color = 'tab:blue'
-#     ax1.set_xlabel('Number of Servers')
-#     ax1.set_ylabel('Average Response Time (ms)', color=color)
-#     ax1.plot(filtered_servers, filtered_avg_time, 'o-', color=color, label='Avg Response Time')
-#     ax1.tick_params(axis='y', labelcolor=color)
-#
-#     ax2 = ax1.twinx()
-#     color = 'tab:orange'
-#     ax2.set_ylabel('Standard Deviation (s)', color=color)
-#     ax2.plot(filtered_servers, filtered_std_dev, 'o--', color=color, label='Std Dev')
-#     ax2.tick_params(axis='y', labelcolor=color)
-#
-#     fig.tight_layout()
-#     fig.legend(loc='upper right', bbox_to_anchor=(1, 1), bbox_transform=ax1.transAxes)
-#     plt.title('Hexagonal Grid - Average Response Time & Std Dev')
-#     plt.savefig(filename)
-#     plt.close()
-
-
-def plot_ribbon_graph(num_servers_list, strategies_data, scheduler_type):
-    """
-    绘制四张图，分别显示不同调度器下缓存策略的平均时间对比和标准差对比。
-
-    :param num_servers_list: 服务器数量列表
-    :param strategies_data: 缓存策略数据字典，包含平均时间和标准差
-    :param scheduler_type: 调度器类型
-    """
-
-    # 绘制平均响应时间对比图
-    plt.figure(figsize=(12, 8))
-    for strategy_name, (avg_times, _) in strategies_data.items():
-        plt.plot(num_servers_list, avg_times, label=strategy_name)
-    plt.xlabel('Number of Servers')
-    plt.ylabel('Average Response Time (ms)')
-    plt.title(f'Average Response Time Comparison under {scheduler_type} Scheduler')
-    plt.legend(loc='upper left')
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f'{scheduler_type}_avg_response_time_comparison.png')
-    plt.close()
-
-    # 绘制标准差对比图
-    plt.figure(figsize=(12, 8))
-    for strategy_name, (_, std_devs) in strategies_data.items():
-        plt.plot(num_servers_list, std_devs, label=strategy_name)
-    plt.xlabel('Number of Servers')
-    plt.ylabel('Standard Deviation (s)')
-    plt.title(f'Standard Deviation Comparison under {scheduler_type} Scheduler')
-    plt.legend(loc='upper left')
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f'{scheduler_type}_std_dev_comparison.png')
-    plt.close()
-
-
-def verify_zipf_distribution(user_requests, fixed_request_list, zipf_s, filename="files_distribution.png"):
-    """
-    验证用户请求的文件是否遵循Zipf分布。
-
-    :param user_requests: 用户请求的计数字典，键是文件名，值是请求次数或请求列表
-    :param fixed_request_list: 所有可请求的文件列表
-    :param zipf_s: Zipf分布的参数
-    :param filename: 保存图表的文件名
-    """
-    actual_file_counts = Counter()
-
-    # 如果 user_requests 的值是列表，首先将列表转换为次数
-    for key, value in user_requests.items():
-        if isinstance(value, list):
-            actual_file_counts[key] = len(value)  # 使用列表的长度作为计数
-        elif isinstance(value, int):
-            actual_file_counts[key] = value  # 如果已经是整数，直接使用
-
-    # 计算理想的Zipf分布
-    num_files = len(fixed_request_list)
-    ideal_weights = generate_zipf_distribution(num_files, s=zipf_s)
-    total_requests = sum(actual_file_counts.values())  # 计算请求总数
-    ideal_file_counts = ideal_weights * total_requests
-
-    # 绘制实际分布和理想分布的对比图
-    files = range(1, num_files + 1)
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(files, [actual_file_counts.get(file, 0) for file in fixed_request_list], 'o-', label='Actual Distribution')
-    plt.plot(files, ideal_file_counts, 'x--', label='Ideal Zipf Distribution')
-    plt.xlabel('File Rank')
-    plt.ylabel('Number of Requests')
-    plt.title('Comparison of Actual and Ideal Zipf Distribution')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.close()
-
-def plot_hit_rate(servers, num_servers, output_dir):
-    hit_rate_dir = os.path.join(output_dir, 'hit_rate')  # 子文件夹路径
-    os.makedirs(hit_rate_dir, exist_ok=True)
-    small_server_hit_rates = []
-
-    # 计算每个服务器的小服务器命中率
-    for server in servers:
-        if server.request_count > 0:  # 避免除以零
-            small_server_hit_rate = (server.request_small_count / server.request_count) * 100
-        else:
-            small_server_hit_rate = 0.0
-        small_server_hit_rates.append(small_server_hit_rate)
-
-    # 生成图表
-    plt.figure(figsize=(12, 6))
-    plt.bar([f"Server {i + 1}" for i in range(len(servers))], small_server_hit_rates, color='green')
-    plt.xlabel('Servers')
-    plt.ylabel('Hit Rate (%)')
-    plt.title(f'Small Server Hit Rate Distribution for {num_servers} Servers')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-
-    hit_rate_filename = os.path.join(hit_rate_dir, f"small_server_hit_rate_{num_servers}_servers.png")
-    plt.savefig(hit_rate_filename)  # 保存图表
-    plt.close()
-
-# def plot_rectangular_ribbon_graph(num_servers_list, strategies_data, filename):
-#     plt.figure(figsize=(12, 8))
-#
-#     for strategy_name, (avg_times, _) in strategies_data.items():
-#         # 使用 num_servers_list 过滤 avg_times 以匹配长度
-#         filtered_avg_times = [avg_times[num_servers_list.index(ns)] for ns in num_servers_list if ns in num_servers_list]
-#
-#         if len(num_servers_list) != len(filtered_avg_times):
-#             print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_avg_times)}. Skipping plot.")
-#             continue
-#
-#         plt.plot(num_servers_list, filtered_avg_times, label=strategy_name)
-#         plt.fill_between(num_servers_list, filtered_avg_times, alpha=0.2)
-#
-#     plt.xlabel('Number of Servers')
-#     plt.ylabel('Average Response Time (ms)')
-#     plt.title('Rectangular Grid - Average Response Time Comparison')
-#     plt.legend(loc='upper left')
-#     plt.grid(True)
-#     plt.tight_layout()
-#     plt.savefig(filename)
-#     plt.close()
-#
-# def plot_rectangular_std_ribbon_graph(num_servers_list, strategies_data, filename):
-#     plt.figure(figsize=(12, 8))
-#
-#     for strategy_name, (_, std_devs) in strategies_data.items():
-#         # 使用 num_servers_list 过滤 std_devs 以匹配长度
-#         filtered_std_devs = [std_devs[num_servers_list.index(ns)] for ns in num_servers_list if ns in num_servers_list]
-#
-#         if len(num_servers_list) != len(filtered_std_devs):
-#             print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_std_devs)}. Skipping plot.")
-#             continue
-#
-#         plt.plot(num_servers_list, filtered_std_devs, label=strategy_name)
-#         plt.fill_between(num_servers_list, filtered_std_devs, alpha=0.2)
-#
-#     plt.xlabel('Number of Servers')
-#     plt.ylabel('Standard Deviation (s)')
-#     plt.title('Rectangular Grid - Standard Deviation Comparison')
-#     plt.legend(loc='upper left')
-#     plt.grid(True)
-#     plt.tight_layout()
-#     plt.savefig(filename)
-#     plt.close()
-
-def filter_valid_data(num_servers_list, data):
-    # 过滤出与 num_servers_list 长度一致的数据
-    return [data[i] for i in range(len(data)) if i < len(num_servers_list)]
-
-def plot_rectangular_ribbon_graph(num_servers_list, strategies_data, filename):
-    plt.figure(figsize=(12, 8))
-
-    for strategy_name, (avg_times, _) in strategies_data.items():
-        # 过滤出有效的数据点
-        filtered_avg_times = filter_valid_data(num_servers_list, avg_times)
-
-        if len(num_servers_list) != len(filtered_avg_times):
-            print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_avg_times)}. Skipping plot.")
-            continue
-
-        plt.plot(num_servers_list, filtered_avg_times, label=strategy_name)
-
-    plt.xlabel('Number of Servers')
-    plt.ylabel('Average Response Time (ms)')
-    plt.title('Rectangular Grid - Average Response Time Comparison')
-    plt.legend(loc='upper left')
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.close()
-
-def plot_rectangular_std_ribbon_graph(num_servers_list, strategies_data, filename):
-    plt.figure(figsize=(12, 8))
-
-    for strategy_name, (_, std_devs) in strategies_data.items():
-        # 过滤出有效的数据点
-        filtered_std_devs = filter_valid_data(num_servers_list, std_devs)
-
-        if len(num_servers_list) != len(filtered_std_devs):
-            print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_std_devs)}. Skipping plot.")
-            continue
-
-        plt.plot(num_servers_list, filtered_std_devs, label=strategy_name)
-
-    plt.xlabel('Number of Servers')
-    plt.ylabel('Standard Deviation (s)')
-    plt.title('Rectangular Grid - Standard Deviation Comparison')
-    plt.legend(loc='upper left')
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.close()
-
-
 def reset_server_state(servers):
     """重置所有服务器的状态"""
     for server in servers:
@@ -367,32 +117,315 @@ def reset_server_state(servers):
         server.active_connections = 0
         # 你可以在这里添加更多的状态重置逻辑，例如缓存清空
 
-def main_multi_file_request(num_requests_per_user, num_users, max_files_per_server, cache_strategies, scheduler_types):
+def prepare_workload(user_db_path, num_users, num_requests_per_user, streams=None):
+    """生成用户位置和请求序列；streams 为 RandomStreams 时结果只由种子决定"""
+    fixed_users, user_positions = initialize_users(user_db_path, num_users, grid_size=1000,
+                                                   rng=streams.python('user_positions') if streams else None)
+
+    fixed_request_list = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+
+    user_requests = generate_user_requests_zipf(fixed_request_list, num_users, num_requests_per_user, zipf_s=1.0,
+                                                rng=streams.numpy('user_requests') if streams else None)
+    # user_requests = generate_user_requests(fixed_request_list, num_users, num_requests_per_user)
+    return fixed_users, user_positions, fixed_request_list, user_requests
+
+def run_cell(data_dir, num_servers, cache_strategy, scheduler_type, user_requests, fixed_request_list, user_db_path,
+             max_files_per_server, num_requests_per_user, streams=None, options=None, timer=None,
+             profile_path=None, metrics=None, cluster=None, warmup=None):
+    """
+    运行一个仿真单元（缓存策略 × 调度器 × 服务器数量），返回结果记录和仿真中用到的对象
+
+    :param options: 可选仿真参数（见 SIMULATION_OPTIONS），例如 {'regions': [...]}
+    :param timer: PhaseTimer，记录准备、创建文件、初始化服务器、仿真和汇总各阶段的耗时
+    :param profile_path: 不为 None 时只对 send_request 热路径开启 cProfile，并把结果写到该路径
+    :param metrics: MetricsExporter，仿真过程中发布实时指标
+    :param cluster: IncrementalCluster，不为 None 时复用其中的源站、文件和边缘节点，而不是重新创建
+    :param warmup: (预热请求, 快照路径)：快照不存在时先预热并保存，之后从快照恢复预热状态再开始测量
+    """
+    options = options or {}
+    cell_start = time.perf_counter()
+
+    with phase(timer, 'setup'):
+        if cluster is None:
+            if os.path.exists(data_dir):
+                shutil.rmtree(data_dir)
+            os.makedirs(data_dir, exist_ok=True)
+
+        server_positions = generate_positions(num_servers, grid_range=500)
+
+        # 离线统计的热门文件只在不使用在线推送时用于预热
+        top_n_files = [] if options.get('prefetch') is not None else get_top_n_files(user_requests, n=20)
+
+    with phase(timer, 'server_init'):
+        main_server, servers, user_simulation = _build_cell(
+            data_dir, num_servers, cache_strategy, scheduler_type, user_requests, fixed_request_list, user_db_path,
+            max_files_per_server, server_positions, top_n_files, streams, options, timer, metrics, cluster)
+
+    if warmup is not None:
+        with phase(timer, 'warmup'):
+            warm_start(main_server, servers, user_simulation, fixed_request_list, user_db_path, options, *warmup)
+
+    if options.get('workload') is not None:
+        workload = make_workload(fixed_request_list, user_simulation, options, streams)
+        num_requests = len(user_requests) * num_requests_per_user
+        simulate = functools.partial(user_simulation.simulate_stream, workload, num_requests)
+    else:
+        simulate = functools.partial(user_simulation.simulate_requests, num_requests_per_user)
+    with phase(timer, 'simulation'):
+        if profile_path is not None:
+            with profile_method(user_simulation, 'send_request', profile_path):
+                simulate()
+        else:
+            simulate()
+
+    with phase(timer, 'record'):
+        record = build_cell_record(user_simulation, servers, time.perf_counter() - cell_start, main_server.origins)
+        if cluster is not None:
+            record['topology_reused_servers'] = cluster.topology.reused_servers
+            record['topology_reassigned_users'] = cluster.topology.reassigned_users
+    return record, user_simulation, main_server, servers, server_positions
+
+def make_workload(fixed_request_list, user_simulation, options, streams=None):
+    """按 options['workload'] 创建 StreamingWorkload；未指定 rate 时使用 arrival_rate"""
+    params = dict(options['workload'])
+    if options.get('arrival_rate'):
+        params.setdefault('rate', options['arrival_rate'])
+    user_positions = [user_simulation.user_positions[f'user_{i + 1}']
+                      for i in range(len(user_simulation.user_positions))]
+    return StreamingWorkload(fixed_request_list, user_positions, rng=streams.numpy('workload') if streams else None,
+                             **params)
+
+def _build_cell(data_dir, num_servers, cache_strategy, scheduler_type, user_requests, fixed_request_list, user_db_path,
+                max_files_per_server, server_positions, top_n_files, streams, options, timer, metrics=None, cluster=None):
+    """创建一个仿真单元的服务器、可选组件和 UserSimulation"""
+    if cluster is not None:
+        main_server, servers = cluster.resize(server_positions, cache_strategy, top_n_files)
+    else:
+        main_server, servers = initialize_servers(data_dir, num_servers, server_positions, main_server_position=(0, 0),
+                                                  cache_size=max_files_per_server, cache_strategy_class=cache_strategy,
+                                                  top_n_files=top_n_files, streams=streams, timer=timer)
+    if options.get('regions'):
+        attach_regions(data_dir, servers, main_server, options['regions'], streams)
+    if options.get('origins'):
+        attach_origins(data_dir, servers, main_server, **options['origins'])
+    if options.get('peers'):
+        attach_peers(servers, **options['peers'])
+    for server in servers:
+        server.coalesce = bool(options.get('coalesce'))
+    if options.get('serve_content'):
+        enable_content_serving(servers + main_server.region_servers + (main_server.origins or [main_server]))
+    prefetcher = None
+    if options.get('prefetch') is not None:
+        prefetcher = PopularityPrefetcher(servers, main_server.catalog, **options['prefetch'])
+    latency_model = None
+    if options.get('latency_model') is not None:
+        latency_model = LatencyModel(main_server.catalog, **options['latency_model'])
+
+    reset_server_state(servers)
+
+    # 将调度器传递给 UserSimulation
+    user_simulation = UserSimulation(servers, fixed_request_list, user_db_path, request_interval=0.5,
+                                     scheduler=scheduler_type, user_requests=user_requests,
+                                     rng=streams.python('scheduler') if streams else None,
+                                     arrival_rate=options.get('arrival_rate'), prefetcher=prefetcher,
+                                     latency_model=latency_model, metrics=metrics,
+                                     user_positions=cluster.user_index if cluster is not None else None)
+    if cluster is not None and scheduler_type == 'nearest':
+        # 最近服务器由 Topology 批量增量计算，调度时直接查表
+        user_simulation.scheduler.assignment = cluster.assignment()
+    return main_server, servers, user_simulation
+
+def warm_start(main_server, servers, user_simulation, fixed_request_list, user_db_path, options, warmup_requests,
+               snapshot_path):
+    """
+    从预热快照开始测量。同一缓存策略和服务器数量只预热一次（固定用 nearest 调度器），
+    其余调度器从同一个快照分出，因此各调度器的测量阶段起点完全相同。
+    """
+    if not os.path.exists(snapshot_path):
+        warm_simulation = UserSimulation(servers, fixed_request_list, user_db_path, request_interval=0.5,
+                                         scheduler='nearest', user_requests=warmup_requests,
+                                         arrival_rate=options.get('arrival_rate'),
+                                         user_positions=user_simulation.user_positions)
+        warm_simulation.simulate_requests(len(next(iter(warmup_requests.values()), [])))
+        save_snapshot(snapshot_path, main_server, servers, warm_simulation)
+    user_simulation.start_time = load_snapshot(snapshot_path, main_server, servers)
+    for server in (main_server.origins or [main_server]) + main_server.region_servers + servers:
+        server.reset_counters()
+
+def release_cell(data_dir, main_server, servers, timer=None):
+    """关闭一个仿真单元的数据库连接并删除其数据目录"""
+    with phase(timer, 'teardown'):
+        # 在删除文件夹前，确保关闭所有连接
+        for server in servers:
+            server.close()
+        for region_server in main_server.region_servers:
+            region_server.close()
+        for origin in main_server.origins or [main_server]:
+            origin.close()
+
+        time.sleep(0.2)  # 等待，确保所有文件锁被释放
+
+        if os.path.exists(data_dir):
+            shutil.rmtree(data_dir)
+
+def main_multi_file_request(num_requests_per_user, num_users, max_files_per_server, cache_strategies, scheduler_types,
+                            server_counts=range(6, 65), seed=None, headless=False, output_root='results',
+                            results_path=None, options=None, profile_servers=None, profile_target='cell',
+                            metrics=None, incremental=False, analytical=False, adaptive=False, adaptive_points=5,
+                            adaptive_tolerance=0.03):
+    """
+    对每种缓存策略、调度器和服务器数量运行一次仿真。
+
+    :param server_counts: 需要仿真的服务器数量
+    :param seed: 随机种子，None 表示不设置
+    :param headless: 为 True 时不绘制任何图表，也不导入 matplotlib
+    :param output_root: 结果输出目录
+    :param results_path: 结果文件路径，默认为 output_root/results.sqlite；已存在的单元会被跳过
+    :param options: 可选仿真参数（见 SIMULATION_OPTIONS）
+    :param profile_servers: 需要用 cProfile 分析的服务器数量，结果写到各单元输出目录下的 profile_<服务器数>.prof
+    :param profile_target: 'cell' 分析整个仿真单元，'send_request' 只分析请求处理热路径
+    :param metrics: MetricsExporter，不为 None 时在仿真过程中持续发布每台服务器的实时指标
+    :param incremental: 为 True 时在各单元之间复用源站、文件、用户索引和边缘节点，最近服务器增量更新
+    :param analytical: 为 True 时用 server/analytical.py 估计每个单元的命中率和平均响应时间；估计按最近服务器
+        路由计算，因此只用于 nearest 调度器的单元，其他调度器的路由表不同，不给出估计
+    :param adaptive: 为 True 时不仿真 server_counts 中的每个值：先在两端之间取 adaptive_points 个服务器数量，
+        之后只在平均响应时间或命中率曲线弯曲（相对偏差超过 adaptive_tolerance）或策略曲线相交的区间加密
+    """
     start_time = time.time()
+    sweep_timer = PhaseTimer()
     # configure_gc()  # 配置垃圾回收
 
+    # 指定种子时每个随机组件使用独立的随机数流，所有缓存策略共享同一份用户和请求（公共随机数）
+    streams = RandomStreams(seed) if seed is not None else None
+
+    # 图表在后台进程中渲染，仿真循环只提交结果记录
+    plot_worker = None if headless else PlotWorker()
+
     data_dir = 'data'
     if os.path.exists(data_dir):
         shutil.rmtree(data_dir)
     os.makedirs(data_dir, exist_ok=True)
 
     user_db_path = 'user_data.db'
-    fixed_users, user_positions = initialize_users(user_db_path, num_users, grid_size=1000)
-
-    fixed_request_list = [f'fixed_file_{i}.txt' for i in range(1, 101)]
-
-    user_requests = generate_user_requests_zipf(fixed_request_list, num_users, num_requests_per_user, zipf_s=1.0)
-    # user_requests = generate_user_requests(fixed_request_list, num_users, num_requests_per_user)
+    with sweep_timer.phase('workload'):
+        fixed_users, user_positions, fixed_request_list, user_requests = prepare_workload(
+            user_db_path, num_users, num_requests_per_user, streams)
+
+    warmup_requests = None
+    snapshot_dir = os.path.join(output_root, 'snapshots')
+    if options and options.get('warmup'):
+        # 预热请求与测量请求来自不同的随机数流
+        warmup_requests = generate_user_requests_zipf(fixed_request_list, num_users, options['warmup'], zipf_s=1.0,
+                                                      rng=streams.numpy('warmup') if streams else None)
+        if os.path.exists(snapshot_dir):
+            shutil.rmtree(snapshot_dir)
+        os.makedirs(snapshot_dir)
+
+    cluster = None
+    if incremental:
+        cluster = IncrementalCluster(data_dir, max_files_per_server, user_positions, streams, sweep_timer)
 
     avg_response_times = {}
     std_devs = {}
 
-    ribbon_graph_dir = os.path.join('results')
+    ribbon_graph_dir = output_root
     os.makedirs(ribbon_graph_dir, exist_ok=True)
 
-
-    output_dir = f'results'
-    output_dir1 = f'results'
+    store = ResultsStore(results_path or os.path.join(output_root, 'results.sqlite'))
+
+
+    cells = {}  # (布局, 缓存策略, 调度器, 服务器数量) -> (cell_key, record)，自适应采样阶段已运行的单元不再重复运行
+
+    def cell_record(layout_type, cache_strategy, scheduler_type, num_servers):
+        """运行（或从结果文件读取）一个单元，返回 (cell_key, record)"""
+        if (layout_type, cache_strategy, scheduler_type, num_servers) in cells:
+            return cells[layout_type, cache_strategy, scheduler_type, num_servers]
+        output_dir = os.path.join(output_root, layout_type, f'{cache_strategy}_{scheduler_type}')
+        os.makedirs(output_dir, exist_ok=True)
+        cell_key = {
+            'layout': layout_type, 'cache_strategy': cache_strategy, 'scheduler': scheduler_type,
+            'num_servers': num_servers, 'seed': seed, 'num_users': num_users,
+            'num_requests_per_user': num_requests_per_user, 'max_files_per_server': max_files_per_server,
+            'variant': cell_variant(options),
+        }
+        record = store.get_cell(cell_key)
+        if record is not None:
+            print(f"Layout: {layout_type}, Cache: {cache_strategy}, Scheduler: {scheduler_type}, "
+                  f"Servers: {num_servers} already in {store.path}, skipping.")
+        else:
+            cell_timer = PhaseTimer()
+            if metrics is not None:
+                metrics.start_cell({'cache_strategy': cache_strategy, 'scheduler': scheduler_type,
+                                    'num_servers': num_servers, 'seed': seed})
+            cell_args = (data_dir, num_servers, cache_strategy, scheduler_type, user_requests,
+                         fixed_request_list, user_db_path, max_files_per_server, num_requests_per_user,
+                         streams, options, cell_timer)
+            cell_kwargs = {'metrics': metrics, 'cluster': cluster}
+            if warmup_requests is not None:
+                cell_kwargs['warmup'] = (
+                    warmup_requests, os.path.join(snapshot_dir, f'{cache_strategy}_{num_servers}.snap'))
+            profile_path = (os.path.join(output_dir, f'profile_{num_servers}.prof')
+                            if profile_servers and num_servers in profile_servers else None)
+            if profile_path is None:
+                cell = run_cell(*cell_args, **cell_kwargs)
+            elif profile_target == 'send_request':
+                cell = run_cell(*cell_args, profile_path=profile_path, **cell_kwargs)
+            else:
+                cell = profile_call(profile_path, run_cell, *cell_args, **cell_kwargs)
+            record, user_simulation, main_server, servers, server_positions = cell
+
+            # 位置图、命中率、请求分布和 Zipf 对比图交给后台进程绘制
+            if plot_worker is not None:
+                with cell_timer.phase('plotting'):
+                    # 用户到服务器的连线直接取自仿真中记录的分配结果
+                    user_server_connections = [
+                        (user_positions[i], user_simulation.user_server_index[username])
+                        for i, username in enumerate(fixed_users)
+                        if username in user_simulation.user_server_index
+                    ]
+                    plot_worker.submit('render_cell_charts', {
+                        'num_servers': num_servers,
+                        'output_dir': output_dir,
+                        'user_positions': user_positions,
+                        'server_positions': server_positions[:num_servers],
+                        'user_server_connections': user_server_connections,
+                        'request_counts': record['server_request_counts'],
+                        'request_small_counts': record['server_small_counts'],
+                        'file_request_counts': dict(user_simulation.request_counts),
+                        'request_list': fixed_request_list,
+                        'zipf_s': 1.0,
+                    })
+
+            if cluster is None:
+                release_cell(data_dir, main_server, servers, cell_timer)
+            record['phase_s'] = cell_timer.as_dict()
+            store.append({**cell_key, **record})
+            sweep_timer.merge(cell_timer)
+            print(f"    phases: {cell_timer.report()}")
+            if profile_path is not None:
+                print(f"    profile written to {profile_path}")
+            if cluster is not None:
+                print(f"    topology: {record['topology_reused_servers']} servers kept their position, "
+                      f"{record['topology_reassigned_users']} users changed nearest server")
+        cells[layout_type, cache_strategy, scheduler_type, num_servers] = cell_key, record
+        return cell_key, record
+
+    if adaptive:
+        def evaluate(num_servers):
+            curves = {}
+            for cache_strategy in cache_strategies:
+                for scheduler_type in scheduler_types:
+                    _, record = cell_record('grid', cache_strategy, scheduler_type, num_servers)
+                    curves[cache_strategy, scheduler_type] = {'mean_response_ms': record['mean_response_ms'],
+                                                              'hit_rate': record['hit_rate']}
+            return curves
+
+        # 之后的汇总和图表只使用自适应采样得到的稀疏服务器数量
+        server_counts, _ = adaptive_server_counts(evaluate, min(server_counts), max(server_counts), adaptive_points,
+                                                  adaptive_tolerance)
+
+    output_dir = output_root
+    output_dir1 = output_root
 
     for layout_type in ['grid']:
         avg_response_times[layout_type] = {}
@@ -405,13 +438,15 @@ def main_multi_file_request(num_requests_per_user, num_users, max_files_per_serv
             rectangular_num_servers_list = []
             rectangular_average_response_time_list = []
             rectangular_std_dev_list = []
+            schedulers_data = {}
 
             for scheduler_type in scheduler_types:
+                scheduler_data = schedulers_data[scheduler_type] = {'avg_ms': [], 'p99_ms': [], 'load_cv': [], 'routed': []}
 
                 avg_response_times[layout_type][cache_strategy][scheduler_type] = []
                 std_devs[layout_type][cache_strategy][scheduler_type] = []
 
-                output_dir = f'results/{layout_type}/{cache_strategy}_{scheduler_type}'
+                output_dir = os.path.join(output_root, layout_type, f'{cache_strategy}_{scheduler_type}')
                 os.makedirs(output_dir, exist_ok=True)
                 position_dir = os.path.join(output_dir, 'position')
                 server_load_dir = os.path.join(output_dir, 'server_load')
@@ -424,57 +459,29 @@ def main_multi_file_request(num_requests_per_user, num_users, max_files_per_serv
 
 
                 results = []  # 初始化results列表
+                predicted = []  # 解析估计的 (服务器数量, 平均响应时间 ms)
 
                 hit_rates_data = []  # 初始化命中率数据列表
 
-                for num_servers in range(6, 65):  # 假设最多64个服务器节点
-
-                    if os.path.exists(data_dir):
-                        shutil.rmtree(data_dir)
-                    os.makedirs(data_dir, exist_ok=True)
-
-                    server_positions = generate_positions(num_servers, grid_range=500)
-
-                    top_n_files = get_top_n_files(user_requests, n=20)
-
-                    main_server, servers = initialize_servers(data_dir, num_servers, server_positions, main_server_position=(0, 0),
-                                                 cache_size=max_files_per_server, cache_strategy_class=cache_strategy, top_n_files=top_n_files)
-
-                    reset_server_state(servers)
-
-                    # print(f"Main Server: ({main_server.db_path}):")
-                    # main_server.list_files()
-                    # for idx, server in enumerate(servers):
-                    #     print(f"Server {idx + 1} ({server.db_path}):")
-                    #     server.list_files()
-
-                    # 将调度器传递给 UserSimulation
-                    user_simulation = UserSimulation(servers, fixed_request_list, user_db_path, request_interval=0.5,
-                                                     scheduler=scheduler_type, user_requests=user_requests)
+                for num_servers in server_counts:
+                    cell_key, record = cell_record(layout_type, cache_strategy, scheduler_type, num_servers)
 
-                    total_response_time, std_dev_response_time = user_simulation.simulate_requests(
-                        num_requests_per_user)
+                    total_response_time = record['total_response_time']
+                    std_dev_response_time = record['std_response_s']
                     average_response_time = total_response_time * 1000 / (num_requests_per_user * num_users)
 
-
-                    user_server_connections = []
-                    for username, requests in user_requests.items():
-                        user_pos = get_user_position(user_db_path, username)
-                        server = user_simulation.scheduler.get_next_server(user_pos)  # 获取用户连接的服务器
-                        server_index = servers.index(server)  # 获取服务器的索引
-                        user_server_connections.append((user_pos, server_index))
-
-                    plot_positions(user_positions, server_positions[:num_servers], user_server_connections,
-                                   filename=os.path.join(position_dir, f"positions_{num_servers}.png"))
-
-                    # 在 simulate_requests 结束时计算命中率并记录
-                    hit_rate = (user_simulation.total_hits / user_simulation.total_requests) * 100  # 命中率以百分比表示
-                    hit_rates_data.append((num_servers, hit_rate))
+                    # 命中率以百分比表示
+                    hit_rates_data.append((num_servers, record['hit_rate']))
 
                     all_num_servers_list.append(num_servers)
                     all_average_response_time_list.append(average_response_time)
                     all_std_dev_list.append(std_dev_response_time)
 
+                    scheduler_data['avg_ms'].append(average_response_time)
+                    scheduler_data['p99_ms'].append(record['p99_ms'])
+                    scheduler_data['load_cv'].append(record.get('load_cv') or 0.0)
+                    scheduler_data['routed'] = record['server_routed']
+
                     avg_response_times[layout_type][cache_strategy][scheduler_type].append(average_response_time)
                     std_devs[layout_type][cache_strategy][scheduler_type].append(std_dev_response_time)
 
@@ -484,13 +491,45 @@ def main_multi_file_request(num_requests_per_user, num_users, max_files_per_serv
                     print(
                         f"Layout: {layout_type}, Cache: {cache_strategy}, Scheduler: {scheduler_type}, Servers: {num_servers}, "
                         f"Avg response time: {average_response_time:.4f}ms, Std Dev: {std_dev_response_time:.4f}s.")
-
-                    # for i, server in enumerate(servers):
-                        # print(
-                        #     f"Server {i + 1}: request_count = {server.request_count}, request_small_count = {server.request_small_count}")
-
-                    # 调用 plot_hit_rate 函数
-                    plot_hit_rate(servers, num_servers, output_dir)
+                    if options and (options.get('regions') or options.get('peers')):
+                        tier_hits = record['tier_hits']
+                        print('    ' + ', '.join(
+                            f"{tier}: {tier_hits.get(tier, 0) / requests * 100:.1f}% hit, "
+                            f"{record['tier_latency_s'][tier] / requests * 1000:.1f}ms/hop"
+                            for tier, requests in record['tier_requests'].items()))
+                    if options and options.get('origins'):
+                        print('    origins: ' + ', '.join(
+                            f"{i + 1}: {requests} fetches, {latency * 1000:.1f}ms/fetch"
+                            for i, (requests, latency) in enumerate(zip(record['origin_request_counts'],
+                                                                        record['origin_avg_latency_s']))))
+                    if options and options.get('arrival_rate'):
+                        print(f"    origin fetches saved by coalescing: {record['coalesced_requests']}, "
+                              f"duplicate origin fetches: {record['duplicate_fetches']}")
+                    if options and options.get('serve_content'):
+                        print(f"    bytes served: {sum(record['server_bytes_served'])}, storage-path throughput per "
+                              f"server: {min(record['server_serve_mbps']):.0f}-{max(record['server_serve_mbps']):.0f} Mbit/s")
+                    if options and options.get('latency_model') is not None:
+                        print('    latency breakdown: ' + ', '.join(
+                            f'{part} {value:.1f}ms' for part, value in record['latency_breakdown_ms'].items()))
+                    if options and options.get('prefetch') is not None:
+                        baseline = store.get_cell({**cell_key, 'variant': cell_variant(
+                            {name: value for name, value in options.items() if name != 'prefetch'})})
+                        gain = (f", hit-rate gain: {record['hit_rate'] - baseline['hit_rate']:+.2f} pts"
+                                if baseline is not None else '')
+                        print(f"    prefetch pushes: {record['prefetch_pushes']} ({record['prefetch_bytes']} bytes), "
+                              f"useful: {record['prefetch_useful']}{gain}")
+                    if options and options.get('peers'):
+                        print(f"    peer probes: {record['peer_probes']}, peer hits: {record['peer_hits']}, "
+                              f"false positives: {record['peer_false_positives']}, "
+                              f"digest refreshes: {record['digest_refreshes']} ({record['digest_bytes_sent']} bytes)")
+
+                    if analytical and scheduler_type == 'nearest' and policy_model(cache_strategy) is not None:
+                        estimate = estimate_cell(user_positions, generate_positions(num_servers, grid_range=500),
+                                                 max_files_per_server, cache_strategy, len(fixed_request_list),
+                                                 requests_per_user=num_requests_per_user)
+                        predicted.append((num_servers, estimate['mean_response_ms']))
+                        print(f"    analytical estimate: {estimate['mean_response_ms']:.4f}ms, "
+                              f"hit rate {estimate['hit_rate']:.1f}% (simulated {record['hit_rate']:.1f}%)")
 
                     num_rows = int(np.sqrt(num_servers))
                     num_cols = int(np.ceil(num_servers / num_rows))
@@ -499,36 +538,28 @@ def main_multi_file_request(num_requests_per_user, num_users, max_files_per_serv
                         rectangular_average_response_time_list.append(average_response_time)
                         rectangular_std_dev_list.append(std_dev_response_time)
 
-                    user_simulation.print_server_hit_rates()
-
-                    # 绘制请求分布图，并保存到 'server_load' 子文件夹
-                    plot_server_request_distribution(servers, output_dir=output_dir,
-                                                     filename=f"server_request_distribution_{num_servers}.png")
-                    distribution_filename = os.path.join(output_dir,
-                                                         f"file_request_distribution_{num_servers}_servers.png")
-
-                    verify_zipf_distribution(user_simulation.request_counts, fixed_request_list, zipf_s=1.0, filename=distribution_filename)
-
-                    # 在删除文件夹前，确保关闭所有连接
-                    for server in servers:
-                        server.conn.close()
-                    main_server.conn.close()
-
-                    time.sleep(0.2)  # 等待，确保所有文件锁被释放
-
-                    if os.path.exists(data_dir):
-                        shutil.rmtree(data_dir)
+                if plot_worker is None:
+                    continue
                 # 绘制所有节点排列的平均响应时间和标准差图表
-                plot_scalability_analysis(results, filename=os.path.join(output_dir, "scalability_analysis.png"))
+                plot_worker.submit('plot_scalability_analysis', results,
+                                   filename=os.path.join(output_dir, "scalability_analysis.png"),
+                                   predicted=predicted or None)
                 # 绘制针对矩形排列的平均响应时间和标准差图表
-                if layout_type == 'grid':
-                    plot_rectangular_response_time(rectangular_num_servers_list, rectangular_average_response_time_list,
-                                                   rectangular_std_dev_list,
-                                                   filename=os.path.join(output_dir1, "rectangular_response_time.png"))
+                if layout_type == 'grid' and rectangular_num_servers_list:
+                    plot_worker.submit('plot_rectangular_response_time', list(rectangular_num_servers_list),
+                                       list(rectangular_average_response_time_list), list(rectangular_std_dev_list),
+                                       filename=os.path.join(output_dir1, "rectangular_response_time.png"))
 
 
                     # 绘制请求分布图，并保存到 'server_load' 子文件夹
+
+            # 多个调度器时对比它们的负载均衡程度和时延
+            if plot_worker is not None and len(scheduler_types) > 1:
+                plot_worker.submit('plot_scheduler_comparison', list(server_counts), schedulers_data, cache_strategy,
+                                   output_dir=output_root)
         for scheduler_type in scheduler_types:
+            if plot_worker is None:
+                break
             strategies_data = {
                 cache_strategy: (
                     avg_response_times['grid'][cache_strategy][scheduler_type],
@@ -538,34 +569,340 @@ def main_multi_file_request(num_requests_per_user, num_users, max_files_per_serv
             }
 
             # 调用 plot_ribbon_graph 函数生成平均响应时间对比图
-            plot_ribbon_graph(list(range(6, 65)), strategies_data, scheduler_type)
+            plot_worker.submit('plot_ribbon_graph', list(server_counts), strategies_data, scheduler_type,
+                               output_dir=output_root)
 
             # 调用 plot_rectangular_ribbon_graph 函数生成矩形排列的平均响应时间对比图
-            plot_rectangular_ribbon_graph(
+            plot_worker.submit(
+                'plot_rectangular_ribbon_graph',
                 rectangular_num_servers_list,
                 strategies_data,
                 filename=os.path.join(output_dir, "rectangular_ribbon_graph.png")
             )
 
             # 调用 plot_rectangular_std_ribbon_graph 函数生成矩形排列的标准差对比图
-            plot_rectangular_std_ribbon_graph(
+            plot_worker.submit(
+                'plot_rectangular_std_ribbon_graph',
                 rectangular_num_servers_list,
                 strategies_data,
                 filename=os.path.join(output_dir, "rectangular_std_ribbon_graph.png")
             )
 
+    if cluster is not None:
+        with sweep_timer.phase('teardown'):
+            cluster.close()
+    if warmup_requests is not None:
+        shutil.rmtree(snapshot_dir)
+    if plot_worker is not None:
+        with sweep_timer.phase('plotting'):
+            plot_worker.close()
+    store.close()
+
     end_time = time.time()
     total_time = end_time - start_time
+    print(f"Phase totals: {sweep_timer.report()}")
     print(f"Total runtime: {total_time:.2f} seconds.")
 
 
-if __name__ == '__main__':
-    num_requests_per_user = 5
-    num_users = 35000
-    max_files_per_server = 20
+def replicate_sweep(num_requests_per_user, num_users, max_files_per_server, cache_strategies, scheduler_types,
+                    server_counts, seeds=None, output_root='results', results_path=None, min_replications=3,
+                    max_replications=20, relative_precision=0.05, options=None):
+    """
+    对每个（调度器, 服务器数量）单元，用公共随机数重复比较各缓存策略：
+    同一次重复中所有策略使用相同的种子，差值置信区间足够窄后停止该单元的重复。
+
+    :return: {(scheduler_type, num_servers): run_replications 的结果}
+    """
+    data_dir = 'data'
+    os.makedirs(output_root, exist_ok=True)
+    store = ResultsStore(results_path or os.path.join(output_root, 'results.sqlite'))
+    workloads = {}  # 种子 -> 工作负载，在所有单元之间复用
+    work_dir = tempfile.mkdtemp(prefix='cdn_replicate_')  # 各种子的用户数据库，结束时删除
+
+    def workload(seed):
+        if seed not in workloads:
+            user_db_path = os.path.join(work_dir, f'user_data_{seed}.db')
+            workloads[seed] = (user_db_path,) + prepare_workload(user_db_path, num_users, num_requests_per_user,
+                                                                 RandomStreams(seed))
+        return workloads[seed]
+
+    summaries = {}
+    try:
+        for scheduler_type in scheduler_types:
+            for num_servers in server_counts:
+                def run(cache_strategy, seed):
+                    cell_key = {
+                        'layout': 'grid', 'cache_strategy': cache_strategy, 'scheduler': scheduler_type,
+                        'num_servers': num_servers, 'seed': seed, 'num_users': num_users,
+                        'num_requests_per_user': num_requests_per_user, 'max_files_per_server': max_files_per_server,
+                        'variant': cell_variant(options),
+                    }
+                    record = store.get_cell(cell_key)
+                    if record is None:
+                        user_db_path, _, _, fixed_request_list, user_requests = workload(seed)
+                        record, _, main_server, servers, _ = run_cell(
+                            data_dir, num_servers, cache_strategy, scheduler_type, user_requests, fixed_request_list,
+                            user_db_path, max_files_per_server, num_requests_per_user, RandomStreams(seed), options)
+                        store.append({**cell_key, **record})
+                        release_cell(data_dir, main_server, servers)
+                    return record['mean_response_ms']
+
+                summary = run_replications(run, cache_strategies, seeds=seeds, min_replications=min_replications,
+                                           max_replications=max_replications, relative_precision=relative_precision)
+                summaries[(scheduler_type, num_servers)] = summary
+
+                means = ', '.join(f"{strategy}: {mean:.2f} ± {half:.2f}ms"
+                                  for strategy, (mean, half) in summary['means'].items())
+                differences = ', '.join(f"{strategy} - {summary['baseline']}: {mean:.2f} ± {half:.2f}ms"
+                                        for strategy, (mean, half) in summary['differences'].items())
+                status = 'converged' if summary['converged'] else 'not converged'
+                print(f"Scheduler: {scheduler_type}, Servers: {num_servers}, replications: {summary['replications']} "
+                      f"({status}). {means}. {differences}.")
+    finally:
+        store.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return summaries
+
+
+def enqueue_sweep(queue_path, num_requests_per_user, num_users, max_files_per_server, cache_strategies,
+                  scheduler_types, server_counts, seeds, output_root='results', results_path=None, options=None,
+                  lease_seconds=600.0, poll_interval=5.0):
+    """
+    把扫描中的每个单元（缓存策略 × 调度器 × 服务器数量 × 种子）加入共享的任务队列，等待各主机上的 worker
+    执行完毕后把结果写入结果文件。结果文件中已有的单元不再加入队列；不绘制图表。
 
-    cache_strategies = ['ARC', 'LFU', 'FIFO']
-    scheduler_types = ['distance_round_robin']
+    :return: 队列中各状态的任务数
+    """
+    if not seeds or None in seeds:
+        raise ValueError('work queue sweeps need explicit seeds so that every worker regenerates the same workload')
+    os.makedirs(output_root, exist_ok=True)
+    store = ResultsStore(results_path or os.path.join(output_root, 'results.sqlite'))
+    queue = WorkQueue(queue_path, lease_seconds)
+    try:
+        tasks = []
+        for seed in seeds:
+            for cache_strategy in cache_strategies:
+                for scheduler_type in scheduler_types:
+                    for num_servers in server_counts:
+                        cell_key = {
+                            'layout': 'grid', 'cache_strategy': cache_strategy, 'scheduler': scheduler_type,
+                            'num_servers': num_servers, 'seed': seed, 'num_users': num_users,
+                            'num_requests_per_user': num_requests_per_user,
+                            'max_files_per_server': max_files_per_server, 'variant': cell_variant(options),
+                        }
+                        if not store.has_cell(cell_key):
+                            tasks.append({'cell': cell_key, 'options': options or {}})
+        print(f"Queued {queue.enqueue(tasks)} new cells in {queue_path} ({len(tasks)} not yet in {store.path}).")
+
+        last = None
+        while queue.unfinished():
+            counts = queue.counts()
+            if counts != last:
+                print(f"Queue: {counts['pending']} pending, {counts['leased']} running, {counts['done']} done, "
+                      f"{counts['failed']} failed")
+                last = counts
+            time.sleep(poll_interval)
+
+        collected = 0
+        for payload, record, worker in queue.results():
+            if not store.has_cell(payload['cell']):
+                store.append({**payload['cell'], **record})
+                collected += 1
+        for payload, error in queue.errors():
+            print(f"Cell {payload['cell']} failed:\n{error}")
+        counts = queue.counts()
+        print(f"Collected {collected} cells into {store.path}; {counts['failed']} failed.")
+        return counts
+    finally:
+        queue.close()
+        store.close()
+
+
+def queue_worker(queue_path, lease_seconds=600.0, worker=None, work_dir=None, poll_interval=1.0):
+    """
+    作为 worker 领取并执行队列中的单元，直到队列清空。每个 worker 使用自己的工作目录，
+    同一主机上可以运行多个 worker；工作负载按单元的种子在本地重新生成。
 
-    main_multi_file_request(num_requests_per_user=num_requests_per_user, num_users=num_users, max_files_per_server=max_files_per_server,
-                            cache_strategies=cache_strategies, scheduler_types=scheduler_types)
+    :return: 本 worker 完成的单元数
+    """
+    worker = worker or default_worker_id()
+    work_dir = work_dir or tempfile.mkdtemp(prefix='cdn_worker_')
+    os.makedirs(work_dir, exist_ok=True)
+    data_dir = os.path.join(work_dir, 'data')
+    workloads = {}  # (种子, 用户数, 每用户请求数) -> 工作负载
+
+    def run_task(payload):
+        cell, options = payload['cell'], payload['options']
+        seed = cell['seed']
+        key = (seed, cell['num_users'], cell['num_requests_per_user'])
+        if key not in workloads:
+            user_db_path = os.path.join(work_dir, f'user_data_{seed}_{len(workloads)}.db')
+            workloads[key] = (user_db_path,) + prepare_workload(user_db_path, cell['num_users'],
+                                                                cell['num_requests_per_user'], RandomStreams(seed))
+        user_db_path, _, _, fixed_request_list, user_requests = workloads[key]
+        warmup = None
+        if options.get('warmup'):
+            # 预热快照只在本 worker 内复用；预热请求来自固定的随机数流，各 worker 得到相同的快照
+            warmup_requests = generate_user_requests_zipf(fixed_request_list, cell['num_users'], options['warmup'],
+                                                          zipf_s=1.0, rng=RandomStreams(seed).numpy('warmup'))
+            warmup = (warmup_requests, os.path.join(
+                work_dir, f"{cell['cache_strategy']}_{cell['num_servers']}_{seed}.snap"))
+        record, _, main_server, servers, _ = run_cell(
+            data_dir, cell['num_servers'], cell['cache_strategy'], cell['scheduler'], user_requests,
+            fixed_request_list, user_db_path, cell['max_files_per_server'], cell['num_requests_per_user'],
+            RandomStreams(seed), options, warmup=warmup)
+        release_cell(data_dir, main_server, servers)
+        print(f"[{worker}] Cache: {cell['cache_strategy']}, Scheduler: {cell['scheduler']}, "
+              f"Servers: {cell['num_servers']}, Seed: {seed}, Avg response time: {record['mean_response_ms']:.4f}ms")
+        record['worker'] = worker
+        return record
+
+    queue = WorkQueue(queue_path, lease_seconds)
+    try:
+        completed = run_worker(queue, run_task, worker, poll_interval)
+    finally:
+        queue.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"[{worker}] completed {completed} cells.")
+    return completed
+
+
+def load_config(config_path=None, overrides=None):
+    """合并默认参数、JSON 配置文件和命令行覆盖项"""
+    config = dict(DEFAULT_CONFIG)
+    if config_path:
+        with open(config_path) as f:
+            file_config = json.load(f)
+        unknown = set(file_config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown config keys: {sorted(unknown)}")
+        config.update(file_config)
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='CDN cache/scheduler scalability sweep')
+    parser.add_argument('--config', help='JSON file with sweep parameters; flags override it')
+    parser.add_argument('--users', dest='num_users', type=int)
+    parser.add_argument('--requests-per-user', dest='num_requests_per_user', type=int)
+    parser.add_argument('--max-files-per-server', dest='max_files_per_server', type=int)
+    parser.add_argument('--cache-strategies', nargs='+')
+    parser.add_argument('--schedulers', dest='scheduler_types', nargs='+')
+    parser.add_argument('--min-servers', type=int)
+    parser.add_argument('--max-servers', type=int)
+    parser.add_argument('--seeds', nargs='+', type=int)
+    parser.add_argument('--regions', type=json.loads,
+                        help='JSON list of regional shield caches, e.g. \'[{"position": [250, 250], "cache_size": 50}]\'')
+    parser.add_argument('--arrival-rate', type=float, help='requests per second; enables the simulated clock')
+    parser.add_argument('--coalesce', action='store_true', default=None,
+                        help='collapse concurrent misses for the same file onto one in-flight origin fetch')
+    parser.add_argument('--serve-content', action='store_true', default=None,
+                        help='serve real file bytes through mmap/memoryview and measure throughput per server')
+    parser.add_argument('--latency-model', type=json.loads,
+                        help='JSON size/bandwidth/queueing latency model options; \'{}\' uses the defaults')
+    parser.add_argument('--prefetch', type=json.loads,
+                        help='JSON online push options, e.g. \'{"interval": 200, "push_budget": 4194304}\'')
+    parser.add_argument('--origins', type=json.loads,
+                        help='JSON geo-distributed origins, e.g. \'{"positions": [[-400, -400], [400, 400]], '
+                             '"replicas": 1}\'; the catalog is sharded over them')
+    parser.add_argument('--peers', type=json.loads,
+                        help='JSON cooperative caching options, e.g. \'{"radius": 300, "digest_interval": 500}\'')
+    parser.add_argument('--profile-servers', nargs='+', type=int,
+                        help='write a cProfile dump (profile_<N>.prof) for these server counts')
+    parser.add_argument('--profile-target', choices=['cell', 'send_request'],
+                        help='profile the whole cell or only the per-request hot path')
+    parser.add_argument('--metrics-file', help='keep a Prometheus text file of live per-server metrics up to date')
+    parser.add_argument('--metrics-port', type=int, help='serve live metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-interval', type=float, help='minimum seconds between metrics updates')
+    parser.add_argument('--warmup', type=int,
+                        help='warm each topology with N requests per user once, snapshot it, and fork every '
+                             'scheduler\'s measurement from that snapshot')
+    parser.add_argument('--workload', type=json.loads,
+                        help='JSON time-varying streaming workload (diurnal rate, popularity churn, flash crowds), '
+                             'e.g. \'{"rate": 200, "diurnal_amplitude": 0.5, "diurnal_period": 60}\'')
+    parser.add_argument('--incremental', action='store_true', default=None,
+                        help='derive each server count from the previous one instead of rebuilding every cell')
+    parser.add_argument('--analytical', action='store_true', default=None,
+                        help='print Che-approximation estimates next to each nearest-scheduler cell and overlay '
+                             'them on the scalability chart (LRU, FIFO, RR, LFU)')
+    parser.add_argument('--adaptive', action='store_true', default=None,
+                        help='sample server counts adaptively: start coarse and refine only where a curve bends or '
+                             'strategies cross')
+    parser.add_argument('--adaptive-points', type=int, help='number of coarse server counts (default 5)')
+    parser.add_argument('--adaptive-tolerance', type=float,
+                        help='relative deviation from linear that counts as a bend (default 0.03)')
+    parser.add_argument('--queue',
+                        help='shared work queue file: enqueue the sweep, wait for workers and collect their results')
+    parser.add_argument('--worker', action='store_true', default=None,
+                        help='with --queue, claim and run cells from the queue until it is drained')
+    parser.add_argument('--lease-seconds', type=float,
+                        help='seconds a claimed cell stays leased without a heartbeat before it is re-queued')
+    parser.add_argument('--headless', action='store_true', default=None, help='skip all charts; never imports matplotlib')
+    parser.add_argument('--output-dir')
+    parser.add_argument('--results-file', help='append-only results file; cells already in it are skipped')
+    parser.add_argument('--replicate', action='store_true', default=None,
+                        help='compare cache strategies with common random numbers until the CI on their difference is tight')
+    parser.add_argument('--min-replications', type=int)
+    parser.add_argument('--max-replications', type=int)
+    parser.add_argument('--relative-precision', type=float,
+                        help='stop when the CI half-width is below this fraction of the mean difference')
+    args = vars(parser.parse_args(argv))
+    config_path = args.pop('config')
+    return load_config(config_path, args)
+
+
+def main(argv=None):
+    config = parse_args(argv)
+    seeds = config['seeds']
+    server_counts = range(config['min_servers'], config['max_servers'] + 1)
+    options = {name: config[name] for name in SIMULATION_OPTIONS}
+    if config['queue'] and config['worker']:
+        queue_worker(config['queue'], config['lease_seconds'])
+        return
+    if config['queue']:
+        enqueue_sweep(config['queue'], num_requests_per_user=config['num_requests_per_user'],
+                      num_users=config['num_users'], max_files_per_server=config['max_files_per_server'],
+                      cache_strategies=config['cache_strategies'], scheduler_types=config['scheduler_types'],
+                      server_counts=server_counts, seeds=seeds, output_root=config['output_dir'],
+                      results_path=config['results_file'], options=options, lease_seconds=config['lease_seconds'])
+        return
+    if config['replicate']:
+        replicate_sweep(num_requests_per_user=config['num_requests_per_user'], num_users=config['num_users'],
+                        max_files_per_server=config['max_files_per_server'],
+                        cache_strategies=config['cache_strategies'], scheduler_types=config['scheduler_types'],
+                        server_counts=server_counts, seeds=None if seeds == [None] else seeds,
+                        output_root=config['output_dir'], results_path=config['results_file'],
+                        min_replications=config['min_replications'], max_replications=config['max_replications'],
+                        relative_precision=config['relative_precision'], options=options)
+        return
+    metrics = None
+    if config['metrics_file'] or config['metrics_port'] is not None:
+        metrics = MetricsExporter(config['metrics_file'], config['metrics_port'], config['metrics_interval'])
+        if metrics.port is not None:
+            print(f"Serving live metrics on http://127.0.0.1:{metrics.port}/metrics")
+    try:
+        for seed in seeds:
+            output_root = config['output_dir']
+            if len(seeds) > 1:
+                output_root = os.path.join(output_root, f'seed_{seed}')
+            main_multi_file_request(num_requests_per_user=config['num_requests_per_user'],
+                                    num_users=config['num_users'], max_files_per_server=config['max_files_per_server'],
+                                    cache_strategies=config['cache_strategies'],
+                                    scheduler_types=config['scheduler_types'], server_counts=server_counts, seed=seed,
+                                    headless=config['headless'], output_root=output_root,
+                                    results_path=config['results_file'], options=options,
+                                    profile_servers=config['profile_servers'],
+                                    profile_target=config['profile_target'], metrics=metrics,
+                                    incremental=config['incremental'], analytical=config['analytical'],
+                                    adaptive=config['adaptive'], adaptive_points=config['adaptive_points'],
+                                    adaptive_tolerance=config['adaptive_tolerance'])
+    finally:
+        if metrics is not None:
+            metrics.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -13,20 +13,18 @@ class ARCCache:
         if filename in self.t1 or filename in self.t2:
             # print(f"File {filename} is already in cache, skipping add.")
             return
+        self._admit(filename)
 
+    def _admit(self, filename):
+        """把一个不在缓存中的文件加入 t1"""
         if len(self.t1) + len(self.t2) >= self.max_files:
             # print(f"Cache full. Triggering eviction before adding {filename}.")
             self.evict()
 
-        # 检查文件是否已经存在于数据库中，避免重复插入
-        if self._file_exists_in_db(filename):
-            # print(f"File {filename} is already in database, skipping add.")
-            return
-
-        # 添加文件到缓存和数据库
+        # 添加文件到缓存和数据库（数据库中已有记录时不重复插入）
         self.t1[filename] = True
         cursor = self.server.conn.cursor()
-        cursor.execute('INSERT INTO files (filename) VALUES (?)', (filename,))
+        cursor.execute('INSERT OR IGNORE INTO files (filename) VALUES (?)', (filename,))
         self.server.conn.commit()
         # print(f"ADD {filename}. Current Cache: {list(self.t1.keys()) + list(self.t2.keys())}")
 
@@ -42,17 +40,13 @@ class ARCCache:
         if self.t1:
             evicted_file, _ = self.t1.popitem(last=False)
             self.b1[evicted_file] = True
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (evicted_file,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(evicted_file)
             # print(f"DELETE {evicted_file} from t1")
             return evicted_file
         elif self.t2:
             evicted_file, _ = self.t2.popitem(last=False)
             self.b2[evicted_file] = True
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (evicted_file,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(evicted_file)
             # print(f"DELETE {evicted_file} from t2")
             return evicted_file
         return None
@@ -67,9 +61,7 @@ class ARCCache:
             del self.b1[filename]
         elif filename in self.b2:
             del self.b2[filename]
-        cursor = self.server.conn.cursor()
-        cursor.execute('DELETE FROM files WHERE filename = ?', (filename,))
-        self.server.conn.commit()
+        self.server._remove_file_from_db(filename)
 
     def access(self, filename):
         # # print('ARC cache access:')
@@ -84,6 +76,19 @@ class ARCCache:
             return True
         return False
 
+    def get_or_fetch(self, filename, fetch):
+        """命中时只提升一次（t1 -> t2）；未命中时调用 fetch()，取到文件后加入 t1。见 Server.get_or_fetch"""
+        if self.access(filename):
+            return True, None
+        found, result = fetch()
+        if found:
+            self._admit(filename)
+        return False, result
+
+    def contains(self, filename):
+        """只判断文件是否在缓存中，不改变替换策略的状态（用于对等节点探测）"""
+        return filename in self.t1 or filename in self.t2
+
     def cache_content(self):
         """返回当前缓存内容的列表形式"""
         return list(self.t1.keys()) + list(self.t2.keys())
@@ -22,7 +22,10 @@ class FIFOCache:
         if filename in self.cache:
             # print(f"File {filename} is already in cache, skipping add.")
             return
+        self._admit(filename)
 
+    def _admit(self, filename):
+        """加入一个不在缓存中的文件"""
         # 如果缓存已满，移除最早的文件
         if len(self.cache) >= self.max_files:
             # print(f"Cache full. Triggering eviction before adding {filename}.")
@@ -47,9 +50,7 @@ class FIFOCache:
         # 从缓存中移除最早的文件并删除数据库中的记录
         if self.cache:
             evicted_file, _ = self.cache.popitem(last=False)
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (evicted_file,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(evicted_file)
             # print(f"DELETE {evicted_file}")
             return evicted_file
         return None
@@ -58,15 +59,26 @@ class FIFOCache:
         """从缓存中移除文件"""
         if filename in self.cache:
             del self.cache[filename]
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (filename,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(filename)
 
     def access(self, filename):
         if filename in self.cache:
             return True
         return False
 
+    def get_or_fetch(self, filename, fetch):
+        """命中时不改变顺序；未命中时调用 fetch()，取到文件后放到队尾。见 Server.get_or_fetch"""
+        if filename in self.cache:
+            return True, None
+        found, result = fetch()
+        if found:
+            self._admit(filename)
+        return False, result
+
+    def contains(self, filename):
+        """只判断文件是否在缓存中，不改变替换策略的状态（用于对等节点探测）"""
+        return filename in self.cache
+
     def cache_content(self):
         """返回当前缓存内容的列表形式"""
         return list(self.cache.keys())
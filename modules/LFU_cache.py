@@ -12,26 +12,33 @@ class LFUCache:
         if filename in self.cache:
             # print(f"File {filename} is already in cache, skipping add.")
             return
+        self._admit(filename)
 
+    def _admit(self, filename):
+        """加入一个不在缓存中的文件"""
         if len(self.cache) >= self.max_files:
             # print(f"Cache full. Triggering eviction before adding {filename}.")
             self.evict()
 
-        # 检查文件是否已经存在于数据库中，避免重复插入
-        if self._file_exists_in_db(filename):
-            # print(f"File {filename} is already in database, skipping add.")
-            return
-
-        # 添加文件到缓存和数据库，初始频率为1
+        # 添加文件到缓存和数据库（数据库中已有记录时不重复插入），初始频率为1
         self.cache[filename] = 1
         self.freq[1][filename] = True
         self.min_freq = 1  # 新添加的文件频率为1，更新最小频率
 
         cursor = self.server.conn.cursor()
-        cursor.execute('INSERT INTO files (filename) VALUES (?)', (filename,))
+        cursor.execute('INSERT OR IGNORE INTO files (filename) VALUES (?)', (filename,))
         self.server.conn.commit()
         # # print(f"ADD {filename}. Current Cache: {list(self.cache.keys())}")
 
+    def get_or_fetch(self, filename, fetch):
+        """命中时频率只加一次；未命中时调用 fetch()，取到文件后以频率 1 加入缓存。见 Server.get_or_fetch"""
+        if self.access(filename):
+            return True, None
+        found, result = fetch()
+        if found:
+            self._admit(filename)
+        return False, result
+
     def _file_exists_in_db(self, filename):
         cursor = self.server.conn.cursor()
         cursor.execute('SELECT COUNT(*) FROM files WHERE filename = ?', (filename,))
@@ -44,9 +51,7 @@ class LFUCache:
         if self.min_freq in self.freq and self.freq[self.min_freq]:
             evicted_file, _ = self.freq[self.min_freq].popitem(last=False)
             del self.cache[evicted_file]
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (evicted_file,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(evicted_file)
             # # print(f"DELETE {evicted_file} with frequency {self.min_freq}")
             if not self.freq[self.min_freq]:
                 del self.freq[self.min_freq]
@@ -58,9 +63,7 @@ class LFUCache:
             freq = self.cache[filename]
             del self.cache[filename]
             del self.freq[freq][filename]
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (filename,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(filename)
             if not self.freq[freq] and freq == self.min_freq:
                 self.min_freq += 1
 
@@ -79,5 +82,9 @@ class LFUCache:
         # print(f"Cache miss for {filename}")
         return False
 
+    def contains(self, filename):
+        """只判断文件是否在缓存中，不改变替换策略的状态（用于对等节点探测）"""
+        return filename in self.cache
+
     def cache_content(self):
         return list(self.cache.keys())
@@ -12,24 +12,31 @@ class LRUCache:
             # 如果文件已经在缓存中，只需将其移到末尾
             self.cache.move_to_end(filename)
             return
+        self._admit(filename)
 
+    def _admit(self, filename):
+        """加入一个不在缓存中的文件"""
         # 如果缓存已满，进行淘汰
         if len(self.cache) >= self.max_files:
             # print(f"Cache full. Triggering eviction before adding {filename}.")
             self.evict()
 
-        # 检查文件是否已经存在于数据库中，避免重复插入
-        if self._file_exists_in_db(filename):
-            # print(f"File {filename} is already in database, skipping add.")
-            return
-
-        # 添加新文件到缓存和数据库
+        # 添加新文件到缓存和数据库（数据库中已有记录时不重复插入）
         self.cache[filename] = True
         cursor = self.server.conn.cursor()
-        cursor.execute('INSERT INTO files (filename) VALUES (?)', (filename,))
+        cursor.execute('INSERT OR IGNORE INTO files (filename) VALUES (?)', (filename,))
         self.server.conn.commit()
         # print(f"ADD {filename}. Current Cache: {list(self.cache.keys())}")
 
+    def get_or_fetch(self, filename, fetch):
+        """命中时移到末尾；未命中时调用 fetch()，取到文件后加入缓存。见 Server.get_or_fetch"""
+        if self.access(filename):
+            return True, None
+        found, result = fetch()
+        if found:
+            self._admit(filename)
+        return False, result
+
     def _file_exists_in_db(self, filename):
         cursor = self.server.conn.cursor()
         cursor.execute('SELECT COUNT(*) FROM files WHERE filename = ?', (filename,))
@@ -41,9 +48,7 @@ class LRUCache:
     def evict(self):
         if self.cache:
             evicted_file, _ = self.cache.popitem(last=False)  # 移除最不常用的文件
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (evicted_file,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(evicted_file)
             # print(f"DELETE {evicted_file} from cache")
             return evicted_file
         return None
@@ -52,9 +57,7 @@ class LRUCache:
         """从缓存中移除文件"""
         if filename in self.cache:
             del self.cache[filename]
-            cursor = self.server.conn.cursor()
-            cursor.execute('DELETE FROM files WHERE filename = ?', (filename,))
-            self.server.conn.commit()
+            self.server._remove_file_from_db(filename)
             # print(f"REMOVE {filename} from cache and database")
 
     def access(self, filename):
@@ -66,6 +69,10 @@ class LRUCache:
         # print(f"Cache miss for {filename}")
         return False  # 缓存未命中
 
+    def contains(self, filename):
+        """只判断文件是否在缓存中，不改变替换策略的状态（用于对等节点探测）"""
+        return filename in self.cache
+
     def cache_content(self):
         """返回当前缓存内容的列表形式"""
         return list(self.cache.keys())
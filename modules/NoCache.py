@@ -9,6 +9,10 @@ class NoCache:
         # print(f"[No]Adding {filename} to cache using strategy {type(self).__name__}")
         return None
 
+    def get_or_fetch(self, filename, fetch):
+        # 不缓存：每次都向上游获取
+        return False, fetch()[1]
+
     def evict(self):
         # print("[NoCache] No eviction necessary, caching is disabled.")
         return None
@@ -17,5 +21,8 @@ class NoCache:
         # print(f"[No]Remove {filename} to cache using strategy {type(self).__name__}")
         return None
 
+    def contains(self, filename):
+        return False
+
     def cache_content(self):
         return []
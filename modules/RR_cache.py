@@ -1,10 +1,11 @@
 import random
 
 class RRCache:
-    def __init__(self, max_files, server):
+    def __init__(self, max_files, server, rng=None):
         self.max_files = max_files
         self.server = server
         self.cache = []
+        self.rng = rng if rng is not None else random  # 随机替换使用的随机数流
         # print("RR Cache")
 
     def access(self, filename):
@@ -16,21 +17,34 @@ class RRCache:
         if filename in self.cache:
             # print('Already cached')
             return  # 如果文件已经在缓存中，忽略
+        self._admit(filename)
+
+    def _admit(self, filename):
+        """加入一个不在缓存中的文件，缓存已满时随机替换一个"""
         if len(self.cache) < self.max_files:
             self.cache.append(filename)
-            self.server._add_file_to_db(filename, 0)  # 添加到数据库
+            self.server._add_file_to_db(filename)  # 添加到数据库
             # print(f"[RR ADD] File {filename} added to cache and database.")
         else:
-            evicted_file = random.choice(self.cache)  # 随机选择一个文件进行替换
+            evicted_file = self.rng.choice(self.cache)  # 随机选择一个文件进行替换
             self.cache.remove(evicted_file)
             self.server._remove_file_from_db(evicted_file)  # 从数据库中删除
             self.cache.append(filename)
-            self.server._add_file_to_db(filename, 0)  # 添加到数据库
+            self.server._add_file_to_db(filename)  # 添加到数据库
             # print(f"[RR ADD] File {filename} added to cache and database.")
 
+    def get_or_fetch(self, filename, fetch):
+        """未命中时调用 fetch()，取到文件后加入缓存（已满时随机替换一个）。见 Server.get_or_fetch"""
+        if filename in self.cache:
+            return True, None
+        found, result = fetch()
+        if found:
+            self._admit(filename)
+        return False, result
+
     def evict(self):
         if self.cache:
-            evicted_file = random.choice(self.cache)  # 随机选择一个文件进行移除
+            evicted_file = self.rng.choice(self.cache)  # 随机选择一个文件进行移除
             self.cache.remove(evicted_file)
             self.server._remove_file_from_db(evicted_file)  # 从数据库中删除
             return evicted_file
@@ -42,6 +56,10 @@ class RRCache:
             self.cache.remove(filename)
             print(f"[RR REMOVE] File {filename} removed from cache.")
 
+    def contains(self, filename):
+        """只判断文件是否在缓存中，不改变替换策略的状态（用于对等节点探测）"""
+        return filename in self.cache
+
     def cache_content(self):
         """返回当前缓存内容的列表形式"""
         return self.cache
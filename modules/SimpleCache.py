@@ -34,6 +34,18 @@ class SimpleCache:
         # print(f"[SimpleCache] Cache miss for {filename}.")
         return False
 
+    def get_or_fetch(self, filename, fetch):
+        """源站的文件集合：不在其中时调用 fetch()，取到文件后加入"""
+        if filename in self.files:
+            return True, None
+        found, result = fetch()
+        if found:
+            self.add(filename)
+        return False, result
+
+    def contains(self, filename):
+        return filename in self.files
+
     def evict(self):
         # SimpleCache does not handle eviction logic since it is not required for the main server
         pass
@@ -0,0 +1,50 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    缓存摘要用的 Bloom 过滤器：k 个哈希位置由两个 64 位哈希值做双重哈希得到。
+    只会误报（false positive），不会漏报。
+    """
+
+    def __init__(self, num_bits, num_hashes):
+        self.num_bits = max(8, num_bits)
+        self.num_hashes = max(1, num_hashes)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_capacity(cls, capacity, fp_rate=0.01):
+        """按预计元素数和目标误报率选择位数 m = -n·ln(p)/ln(2)² 和哈希数 k = m/n·ln(2)"""
+        capacity = max(1, capacity)
+        num_bits = int(math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        num_hashes = int(round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    @classmethod
+    def from_keys(cls, keys, capacity=None, fp_rate=0.01):
+        keys = list(keys)
+        bloom = cls.for_capacity(capacity or len(keys), fp_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def size_bytes(self):
+        """摘要发布给对等节点时的大小"""
+        return len(self.bits)
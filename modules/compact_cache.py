@@ -0,0 +1,589 @@
+import random
+from array import array
+
+EMPTY = -1  # 空槽位 / 不在缓存中的标记
+
+
+def _index_typecode(limit):
+    """能表示 [-1, limit) 中所有下标的最窄有符号整数类型：不超过 32767 个对象时每项只占 2 字节"""
+    if limit <= 2 ** 15 - 1:
+        return 'h'
+    if limit <= 2 ** 31 - 1:
+        return 'i'
+    return 'q'
+
+
+def _int_array(size, fill=EMPTY, typecode='i'):
+    """预分配一个整数数组（默认 32 位）"""
+    return array(typecode, [fill]) * size
+
+
+class _IndexLinkedLists:
+    """在预分配数组上实现的若干条双向链表，节点用槽位下标表示，每个节点只占几个到十几个字节"""
+
+    def __init__(self, num_slots, num_lists, typecode='i'):
+        """:param typecode: 槽位和对象 id 数组的元素类型，须能表示全部槽位和对象 id"""
+        self.key = _int_array(num_slots, typecode=typecode)  # 槽位 -> 对象 id
+        self.prev = _int_array(num_slots, typecode=typecode)
+        self.next = _int_array(num_slots, typecode=typecode)
+        # 槽位所在链表编号，只有一条链表时省略
+        self.owner = _int_array(num_slots, typecode='b') if num_lists > 1 else None
+        self.head = [EMPTY] * num_lists  # 每条链表的头（最旧）
+        self.tail = [EMPTY] * num_lists  # 每条链表的尾（最新）
+        self.size = [0] * num_lists
+        self.free = array(typecode)  # 被释放后可复用的槽位栈
+        self.unused = 0  # 从未使用过的最小槽位
+        self.num_slots = num_slots
+
+    def has_free(self):
+        return bool(self.free) or self.unused < self.num_slots
+
+    def alloc(self, key):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            slot = self.unused
+            self.unused += 1
+        self.key[slot] = key
+        return slot
+
+    def release(self, slot):
+        self.key[slot] = EMPTY
+        if self.owner is not None:
+            self.owner[slot] = EMPTY
+        self.free.append(slot)
+
+    def push_back(self, lst, slot):
+        tail = self.tail[lst]
+        self.prev[slot] = tail
+        self.next[slot] = EMPTY
+        if tail == EMPTY:
+            self.head[lst] = slot
+        else:
+            self.next[tail] = slot
+        self.tail[lst] = slot
+        if self.owner is not None:
+            self.owner[slot] = lst
+        self.size[lst] += 1
+
+    def unlink(self, slot):
+        lst = self.owner[slot] if self.owner is not None else 0
+        prev, nxt = self.prev[slot], self.next[slot]
+        if prev == EMPTY:
+            self.head[lst] = nxt
+        else:
+            self.next[prev] = nxt
+        if nxt == EMPTY:
+            self.tail[lst] = prev
+        else:
+            self.prev[nxt] = prev
+        self.size[lst] -= 1
+        return lst
+
+    def move_to_back(self, lst, slot):
+        if self.tail[lst] != slot or (self.owner is not None and self.owner[slot] != lst):
+            self.unlink(slot)
+            self.push_back(lst, slot)
+
+    def keys(self, lst):
+        """按从旧到新的顺序返回链表中的对象 id"""
+        result = []
+        slot = self.head[lst]
+        while slot != EMPTY:
+            result.append(self.key[slot])
+            slot = self.next[slot]
+        return result
+
+
+class CompactLRUCache:
+    """基于数组链表的 LRU 缓存，键为稠密整数对象 id"""
+
+    def __init__(self, max_files, num_objects):
+        self.max_files = max_files
+        typecode = _index_typecode(max(max_files, num_objects))
+        self.lists = _IndexLinkedLists(max_files, 1, typecode)
+        self.slot_of = _int_array(num_objects, typecode=typecode)  # 对象 id -> 槽位
+
+    def __len__(self):
+        return self.lists.size[0]
+
+    def access(self, oid):
+        slot = self.slot_of[oid]
+        if slot == EMPTY:
+            return False
+        self.lists.move_to_back(0, slot)
+        return True
+
+    def add(self, oid):
+        """加入对象，返回被淘汰的对象 id（没有淘汰时返回 None）"""
+        slot = self.slot_of[oid]
+        if slot != EMPTY:
+            self.lists.move_to_back(0, slot)
+            return None
+        evicted = None
+        if self.lists.size[0] >= self.max_files:
+            evicted = self.evict()
+        if self.max_files <= 0:
+            return evicted
+        slot = self.lists.alloc(oid)
+        self.lists.push_back(0, slot)
+        self.slot_of[oid] = slot
+        return evicted
+
+    def evict(self):
+        slot = self.lists.head[0]
+        if slot == EMPTY:
+            return None
+        oid = self.lists.key[slot]
+        self.lists.unlink(slot)
+        self.lists.release(slot)
+        self.slot_of[oid] = EMPTY
+        return oid
+
+    def remove(self, oid):
+        """从缓存中移除对象"""
+        slot = self.slot_of[oid]
+        if slot != EMPTY:
+            self.lists.unlink(slot)
+            self.lists.release(slot)
+            self.slot_of[oid] = EMPTY
+
+    def contains(self, oid):
+        return self.slot_of[oid] != EMPTY
+
+    def cache_content(self):
+        """返回当前缓存内容（从最久未使用到最近使用）"""
+        return self.lists.keys(0)
+
+
+class CompactFIFOCache(CompactLRUCache):
+    """基于数组链表的 FIFO 缓存，命中时不改变顺序"""
+
+    def access(self, oid):
+        return self.slot_of[oid] != EMPTY
+
+    def add(self, oid):
+        if self.slot_of[oid] != EMPTY:
+            return None
+        return super().add(oid)
+
+
+class CompactRRCache:
+    """随机替换缓存：对象 id 紧凑存放在数组中，删除时与末尾元素交换（swap-remove）"""
+
+    def __init__(self, max_files, num_objects, rng=None):
+        self.max_files = max_files
+        typecode = _index_typecode(max(max_files, num_objects))
+        self.keys = _int_array(max_files, typecode=typecode)  # 槽位 -> 对象 id，前 size 个有效
+        self.size = 0
+        self.slot_of = _int_array(num_objects, typecode=typecode)
+        self.rng = rng if rng is not None else random
+
+    def __len__(self):
+        return self.size
+
+    def access(self, oid):
+        return self.slot_of[oid] != EMPTY
+
+    def add(self, oid):
+        if self.slot_of[oid] != EMPTY:
+            return None
+        evicted = None
+        if self.size >= self.max_files:
+            evicted = self.evict()
+        if self.max_files <= 0:
+            return evicted
+        self.keys[self.size] = oid
+        self.slot_of[oid] = self.size
+        self.size += 1
+        return evicted
+
+    def _swap_remove(self, slot):
+        oid = self.keys[slot]
+        last = self.size - 1
+        moved = self.keys[last]
+        self.keys[slot] = moved
+        self.slot_of[moved] = slot
+        self.keys[last] = EMPTY
+        self.slot_of[oid] = EMPTY
+        self.size = last
+        return oid
+
+    def evict(self):
+        if self.size == 0:
+            return None
+        return self._swap_remove(self.rng.randrange(self.size))
+
+    def remove(self, oid):
+        """从缓存中移除对象"""
+        slot = self.slot_of[oid]
+        if slot != EMPTY:
+            self._swap_remove(slot)
+
+    def contains(self, oid):
+        return self.slot_of[oid] != EMPTY
+
+    def cache_content(self):
+        return self.keys[:self.size].tolist()
+
+
+class CompactLFUCache:
+    """O(1) LFU 缓存：频率节点链表，每个频率节点挂一条按进入顺序排列的对象链表"""
+
+    def __init__(self, max_files, num_objects):
+        self.max_files = max_files
+        self.size = 0
+        typecode = _index_typecode(max(max_files + 1, num_objects))
+        self.slot_of = _int_array(num_objects, typecode=typecode)
+        # 对象槽位
+        self.key = _int_array(max_files, typecode=typecode)
+        self.prev = _int_array(max_files, typecode=typecode)
+        self.next = _int_array(max_files, typecode=typecode)
+        self.fnode = _int_array(max_files, typecode=typecode)  # 对象所在的频率节点
+        self.free = array(typecode)
+        self.unused = 0
+        # 频率节点，最多 max_files + 1 个（访问时新节点先于旧节点释放前分配）；频率本身仍用 32 位
+        num_fnodes = max_files + 1
+        self.fval = _int_array(num_fnodes, 0)
+        self.fprev = _int_array(num_fnodes, typecode=typecode)
+        self.fnext = _int_array(num_fnodes, typecode=typecode)
+        self.fhead = _int_array(num_fnodes, typecode=typecode)
+        self.ftail = _int_array(num_fnodes, typecode=typecode)
+        self.ffree = array(typecode, range(num_fnodes - 1, -1, -1))
+        self.min_node = EMPTY  # 频率最小的节点
+
+    def __len__(self):
+        return self.size
+
+    def _new_fnode(self, value, after):
+        """在频率节点 after 之后插入一个频率为 value 的节点（after 为 EMPTY 时插在最前）"""
+        f = self.ffree.pop()
+        self.fval[f] = value
+        self.fhead[f] = self.ftail[f] = EMPTY
+        nxt = self.min_node if after == EMPTY else self.fnext[after]
+        self.fprev[f] = after
+        self.fnext[f] = nxt
+        if after == EMPTY:
+            self.min_node = f
+        else:
+            self.fnext[after] = f
+        if nxt != EMPTY:
+            self.fprev[nxt] = f
+        return f
+
+    def _drop_fnode_if_empty(self, f):
+        if self.fhead[f] != EMPTY:
+            return
+        prev, nxt = self.fprev[f], self.fnext[f]
+        if prev == EMPTY:
+            self.min_node = nxt
+        else:
+            self.fnext[prev] = nxt
+        if nxt != EMPTY:
+            self.fprev[nxt] = prev
+        self.ffree.append(f)
+
+    def _append(self, f, slot):
+        tail = self.ftail[f]
+        self.prev[slot] = tail
+        self.next[slot] = EMPTY
+        if tail == EMPTY:
+            self.fhead[f] = slot
+        else:
+            self.next[tail] = slot
+        self.ftail[f] = slot
+        self.fnode[slot] = f
+
+    def _unlink(self, slot):
+        f = self.fnode[slot]
+        prev, nxt = self.prev[slot], self.next[slot]
+        if prev == EMPTY:
+            self.fhead[f] = nxt
+        else:
+            self.next[prev] = nxt
+        if nxt == EMPTY:
+            self.ftail[f] = prev
+        else:
+            self.prev[nxt] = prev
+        return f
+
+    def access(self, oid):
+        slot = self.slot_of[oid]
+        if slot == EMPTY:
+            return False
+        f = self.fnode[slot]
+        target = self.fnext[f]
+        if target == EMPTY or self.fval[target] != self.fval[f] + 1:
+            target = self._new_fnode(self.fval[f] + 1, f)
+        self._unlink(slot)
+        self._append(target, slot)
+        self._drop_fnode_if_empty(f)
+        return True
+
+    def add(self, oid):
+        if self.slot_of[oid] != EMPTY:
+            return None
+        evicted = None
+        if self.size >= self.max_files:
+            evicted = self.evict()
+        if self.max_files <= 0:
+            return evicted
+        f = self.min_node
+        if f == EMPTY or self.fval[f] != 1:
+            f = self._new_fnode(1, EMPTY)
+        if self.free:
+            slot = self.free.pop()
+        else:
+            slot = self.unused
+            self.unused += 1
+        self.key[slot] = oid
+        self._append(f, slot)
+        self.slot_of[oid] = slot
+        self.size += 1
+        return evicted
+
+    def _discard(self, slot):
+        oid = self.key[slot]
+        f = self._unlink(slot)
+        self._drop_fnode_if_empty(f)
+        self.key[slot] = EMPTY
+        self.free.append(slot)
+        self.slot_of[oid] = EMPTY
+        self.size -= 1
+        return oid
+
+    def evict(self):
+        """淘汰频率最低的对象，频率相同时淘汰最早进入该频率的对象"""
+        if self.min_node == EMPTY:
+            return None
+        return self._discard(self.fhead[self.min_node])
+
+    def remove(self, oid):
+        slot = self.slot_of[oid]
+        if slot != EMPTY:
+            self._discard(slot)
+
+    def frequency(self, oid):
+        slot = self.slot_of[oid]
+        return 0 if slot == EMPTY else self.fval[self.fnode[slot]]
+
+    def contains(self, oid):
+        return self.slot_of[oid] != EMPTY
+
+    def cache_content(self):
+        """按频率从低到高返回缓存内容"""
+        result = []
+        f = self.min_node
+        while f != EMPTY:
+            slot = self.fhead[f]
+            while slot != EMPTY:
+                result.append(self.key[slot])
+                slot = self.next[slot]
+            f = self.fnext[f]
+        return result
+
+
+T1, T2, B1, B2 = 0, 1, 2, 3
+
+
+class CompactARCCache:
+    """自适应替换缓存（ARC）：T1/T2 为缓存内容，B1/B2 为有界的幽灵列表，p 为 T1 的目标大小"""
+
+    def __init__(self, max_files, num_objects):
+        self.max_files = max_files
+        self.p = 0.0
+        typecode = _index_typecode(max(2 * max_files, num_objects))
+        self.lists = _IndexLinkedLists(2 * max_files, 4, typecode)  # 缓存 + 幽灵最多 2c 项
+        self.slot_of = _int_array(num_objects, typecode=typecode)
+
+    def __len__(self):
+        return self.lists.size[T1] + self.lists.size[T2]
+
+    def access(self, oid):
+        slot = self.slot_of[oid]
+        if slot == EMPTY or self.lists.owner[slot] >= B1:
+            return False
+        self.lists.unlink(slot)
+        self.lists.push_back(T2, slot)
+        return True
+
+    def _drop_lru(self, lst):
+        slot = self.lists.head[lst]
+        oid = self.lists.key[slot]
+        self.lists.unlink(slot)
+        self.lists.release(slot)
+        self.slot_of[oid] = EMPTY
+
+    def _replace(self, hit_in_b2):
+        """把 T1 或 T2 的 LRU 项降级到对应的幽灵列表，返回被淘汰的对象 id"""
+        size = self.lists.size
+        if size[T1] + size[T2] == 0:
+            return None
+        if size[T1] and (size[T1] > self.p or (hit_in_b2 and size[T1] == self.p) or not size[T2]):
+            src, ghost = T1, B1
+        else:
+            src, ghost = T2, B2
+        slot = self.lists.head[src]
+        self.lists.unlink(slot)
+        self.lists.push_back(ghost, slot)
+        return self.lists.key[slot]
+
+    def add(self, oid):
+        size = self.lists.size
+        c = self.max_files
+        if c <= 0:
+            return None
+        slot = self.slot_of[oid]
+        full = size[T1] + size[T2] >= c
+        evicted = None
+        if slot != EMPTY:
+            owner = self.lists.owner[slot]
+            if owner <= T2:
+                return None
+            # 幽灵命中：调整目标大小后放入 T2
+            if owner == B1:
+                self.p = min(c, self.p + max(size[B2] / size[B1], 1))
+            else:
+                self.p = max(0.0, self.p - max(size[B1] / size[B2], 1))
+            self.lists.unlink(slot)
+            if full:
+                evicted = self._replace(owner == B2)
+            self.lists.push_back(T2, slot)
+            return evicted
+
+        if size[T1] + size[B1] >= c:
+            if size[T1] < c:
+                self._drop_lru(B1)
+                if full:
+                    evicted = self._replace(False)
+            else:
+                evicted = self.lists.key[self.lists.head[T1]]
+                self._drop_lru(T1)
+        elif full:
+            if size[T1] + size[T2] + size[B1] + size[B2] >= 2 * c:
+                self._drop_lru(B2)
+            evicted = self._replace(False)
+        if not self.lists.has_free():
+            self._drop_lru(B2 if size[B2] else B1)
+        slot = self.lists.alloc(oid)
+        self.lists.push_back(T1, slot)
+        self.slot_of[oid] = slot
+        return evicted
+
+    def evict(self):
+        evicted = self._replace(False)
+        if evicted is None:
+            return None
+        # 为保证幽灵列表有界，必要时丢弃最旧的幽灵项
+        size = self.lists.size
+        while size[B1] + size[B2] > self.max_files:
+            self._drop_lru(B1 if size[B1] else B2)
+        return evicted
+
+    def remove(self, oid):
+        slot = self.slot_of[oid]
+        if slot != EMPTY:
+            self.lists.unlink(slot)
+            self.lists.release(slot)
+            self.slot_of[oid] = EMPTY
+
+    def contains(self, oid):
+        slot = self.slot_of[oid]
+        return slot != EMPTY and self.lists.owner[slot] < B1
+
+    def cache_content(self):
+        return self.lists.keys(T1) + self.lists.keys(T2)
+
+
+COMPACT_CACHE_CLASSES = {
+    'LRU': CompactLRUCache,
+    'FIFO': CompactFIFOCache,
+    'RR': CompactRRCache,
+    'LFU': CompactLFUCache,
+    'ARC': CompactARCCache,
+}
+
+
+class FileIdCache:
+    """把文件名映射为稠密整数 id 后交给紧凑缓存引擎，使其可以直接挂到 Server 上"""
+
+    def __init__(self, engine, file_ids, server=None):
+        self.engine = engine
+        self.file_ids = file_ids  # 文件名 -> id，所有服务器共享同一份
+        self.file_names = [None] * len(file_ids)
+        for filename, oid in file_ids.items():
+            self.file_names[oid] = filename
+        self.server = server  # 可选，用于同步服务器数据库
+
+    def access(self, filename):
+        oid = self.file_ids.get(filename)
+        return oid is not None and self.engine.access(oid)
+
+    def add(self, filename):
+        oid = self.file_ids.get(filename)
+        if oid is None:
+            return None
+        return self._admit(filename, oid)
+
+    def get_or_fetch(self, filename, fetch):
+        """
+        命中时与 access 相同地更新引擎状态；未命中时调用 fetch()，取到文件后交给引擎的 add
+        （ARC 的幽灵命中也在 add 中处理）。见 Server.get_or_fetch
+        """
+        oid = self.file_ids.get(filename)
+        if oid is not None and self.engine.access(oid):
+            return True, None
+        found, result = fetch()
+        if found and oid is not None:
+            self._admit(filename, oid)
+        return False, result
+
+    def _admit(self, filename, oid):
+        """把文件交给引擎，同步数据库记录，返回被淘汰的文件名"""
+        evicted = self.engine.add(oid)
+        if self.server is not None:
+            self.server._add_file_to_db(filename)
+        if evicted is None:
+            return None
+        evicted_file = self.file_names[evicted]
+        if self.server is not None:
+            self.server._remove_file_from_db(evicted_file)
+        return evicted_file
+
+    def evict(self):
+        evicted = self.engine.evict()
+        if evicted is None:
+            return None
+        evicted_file = self.file_names[evicted]
+        if self.server is not None:
+            self.server._remove_file_from_db(evicted_file)
+        return evicted_file
+
+    def remove(self, filename):
+        """从缓存中移除文件"""
+        oid = self.file_ids.get(filename)
+        if oid is not None:
+            self.engine.remove(oid)
+            if self.server is not None:
+                self.server._remove_file_from_db(filename)
+
+    def contains(self, filename):
+        """只判断文件是否在缓存中，不改变替换策略的状态（用于对等节点探测）"""
+        oid = self.file_ids.get(filename)
+        return oid is not None and self.engine.contains(oid)
+
+    def cache_content(self):
+        return [self.file_names[oid] for oid in self.engine.cache_content()]
+
+
+def create_compact_engine(strategy, max_files, num_objects, rng=None):
+    """按策略名（LRU/FIFO/RR/LFU/ARC）创建以整数 id 为键的紧凑缓存引擎"""
+    engine_class = COMPACT_CACHE_CLASSES[strategy]
+    if engine_class is CompactRRCache:
+        return engine_class(max_files, num_objects, rng=rng)
+    return engine_class(max_files, num_objects)
+
+
+def create_compact_cache(strategy, max_files, file_ids, server=None, rng=None):
+    """按策略名（LRU/FIFO/RR/LFU/ARC）创建挂在文件名上的紧凑缓存"""
+    return FileIdCache(create_compact_engine(strategy, max_files, len(file_ids), rng=rng), file_ids, server)
@@ -0,0 +1,64 @@
+import hashlib
+import math
+
+
+class ConsistentHashScheduler:
+    """
+    按内容划分的调度器：在距离用户不超过 最近距离 + latency_bound 的候选服务器中，
+    用 rendezvous（最高随机权重）哈希按请求的文件选择服务器，使相邻节点缓存不同的内容。
+    load_factor 不为 None 时使用有界负载：已分配请求数达到 load_factor × 候选服务器平均负载 的服务器被跳过。
+    上限按候选集合计算而不是按全部服务器：热点区域的候选服务器可能都远高于全局平均负载。
+    load_factor >= 1 时候选中负载最小的服务器总低于上限；小于 1 时若所有候选都超限则退回权重最高的服务器。
+    """
+
+    def __init__(self, servers, latency_bound=300, load_factor=None):
+        self.servers = servers
+        self.latency_bound = latency_bound
+        self.load_factor = load_factor
+        self.assigned = [0] * len(servers)  # 每台服务器被分配到的请求数
+        self._candidates = {}  # 用户位置 -> 候选服务器下标
+        self._weights = {}  # 文件名 -> 每台服务器的 rendezvous 权重
+
+    def calculate_distance(self, position1, position2):
+        """计算两个位置之间的欧几里得距离"""
+        return ((position1[0] - position2[0]) ** 2 + (position1[1] - position2[1]) ** 2) ** 0.5
+
+    def candidates(self, user_position):
+        """距离在最近服务器的 latency_bound 范围内的服务器下标（按位置缓存）"""
+        key = tuple(user_position)
+        if key not in self._candidates:
+            distances = [self.calculate_distance(server.get_position(), user_position) for server in self.servers]
+            bound = min(distances) + self.latency_bound
+            self._candidates[key] = [i for i, distance in enumerate(distances) if distance <= bound]
+        return self._candidates[key]
+
+    def weights(self, request):
+        """
+        每台服务器对该文件的 rendezvous 权重（与 self.servers 对齐）。权重由服务器的位置而不是它在列表中的下标
+        计算，增删或重排服务器时只有落在被删除服务器上的文件会换到别的服务器。
+        """
+        if request not in self._weights:
+            self._weights[request] = [
+                int.from_bytes(hashlib.blake2b(f'{request}|{server.get_position()}'.encode(), digest_size=8).digest(),
+                               'little')
+                for server in self.servers
+            ]
+        return self._weights[request]
+
+    def get_next_server(self, user_position, request=None):
+        """选择候选服务器中对该文件权重最高（且未超过负载上限）的服务器；没有请求内容时选最近的服务器"""
+        candidates = self.candidates(user_position)
+        if request is None:
+            index = min(candidates,
+                        key=lambda i: self.calculate_distance(self.servers[i].get_position(), user_position))
+        else:
+            weights = self.weights(request)
+            if self.load_factor is None:
+                index = max(candidates, key=weights.__getitem__)
+            else:
+                ranked = sorted(candidates, key=weights.__getitem__, reverse=True)
+                candidate_load = sum(self.assigned[i] for i in candidates)
+                capacity = math.ceil(self.load_factor * (candidate_load + 1) / len(candidates))
+                index = next((i for i in ranked if self.assigned[i] < capacity), ranked[0])
+        self.assigned[index] += 1
+        return self.servers[index]
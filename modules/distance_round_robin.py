@@ -2,8 +2,9 @@ import random
 
 
 class DistanceRoundRobinScheduler:
-    def __init__(self, servers, initial_threshold=300, adjustment_factor=0.1):
+    def __init__(self, servers, initial_threshold=300, adjustment_factor=0.1, rng=None):
         self.servers = servers
+        self.rng = rng if rng is not None else random  # 负载相同时随机选择服务器
         self.current_index = 0
         self.threshold = initial_threshold  # 初始距离阈值
         self.adjustment_factor = adjustment_factor  # 调整因子
@@ -44,7 +45,7 @@ class DistanceRoundRobinScheduler:
 
         self.threshold = max(50, min(self.threshold, 1000))
 
-    def get_next_server(self, user_position):
+    def get_next_server(self, user_position, request=None):
         """选择下一个合适的服务器"""
         nearest_servers = self.get_nearest_servers(user_position)
 
@@ -57,7 +58,7 @@ class DistanceRoundRobinScheduler:
             nearest_servers.sort(key=lambda server: server.get_active_connections())
             lightest_servers = [server for server in nearest_servers if
                                 server.get_active_connections() == nearest_servers[0].get_active_connections()]
-            selected_server = random.choice(lightest_servers)
+            selected_server = self.rng.choice(lightest_servers)
 
         # 计算总请求数
         total_requests = sum(server.request_count for server in self.servers)
@@ -1,6 +1,7 @@
 class NearestServerScheduler:
-    def __init__(self, servers):
+    def __init__(self, servers, assignment=None):
         self.servers = servers
+        self.assignment = assignment  # 可选的 {用户位置: 最近的服务器}，由 Topology 预先批量计算
         # print(f"Scheduler initialized with {len(servers)} servers.")
         # for i, server in enumerate(servers):
         #     print(f"Server {i + 1} position: {server.get_position()}")
@@ -9,8 +10,10 @@ class NearestServerScheduler:
         """计算两个位置之间的欧几里得距离"""
         return ((position1[0] - position2[0]) ** 2 + (position1[1] - position2[1]) ** 2) ** 0.5
 
-    def get_next_server(self, user_position):
+    def get_next_server(self, user_position, request=None):
         """获取距离用户最近且负载最轻的服务器"""
+        if self.assignment is not None and user_position in self.assignment:
+            return self.assignment[user_position]
         nearest_server = None
         shortest_distance = float('inf')
         for server in self.servers:
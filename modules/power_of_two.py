@@ -0,0 +1,39 @@
+import random
+
+
+class PowerOfTwoChoicesScheduler:
+    """
+    负载感知调度器：从用户附近（距离不超过 最近距离 + latency_bound）的候选服务器中随机抽取 d 台，
+    选择其中已分配请求最少的一台。候选列表按用户位置缓存，之后每个请求只需 O(d) 的工作量。
+    """
+
+    def __init__(self, servers, d=2, latency_bound=300, rng=None):
+        self.servers = servers
+        self.d = d
+        self.latency_bound = latency_bound
+        self.rng = rng if rng is not None else random
+        self.assigned = [0] * len(servers)  # 调度器自己维护的每台服务器已分配请求数
+        self._candidates = {}  # 用户位置 -> 候选服务器下标
+
+    def calculate_distance(self, position1, position2):
+        """计算两个位置之间的欧几里得距离"""
+        return ((position1[0] - position2[0]) ** 2 + (position1[1] - position2[1]) ** 2) ** 0.5
+
+    def candidates(self, user_position):
+        key = tuple(user_position)
+        if key not in self._candidates:
+            distances = [self.calculate_distance(server.get_position(), user_position) for server in self.servers]
+            bound = min(distances) + self.latency_bound
+            self._candidates[key] = [i for i, distance in enumerate(distances) if distance <= bound]
+        return self._candidates[key]
+
+    def get_next_server(self, user_position, request=None):
+        """随机抽取 d 台候选服务器，返回已分配请求最少的一台"""
+        candidates = self.candidates(user_position)
+        if len(candidates) <= self.d:
+            sampled = candidates
+        else:
+            sampled = self.rng.sample(candidates, self.d)
+        index = min(sampled, key=lambda i: self.assigned[i])
+        self.assigned[index] += 1
+        return self.servers[index]
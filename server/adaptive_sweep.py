@@ -0,0 +1,74 @@
+from itertools import combinations
+
+
+def coarse_server_counts(min_servers, max_servers, num_points=5):
+    """在 [min_servers, max_servers] 上均匀取 num_points 个服务器数量（包含两端）"""
+    if max_servers <= min_servers or num_points < 2:
+        return sorted({min_servers, max_servers})
+    step = (max_servers - min_servers) / (num_points - 1)
+    return sorted({int(round(min_servers + i * step)) for i in range(num_points)})
+
+
+def _bends(counts, values, tolerance):
+    """中间点偏离相邻两点连线超过 tolerance（相对于该点的值）时，返回该点两侧的区间"""
+    intervals = set()
+    for (a, fa), (b, fb), (c, fc) in zip(zip(counts, values), zip(counts[1:], values[1:]), zip(counts[2:], values[2:])):
+        linear = fa + (fc - fa) * (b - a) / (c - a)
+        if abs(fb - linear) > tolerance * max(abs(fb), 1e-9):
+            intervals.update({(a, b), (b, c)})
+    return intervals
+
+
+def _crossings(counts, first, second):
+    """两条曲线的差值在相邻两点之间变号（或一端相等）的区间"""
+    return {(a, b) for a, b, da, db in zip(counts, counts[1:],
+                                          [x - y for x, y in zip(first, second)],
+                                          [x - y for x, y in zip(first[1:], second[1:])])
+            if da * db <= 0 and (da, db) != (0, 0)}
+
+
+def refine_intervals(counts, curves, tolerance=0.03):
+    """
+    找出需要加密采样的相邻服务器数量区间。
+
+    :param counts: 已采样的服务器数量（升序）
+    :param curves: {曲线名: {指标名: 与 counts 对齐的值列表}}，例如 {('LRU', 'nearest'): {'mean_response_ms': [...]}}
+    :param tolerance: 曲线弯曲的相对阈值
+    :return: 需要加密的区间 {(a, b)}：任一曲线的任一指标在此弯曲，或同一指标上两条曲线在此相交
+    """
+    intervals = set()
+    for metrics in curves.values():
+        for values in metrics.values():
+            intervals |= _bends(counts, values, tolerance)
+    for first, second in combinations(curves.values(), 2):
+        for metric in first.keys() & second.keys():
+            intervals |= _crossings(counts, first[metric], second[metric])
+    return intervals
+
+
+def adaptive_server_counts(evaluate, min_servers, max_servers, num_points=5, tolerance=0.03, max_rounds=None):
+    """
+    从粗粒度的服务器数量开始，只在曲线弯曲或策略曲线相交的区间取中点继续仿真，直到没有需要加密的区间
+    （相邻采样点已连续）或达到 max_rounds 轮。
+
+    :param evaluate: evaluate(num_servers) -> {曲线名: {指标名: 值}}，仿真（或读取）该服务器数量下的全部单元
+    :return: 升序的已采样服务器数量，以及 {服务器数量: evaluate 的结果}
+    """
+    samples = {}
+    pending = coarse_server_counts(min_servers, max_servers, num_points)
+    rounds = 0
+    while pending:
+        for num_servers in pending:
+            samples[num_servers] = evaluate(num_servers)
+        rounds += 1
+        if max_rounds is not None and rounds >= max_rounds:
+            break
+        counts = sorted(samples)
+        curves = {}
+        for num_servers in counts:
+            for name, metrics in samples[num_servers].items():
+                for metric, value in metrics.items():
+                    curves.setdefault(name, {}).setdefault(metric, []).append(value)
+        pending = sorted({(a + b) // 2 for a, b in refine_intervals(counts, curves, tolerance) if b - a > 1})
+        print(f"Adaptive sweep round {rounds}: {len(counts)} server counts sampled, refining at {pending}")
+    return sorted(samples), samples
@@ -0,0 +1,190 @@
+import argparse
+import random
+import sys
+
+import numpy as np
+
+from server.server_initialization import generate_positions
+from server.user_initialization import generate_user_positions, generate_zipf_distribution
+
+# 缓存策略 -> 近似模型；ARC 等没有对应模型的策略不做估计
+POLICY_MODELS = {
+    'LRU': 'lru',
+    'COMPACT_LRU': 'lru',
+    'FIFO': 'fifo',
+    'RR': 'random',
+    'LFU': 'lfu',
+    'COMPACT_LFU': 'lfu',
+}
+
+
+def policy_model(cache_strategy):
+    """返回缓存策略对应的近似模型名，没有模型时返回 None"""
+    return POLICY_MODELS.get(cache_strategy)
+
+
+def _occupancy(popularity, t, model):
+    """特征时间为 t 时每个文件在缓存中的概率（独立引用模型下也就是命中概率）"""
+    if model == 'lru':
+        return -np.expm1(-popularity * t)  # 1 - e^{-p t}
+    # FIFO 和随机替换在 Che 近似下的命中概率相同
+    return popularity * t / (1 + popularity * t)
+
+
+def characteristic_time(popularity, cache_size, model='lru'):
+    """
+    求解 Che 近似的特征时间 T（以请求数为单位）：各文件在缓存中的概率之和等于缓存容量。
+    缓存能放下所有被请求的文件时返回 inf。
+    """
+    popularity = np.asarray(popularity, dtype=float)
+    if cache_size >= np.count_nonzero(popularity):
+        return np.inf
+    low, high = 0.0, 1.0
+    while _occupancy(popularity, high, model).sum() < cache_size:
+        low, high = high, high * 2
+    # 占用量随 T 单调增加，二分到浮点精度
+    for _ in range(200):
+        mid = (low + high) / 2
+        if mid in (low, high):
+            break
+        if _occupancy(popularity, mid, model).sum() < cache_size:
+            low = mid
+        else:
+            high = mid
+    return high
+
+
+def hit_probabilities(popularity, cache_size, model='lru'):
+    """
+    独立引用模型（IRM）下每个文件的稳态命中概率。
+
+    - lru：Che 近似 h_i = 1 - exp(-p_i T)
+    - fifo / random：h_i = p_i T / (1 + p_i T)
+    - lfu：稳态下最热门的 cache_size 个文件常驻缓存，h_i 为 1 或 0
+    """
+    popularity = np.asarray(popularity, dtype=float)
+    if model == 'lfu':
+        hits = np.zeros(len(popularity))
+        hits[np.argsort(-popularity, kind='stable')[:int(cache_size)]] = 1.0
+        return hits * (popularity > 0)
+    t = characteristic_time(popularity, cache_size, model)
+    if np.isinf(t):
+        return (popularity > 0).astype(float)
+    return _occupancy(popularity, t, model)
+
+
+def hit_ratio(popularity, cache_size, model='lru', num_requests=None, preloaded=0):
+    """
+    一台缓存的命中率。
+
+    :param num_requests: 该缓存收到的请求数；给出时扣除冷启动时每个文件第一次请求的必然未命中，
+        None 表示稳态命中率
+    :param preloaded: 仿真开始前预热的最热门文件数（这些文件的第一次请求也可能命中）
+    """
+    popularity = np.asarray(popularity, dtype=float)
+    hits = hit_probabilities(popularity, cache_size, model)
+    if num_requests is None:
+        return float(hits @ popularity)
+    if num_requests <= 0:
+        return 0.0
+    expected = num_requests * popularity
+    first = -np.expm1(num_requests * np.log1p(-np.minimum(popularity, 1.0)))  # P(文件至少被请求一次)
+    warm = np.zeros(len(popularity), dtype=bool)
+    warm[np.argsort(-popularity, kind='stable')[:min(int(preloaded), int(cache_size))]] = True
+    expected_hits = hits * np.maximum(expected - np.where(warm, 0.0, first), 0.0)
+    return float(expected_hits.sum() / num_requests)
+
+
+def nearest_assignment(user_positions, server_positions):
+    """每个用户的最近服务器下标（距离相等时取下标较小的服务器）"""
+    users = np.asarray(user_positions, dtype=float).reshape(-1, 2)
+    servers = np.asarray(server_positions, dtype=float).reshape(-1, 2)
+    assignment = np.empty(len(users), dtype=np.int64)
+    for start in range(0, len(users), 8192):
+        chunk = users[start:start + 8192]
+        distances = np.hypot(chunk[:, 0][:, None] - servers[:, 0], chunk[:, 1][:, None] - servers[:, 1])
+        assignment[start:start + 8192] = np.argmin(distances, axis=1)
+    return assignment
+
+
+def estimate_cell(user_positions, server_positions, cache_size, cache_strategy, num_files=100, zipf_s=1.0,
+                  origin_position=(0, 0), requests_per_user=None, preloaded=20, assignment=None,
+                  distance_unit=1000.0):
+    """
+    不做仿真，直接估计一个仿真单元（源站 + 一层边缘节点）每台服务器和整体的命中率与平均响应时间。
+
+    每个用户的请求数相同，服务器的请求份额即路由表中分配给它的用户比例；所有用户的文件流行度服从同一个
+    Zipf 分布，因此每台边缘节点看到的请求流仍是同一分布的独立引用。响应时间与 UserSimulation 一致：
+    命中为用户到节点的往返传播时延 2·d/distance_unit 秒，未命中再加上节点到源站的往返时延。
+    区域节点、协作缓存、多源站和时延模型等可选参数不在估计范围内。
+
+    :param cache_strategy: 缓存策略名（见 POLICY_MODELS）
+    :param requests_per_user: 每个用户的请求数；给出时按每台服务器收到的请求数修正冷启动，None 表示稳态
+    :param preloaded: 每台边缘节点预热的最热门文件数（仿真中为 get_top_n_files 的 20 个）
+    :param assignment: 路由表，每个用户对应的服务器下标；None 时按最近服务器计算
+    :return: {'server_share', 'server_hit_ratio', 'server_mean_ms', 'hit_rate'（百分比）, 'mean_response_ms'}
+    """
+    model = policy_model(cache_strategy)
+    if model is None:
+        raise ValueError(f'No analytical model for cache strategy {cache_strategy}')
+    users = np.asarray(user_positions, dtype=float).reshape(-1, 2)
+    servers = np.asarray(server_positions, dtype=float).reshape(-1, 2)
+    if assignment is None:
+        assignment = nearest_assignment(users, servers)
+    assignment = np.asarray(assignment)
+    popularity = generate_zipf_distribution(num_files, zipf_s)
+
+    user_counts = np.bincount(assignment, minlength=len(servers)).astype(float)
+    share = user_counts / len(users)
+    distances = np.hypot(*(users - servers[assignment]).T)
+    mean_edge_distance = np.bincount(assignment, weights=distances, minlength=len(servers)) / np.maximum(user_counts, 1)
+    origin_distance = np.hypot(*(servers - np.asarray(origin_position, dtype=float)).T)
+
+    if requests_per_user is None:
+        steady = hit_ratio(popularity, cache_size, model)
+        server_hit_ratio = np.full(len(servers), steady)
+    else:
+        server_hit_ratio = np.array([hit_ratio(popularity, cache_size, model, count * requests_per_user, preloaded)
+                                     for count in user_counts])
+    round_trip_ms = 2 * 1000.0 / distance_unit
+    server_mean_ms = round_trip_ms * (mean_edge_distance + (1 - server_hit_ratio) * origin_distance)
+    server_mean_ms[user_counts == 0] = np.nan
+    used = user_counts > 0
+    return {
+        'server_share': share.tolist(),
+        'server_hit_ratio': server_hit_ratio.tolist(),
+        'server_mean_ms': server_mean_ms.tolist(),
+        'hit_rate': float(share @ server_hit_ratio) * 100,
+        'mean_response_ms': float(share[used] @ server_mean_ms[used]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Estimate edge hit ratio and latency without simulating')
+    parser.add_argument('--users', type=int, default=35000)
+    parser.add_argument('--requests-per-user', type=int, default=None,
+                        help='correct for cold-start misses at this many requests per user (default: steady state)')
+    parser.add_argument('--cache-size', type=int, default=20)
+    parser.add_argument('--cache-strategies', nargs='+', default=['LRU', 'FIFO', 'RR', 'LFU'],
+                        choices=sorted(POLICY_MODELS))
+    parser.add_argument('--min-servers', type=int, default=6)
+    parser.add_argument('--max-servers', type=int, default=64)
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--zipf-s', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    user_positions = generate_user_positions(args.users, 1000, rng=random.Random(args.seed))
+    for num_servers in range(args.min_servers, args.max_servers + 1):
+        server_positions = generate_positions(num_servers, grid_range=500)
+        estimates = ', '.join(
+            f"{strategy}: {estimate['hit_rate']:.1f}% hit, {estimate['mean_response_ms']:.1f}ms"
+            for strategy in args.cache_strategies
+            for estimate in [estimate_cell(user_positions, server_positions, args.cache_size, strategy, args.files,
+                                           args.zipf_s, requests_per_user=args.requests_per_user)])
+        print(f"Servers: {num_servers}. {estimates}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
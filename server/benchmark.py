@@ -0,0 +1,349 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+CACHE_STRATEGIES = ('LRU', 'LFU', 'FIFO', 'RR', 'ARC',
+                    'COMPACT_LRU', 'COMPACT_LFU', 'COMPACT_FIFO', 'COMPACT_RR', 'COMPACT_ARC')
+SCHEDULERS = ('nearest', 'round_robin', 'distance_round_robin', 'consistent_hash', 'bounded_consistent_hash',
+              'power_of_two')
+SCHEDULER_SERVER_COUNTS = (64, 1000, 10000)
+SIMULATION_USER_COUNTS = (1000, 5000, 20000)
+
+# --quick 时使用的较小规模，供测试和快速检查
+QUICK = {'cache_ops': 5000, 'catalog': 500, 'cache_size': 50, 'scheduler_server_counts': (64, 1000),
+         'simulation_user_counts': (200, 1000), 'min_time': 0.05}
+FULL = {'cache_ops': 50000, 'catalog': 2000, 'cache_size': 200, 'scheduler_server_counts': SCHEDULER_SERVER_COUNTS,
+        'simulation_user_counts': SIMULATION_USER_COUNTS, 'min_time': 0.5}
+
+
+class _Node:
+    """调度基准用的轻量服务器，只提供调度器用到的属性，避免为上万台服务器各打开一个数据库"""
+
+    def __init__(self, index, position):
+        self.db_path = f'node_{index}.db'
+        self.position = position
+        self.active_connections = 0
+        self.request_count = 0
+
+    def get_position(self):
+        return self.position
+
+    def get_active_connections(self):
+        return self.active_connections
+
+
+def _metric(value, unit, higher_is_better):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+class _NullConnection:
+    """不做任何事的数据库连接，让基于字典的缓存模块在基准中不经过 sqlite"""
+
+    def cursor(self):
+        return self
+
+    def execute(self, *args):
+        return self
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def commit(self):
+        pass
+
+
+class _NullServer:
+    """缓存基准用的空服务器：缓存模块同步数据库的调用全部为空操作，只测量缓存本身"""
+
+    def __init__(self):
+        self.conn = _NullConnection()
+
+    def _add_file_to_db(self, filename):
+        pass
+
+    def _remove_file_from_db(self, filename):
+        pass
+
+
+def cache_workloads(num_ops, catalog, rng, zipf_s=1.0):
+    """返回 {'zipf': 对象 id 序列, 'scan': 对象 id 序列}；scan 依次循环扫描整个目录，对按最近性淘汰的缓存最不利"""
+    weights = 1.0 / np.arange(1, catalog + 1) ** zipf_s
+    zipf = rng.choice(catalog, size=num_ops, p=weights / weights.sum())
+    return {
+        'zipf': zipf.tolist(),
+        'scan': [i % catalog for i in range(num_ops)],
+    }
+
+
+def _is_compact(strategy):
+    from server.server_initialization import COMPACT_PREFIX
+
+    return strategy.startswith(COMPACT_PREFIX)
+
+
+def _make_engine(strategy, cache_size, catalog, rng):
+    """
+    不挂 Server 的缓存：COMPACT_ 策略直接返回以整数 id 为键的引擎，其余策略返回挂在 _NullServer 上、
+    以文件名为键的字典实现。
+    """
+    from modules.compact_cache import create_compact_engine
+    from server.server_initialization import COMPACT_PREFIX, create_cache_strategy
+
+    if _is_compact(strategy):
+        return create_compact_engine(strategy[len(COMPACT_PREFIX):], cache_size, catalog, rng=rng)
+    return create_cache_strategy(strategy, cache_size, _NullServer(), rng=rng)
+
+
+def _make_server(strategy, cache_size, file_ids):
+    from server.server import Server
+    from server.server_initialization import create_cache_strategy
+
+    server = Server(':memory:', None, (0, 0), size=0, max_files=cache_size, cache_strategy=None)
+    server.cache_strategy = create_cache_strategy(strategy, cache_size, server, file_ids, rng=random.Random(0))
+    return server
+
+
+def _replay(cache, keys):
+    """每个键先 access，未命中时 add（与 get_or_fetch 取到文件后的路径相同），返回命中次数"""
+    hits = 0
+    for key in keys:
+        if cache.access(key):
+            hits += 1
+        else:
+            cache.add(key)
+    return hits
+
+
+def _fetched():
+    return True, None
+
+
+def _replay_server(server, keys):
+    """按请求路径回放：每个键一次 Server.get_or_fetch，缓存的增删都同步到服务器的 sqlite 数据库"""
+    for key in keys:
+        server.get_or_fetch(key, _fetched)
+
+
+def _bytes_per_entry(strategy, cache_size, catalog, fill_keys):
+    """
+    创建缓存并用 fill_keys 填满后仍被占用的内存（tracemalloc，包括创建时预分配的数组）除以缓存容量。
+    键和随机数流在开始追踪前就已创建，不计入其中。
+    """
+    rng = random.Random(0)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    cache = _make_engine(strategy, cache_size, catalog, rng)
+    _replay(cache, fill_keys)
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del cache
+    return retained / cache_size
+
+
+def bench_caches(strategies=CACHE_STRATEGIES, num_ops=50000, catalog=2000, cache_size=200, seed=0):
+    """
+    每种缓存在 Zipf 和扫描负载下的 ops/s 与命中率，以及填满后每个缓存项占用的字节数。
+
+    cache/ 下的指标只测量缓存本身：紧凑引擎以整数 id 为键，字典实现以文件名为键且不同步数据库。
+    server_cache/ 下的 ops/s 是经过 Server.get_or_fetch 和 sqlite 同步的完整请求路径。
+    """
+    results, info = {}, {}
+    names = [f'file_{i}' for i in range(catalog)]
+    file_ids = {name: i for i, name in enumerate(names)}
+    workloads = cache_workloads(num_ops, catalog, np.random.default_rng(seed))
+    named_workloads = {workload: [names[i] for i in ids] for workload, ids in workloads.items()}
+    for strategy in strategies:
+        compact = _is_compact(strategy)
+        for workload, ids in workloads.items():
+            keys = ids if compact else named_workloads[workload]
+            cache = _make_engine(strategy, cache_size, catalog, random.Random(0))
+            start = time.perf_counter()
+            hits = _replay(cache, keys)
+            elapsed = time.perf_counter() - start
+
+            server = _make_server(strategy, cache_size, file_ids)
+            start = time.perf_counter()
+            _replay_server(server, named_workloads[workload])
+            server_elapsed = time.perf_counter() - start
+            server.close()
+
+            results[f'cache/{strategy}/{workload}/ops_per_s'] = _metric(len(keys) / elapsed, 'ops/s', True)
+            results[f'server_cache/{strategy}/{workload}/ops_per_s'] = _metric(
+                len(keys) / server_elapsed, 'ops/s', True)
+            info[f'cache/{strategy}/{workload}/hit_rate'] = hits / len(keys) * 100
+
+        fill_keys = list(range(cache_size)) if compact else names[:cache_size]
+        results[f'cache/{strategy}/bytes_per_entry'] = _metric(
+            _bytes_per_entry(strategy, cache_size, catalog, fill_keys), 'B', False)
+    return results, info
+
+
+def _time_per_call(func, args_list, min_time):
+    """循环调用 func 直到至少运行 min_time 秒，返回每次调用的平均耗时（秒）"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for args in args_list:
+            func(*args)
+        calls += len(args_list)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def bench_schedulers(schedulers=SCHEDULERS, server_counts=SCHEDULER_SERVER_COUNTS, min_time=0.5, seed=0):
+    """每个调度器在不同服务器数量下为一个请求选择服务器的耗时（微秒）"""
+    from server.user_simulation import UserSimulation
+
+    rng = random.Random(seed)
+    requests = [((rng.uniform(-500, 500), rng.uniform(-500, 500)), f'fixed_file_{rng.randint(1, 100)}')
+                for _ in range(200)]
+    results = {}
+    for num_servers in server_counts:
+        nodes = [_Node(i, (rng.uniform(-500, 500), rng.uniform(-500, 500))) for i in range(num_servers)]
+        for scheduler in schedulers:
+            simulation = UserSimulation(nodes, [], None, request_interval=0.5, scheduler=scheduler,
+                                        rng=random.Random(seed))
+            seconds = _time_per_call(simulation.scheduler.get_next_server, requests, min_time)
+            results[f'scheduler/{scheduler}/{num_servers}/us_per_request'] = _metric(seconds * 1e6, 'us', False)
+    return results
+
+
+def bench_simulation(user_counts=SIMULATION_USER_COUNTS, num_servers=16, cache_strategy='COMPACT_LRU',
+                     scheduler='nearest', num_requests_per_user=5, seed=0):
+    """UserSimulation 端到端每秒处理的请求数"""
+    from server.rng import RandomStreams
+    from server.server_initialization import generate_positions, initialize_servers
+    from server.user_initialization import generate_user_requests_zipf, initialize_users
+    from server.user_simulation import UserSimulation
+
+    results = {}
+    streams = RandomStreams(seed)
+    for num_users in user_counts:
+        work_dir = tempfile.mkdtemp(prefix='cdn_bench_')
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                user_db_path = os.path.join(work_dir, 'users.db')
+                initialize_users(user_db_path, num_users, grid_size=1000, rng=streams.python('user_positions'))
+                request_list = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+                user_requests = generate_user_requests_zipf(request_list, num_users, num_requests_per_user, zipf_s=1.0,
+                                                            rng=streams.numpy('user_requests'))
+                main_server, servers = initialize_servers(work_dir, num_servers, generate_positions(num_servers, 500),
+                                                          (0, 0), cache_size=20, cache_strategy_class=cache_strategy,
+                                                          top_n_files=[], streams=streams)
+                simulation = UserSimulation(servers, request_list, user_db_path, request_interval=0.5,
+                                            scheduler=scheduler, user_requests=user_requests)
+                start = time.perf_counter()
+                simulation.simulate_requests(num_requests_per_user)
+                elapsed = time.perf_counter() - start
+            for server in servers + [main_server]:
+                server.close()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        total = num_users * num_requests_per_user
+        results[f'simulation/{num_users}_users/requests_per_s'] = _metric(total / elapsed, 'req/s', True)
+    return results
+
+
+def run_benchmarks(quick=False, seed=0, suites=('caches', 'schedulers', 'simulation')):
+    """运行基准并返回可写入 JSON 的结果"""
+    scale = QUICK if quick else FULL
+    results, info = {}, {}
+    if 'caches' in suites:
+        cache_results, info = bench_caches(num_ops=scale['cache_ops'], catalog=scale['catalog'],
+                                           cache_size=scale['cache_size'], seed=seed)
+        results.update(cache_results)
+    if 'schedulers' in suites:
+        results.update(bench_schedulers(server_counts=scale['scheduler_server_counts'], min_time=scale['min_time'],
+                                        seed=seed))
+    if 'simulation' in suites:
+        results.update(bench_simulation(user_counts=scale['simulation_user_counts'], seed=seed))
+    return {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'quick': quick, 'seed': seed,
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+        'info': info,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    逐项比较两次基准结果。
+
+    :param threshold: 相对变化超过该比例且方向变差时视为回归
+    :return: [(名称, 基线值, 当前值, 相对变化, 状态)]，状态为 regression / improvement / ok / new / missing
+    """
+    rows = []
+    base_results, current_results = baseline['results'], current['results']
+    for name in sorted(set(base_results) | set(current_results)):
+        if name not in current_results:
+            rows.append((name, base_results[name]['value'], None, None, 'missing'))
+            continue
+        if name not in base_results:
+            rows.append((name, None, current_results[name]['value'], None, 'new'))
+            continue
+        base, value = base_results[name]['value'], current_results[name]['value']
+        change = (value - base) / base if base else 0.0
+        better = change if current_results[name]['higher_is_better'] else -change
+        status = 'regression' if better < -threshold else 'improvement' if better > threshold else 'ok'
+        rows.append((name, base, value, change, status))
+    return rows
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark caches, schedulers and the end-to-end simulation')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks and write a JSON result file')
+    run_parser.add_argument('--output', default='benchmark.json')
+    run_parser.add_argument('--quick', action='store_true', help='smaller workloads for a fast check')
+    run_parser.add_argument('--suites', nargs='+', default=['caches', 'schedulers', 'simulation'],
+                            choices=['caches', 'schedulers', 'simulation'])
+    run_parser.add_argument('--seed', type=int, default=0)
+    compare_parser = commands.add_parser('compare', help='compare a result file against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='relative change that counts as a regression (default 0.10)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = run_benchmarks(quick=args.quick, seed=args.seed, suites=args.suites)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        for name, metric in report['results'].items():
+            print(f"{name}: {metric['value']:.2f} {metric['unit']}")
+        print(f"Results written to {args.output}")
+        return 0
+
+    rows = compare(_load(args.baseline), _load(args.current), args.threshold)
+    for name, base, value, change, status in rows:
+        if change is None:
+            print(f"{status.upper():<12}{name}")
+        else:
+            print(f"{status.upper():<12}{name}: {base:.2f} -> {value:.2f} ({change * 100:+.1f}%)")
+    regressions = sum(1 for row in rows if row[4] == 'regression')
+    print(f"{regressions} regression(s) beyond {args.threshold * 100:.0f}%")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
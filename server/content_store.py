@@ -0,0 +1,87 @@
+import mmap
+import os
+import time
+
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def touch_pages(view):
+    """默认的消费方式：每页读一个字节，触发真实的页面读取但不把内容拷贝到用户态缓冲区"""
+    return bytes(view[::PAGE_SIZE])
+
+
+class MappedContentStore:
+    """
+    以只读 mmap 映射 data_dir 中的文件，通过 memoryview 零拷贝地提供文件内容，
+    并统计该服务器提供的字节数和在存储路径上花费的时间。
+
+    每次提供的都是独立的切片视图，释放映射（缓存淘汰）不会使调用方手中的视图失效；
+    仍有调用方视图的映射推迟到这些视图都被释放后再关闭。
+    """
+
+    def __init__(self, data_dir, sink=touch_pages):
+        """
+        :param sink: 每次提供文件时对 memoryview 的消费方式，例如 socket.sendall；None 表示只返回视图
+        """
+        self.data_dir = data_dir
+        self.sink = sink
+        self.mappings = {}  # 文件名 -> (mmap, memoryview)
+        self.bytes_served = 0
+        self.requests_served = 0
+        self.serve_time = 0.0
+        self.mapped_count = 0
+        self.released_count = 0
+        self.closing = []  # 已释放但仍有调用方视图、尚未关闭的映射
+
+    def __contains__(self, filename):
+        return filename in self.mappings
+
+    def view(self, filename):
+        """返回文件内容的 memoryview，首次访问时建立映射"""
+        entry = self.mappings.get(filename)
+        if entry is None:
+            with open(os.path.join(self.data_dir, filename), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            entry = self.mappings[filename] = (mapped, memoryview(mapped))
+            self.mapped_count += 1
+        return entry[1]
+
+    def serve(self, filename):
+        """提供文件内容（调用方独占的切片视图）并计入字节数和耗时"""
+        start = time.perf_counter()
+        view = self.view(filename)[:]
+        if self.sink is not None:
+            self.sink(view)
+        self.serve_time += time.perf_counter() - start
+        self.bytes_served += len(view)
+        self.requests_served += 1
+        return view
+
+    def release(self, filename):
+        """释放文件的映射（缓存淘汰时调用）"""
+        entry = self.mappings.pop(filename, None)
+        if entry is not None:
+            mapped, view = entry
+            view.release()
+            self.closing.append(mapped)
+            self.released_count += 1
+        self._close_unused()
+
+    def _close_unused(self):
+        """关闭不再被任何调用方视图引用的映射，其余的留到下一次释放时再试"""
+        exported = []
+        for mapped in self.closing:
+            try:
+                mapped.close()
+            except BufferError:
+                exported.append(mapped)  # 调用方仍持有视图
+        self.closing = exported
+
+    def throughput(self):
+        """存储路径上的吞吐量（字节/秒）"""
+        return self.bytes_served / self.serve_time if self.serve_time else 0.0
+
+    def close(self):
+        for filename in list(self.mappings):
+            self.release(filename)
+        self._close_unused()
@@ -0,0 +1,123 @@
+from array import array
+
+import numpy as np
+
+# 各层级服务器向下游发送数据的链路带宽（字节/秒）：edge 为边缘节点到用户的接入链路
+DEFAULT_BANDWIDTH = {
+    'edge': 12.5e6,  # 100 Mbit/s
+    'peer': 125e6,  # 1 Gbit/s
+    'region': 125e6,
+    'origin': 62.5e6,  # 500 Mbit/s
+}
+
+
+class LatencyModel:
+    """
+    考虑传播、传输和排队的时延模型：
+
+    - 传播时延：往返距离 / distance_unit（默认与 UserSimulation.calculate_response_time 的 2·d/1000 一致）；
+    - 传输时延：文件大小 / 路径上的瓶颈带宽；
+    - 排队时延：按时间窗口统计每台服务器的到达率 λ，以 M/M/1 的等待时间 ρ/(μ(1-ρ)) 加上服务时间 1/μ 计算；
+      请求路径上的每台服务器（边缘、区域、源站、对等节点以及白费的对等探测）各计一次到达，时延为各跳之和。
+
+    仿真循环中只用 record() 追加几个数值，全部请求的时延在 response_times() 中用 numpy 一次算出。
+    """
+
+    def __init__(self, file_sizes, distance_unit=1000.0, bandwidth=None, service_rate=1000.0, window=1.0,
+                 arrival_rate=100.0, max_utilization=0.95):
+        """
+        :param file_sizes: 文件名 -> 文件大小（字节）
+        :param bandwidth: 覆盖 DEFAULT_BANDWIDTH 中各层级的链路带宽
+        :param service_rate: 每台服务器每秒能处理的请求数 μ
+        :param window: 统计到达率的时间窗口（秒）
+        :param arrival_rate: 请求没有仿真时间时，按第 i 个请求在 i / arrival_rate 秒到达计算
+        :param max_utilization: 利用率上限，避免过载时排队时延发散
+        """
+        self.file_sizes = file_sizes
+        self.distance_unit = distance_unit
+        self.bandwidth = {**DEFAULT_BANDWIDTH, **(bandwidth or {})}
+        self.service_rate = service_rate
+        self.window = window
+        self.arrival_rate = arrival_rate
+        self.max_utilization = max_utilization
+        self.server_ids = {}
+        self.clear()
+
+    def clear(self):
+        self.times = array('d')
+        self.distances = array('d')
+        self.sizes = array('d')
+        self.path_bandwidths = array('d')
+        self.hop_ids = array('i')  # 所有请求经过的服务器 id 依次拼接
+        self.hop_counts = array('i')  # 每个请求经过的服务器数
+        self.waits = array('d')  # 合并到进行中回源请求时的等待时间
+
+    def _server_id(self, server):
+        if server not in self.server_ids:
+            self.server_ids[server] = len(self.server_ids)
+        return self.server_ids[server]
+
+    def propagation(self, distance):
+        """往返传播时延（秒），distance 可以是标量或 numpy 数组"""
+        return 2 * distance / self.distance_unit
+
+    def record(self, now, trace, distance, filename):
+        """
+        登记一个已完成的请求。
+
+        :param now: 请求到达时间（秒），None 时按登记顺序和 arrival_rate 推算
+        :param trace: 请求的 RequestTrace
+        :param distance: 用户到边缘节点以及沿路径各跳的距离之和
+        """
+        if now is None:
+            now = len(self.times) / self.arrival_rate
+        tiers = ['peer' if hop is trace.peer else hop.tier for hop in trace.hops]
+        self.times.append(now)
+        self.distances.append(distance)
+        self.sizes.append(self.file_sizes.get(filename, 0))
+        self.path_bandwidths.append(min(self.bandwidth[tier] for tier in tiers))
+        path = trace.hops + trace.wasted_probes
+        self.hop_ids.extend(self._server_id(server) for server in path)
+        self.hop_counts.append(len(path))
+        self.waits.append(trace.wait)
+
+    def components(self):
+        """返回每个请求的 (传播, 传输, 排队) 时延数组（秒）"""
+        distances = np.frombuffer(self.distances, dtype=float)
+        propagation = self.propagation(distances)
+        transfer = np.frombuffer(self.sizes, dtype=float) / np.frombuffer(self.path_bandwidths, dtype=float)
+        queueing = self._queueing()
+        return propagation, transfer, queueing
+
+    def _queueing(self):
+        n = len(self.times)
+        if n == 0:
+            return np.zeros(0)
+        windows = (np.frombuffer(self.times, dtype=float) // self.window).astype(np.int64)
+        hop_ids = np.frombuffer(self.hop_ids, dtype=np.int32).astype(np.int64)
+        request_of_hop = np.repeat(np.arange(n), np.frombuffer(self.hop_counts, dtype=np.int32))
+        num_servers = max(len(self.server_ids), 1)
+
+        # 每个（服务器, 时间窗口）的到达数：路径上的每台服务器都处理一次该请求
+        hop_keys = windows[request_of_hop] * num_servers + hop_ids
+        _, hop_index, counts = np.unique(hop_keys, return_inverse=True, return_counts=True)
+
+        mu = self.service_rate
+        rho = np.minimum(counts / self.window / mu, self.max_utilization)
+        sojourn = rho / (mu * (1 - rho)) + 1 / mu  # 等待时间 + 服务时间
+
+        queueing = np.bincount(request_of_hop, weights=sojourn[hop_index.reshape(-1)], minlength=n)
+        return queueing + np.frombuffer(self.waits, dtype=float)
+
+    def response_times(self):
+        """所有已登记请求的总时延（秒）"""
+        propagation, transfer, queueing = self.components()
+        return propagation + transfer + queueing
+
+    def breakdown(self):
+        """各部分的平均时延（毫秒）"""
+        if not len(self.times):
+            return {'propagation': 0.0, 'transfer': 0.0, 'queueing': 0.0}
+        propagation, transfer, queueing = self.components()
+        return {'propagation': float(propagation.mean() * 1000), 'transfer': float(transfer.mean() * 1000),
+                'queueing': float(queueing.mean() * 1000)}
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+
+import numpy as np
+
+from modules.nearest_server import NearestServerScheduler
+from server.content_store import MappedContentStore
+
+HOST = '127.0.0.1'
+
+
+async def _exchange(reader, writer, filename):
+    """在一条 keep-alive 连接上发送 GET 请求，返回 (状态码, X-Cache, 内容)"""
+    writer.write(f'GET /{filename} HTTP/1.1\r\nHost: {HOST}\r\n\r\n'.encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed by peer')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('x-cache'), body
+
+
+class ConnectionPool:
+    """到一个端点的 keep-alive 连接池，最多同时打开 size 条连接，其余请求排队等待"""
+
+    def __init__(self, port, size=8):
+        self.port = port
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def fetch(self, filename):
+        async with self.slots:
+            reader, writer = self.idle.pop() if self.idle else await asyncio.open_connection(HOST, self.port)
+            try:
+                result = await _exchange(reader, writer, filename)
+            except BaseException:
+                writer.close()
+                raise
+            self.idle.append((reader, writer))
+            return result
+
+    async def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        for _, writer in self.idle:
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.idle.clear()
+
+
+class ServerEndpoint:
+    """
+    把一个 Server 作为 localhost 上的 asyncio HTTP 端点运行。
+    命中时通过 mmap 提供文件内容；未命中时经 socket 向上游端点（区域节点或源站）获取后接纳进缓存。
+    """
+
+    def __init__(self, server, upstream=None, upstream_connections=8):
+        self.server = server
+        self.upstream = upstream
+        self.upstream_connections = upstream_connections
+        if server.content is None:
+            server.content = MappedContentStore(server.data_dir, sink=None)
+        self.pool = None
+        self.port = None
+        self.requests = 0
+        self.hits = 0
+        self.bytes_sent = 0
+        self._server = None
+        self._connections = {}  # 连接的 writer -> 处理该连接的任务
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, HOST, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.upstream is not None:
+            self.pool = ConnectionPool(self.upstream.port, self.upstream_connections)
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        await self._server.wait_closed()
+        if self.pool is not None:
+            await self.pool.close()
+
+    async def _respond(self, filename):
+        self.requests += 1
+        self.server.request_count += 1
+        if self.server.cache_strategy.access(filename):
+            self.hits += 1
+            self.server.request_small_count += 1
+            return 200, 'HIT', self.server.content.serve(filename)
+        if self.pool is None:
+            return 404, 'MISS', b''
+        status, _, body = await self.pool.fetch(filename)
+        if status == 200:
+            self.server.add_file(filename)
+        return status, 'MISS', body
+
+    async def _handle(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                filename = request_line.split()[1].decode().lstrip('/')
+                status, cache_status, body = await self._respond(filename)
+                writer.write(f'HTTP/1.1 {status} {"OK" if status == 200 else "Not Found"}\r\n'
+                             f'Content-Length: {len(body)}\r\nX-Cache: {cache_status}\r\n\r\n'.encode())
+                writer.write(body)
+                self.bytes_sent += len(body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    def hit_rate(self):
+        return self.hits / self.requests * 100 if self.requests else 0.0
+
+
+async def start_cluster(main_server, servers, upstream_connections=8):
+    """按 源站 -> 区域节点 -> 边缘节点 的顺序启动端点，返回 {Server: ServerEndpoint}"""
+    endpoints = {}
+    for server in [main_server] + main_server.region_servers + list(servers):
+        upstream = endpoints.get(server.main_server) if server.main_server is not None else None
+        endpoint = ServerEndpoint(server, upstream, upstream_connections)
+        await endpoint.start()
+        endpoints[server] = endpoint
+    return endpoints
+
+
+async def stop_cluster(endpoints):
+    for endpoint in reversed(list(endpoints.values())):
+        await endpoint.stop()
+
+
+def build_plan(user_requests, user_positions, servers, num_requests_per_user, scheduler=None):
+    """
+    把每个用户的请求分配到边缘节点，按轮次交错（所有用户的第 1 个请求，然后第 2 个 ...）。
+
+    :param user_positions: 用户名 -> 位置
+    :return: [(边缘节点下标, 文件名)]
+    """
+    scheduler = scheduler if scheduler is not None else NearestServerScheduler(servers)
+    index_of = {server: i for i, server in enumerate(servers)}
+    plan = []
+    for k in range(num_requests_per_user):
+        for username, requests in user_requests.items():
+            if k < len(requests):
+                filename = str(requests[k])
+                server = scheduler.get_next_server(user_positions[username], filename)
+                plan.append((index_of[server], filename))
+    return plan
+
+
+async def run_load(endpoints, plan, arrival_rate, concurrency=64, rng=None):
+    """
+    开环回放：请求按速率为 arrival_rate 的泊松过程安排发送时间，不等待之前的响应；
+    每个边缘节点最多 concurrency 条并发连接。时延从计划发送时间算起，排队等连接的时间也计入。
+
+    :param endpoints: 边缘节点端点列表，与 plan 中的下标对应
+    :return: 吞吐量、时延分位数和每个端点命中率的报告
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    loop = asyncio.get_running_loop()
+    pools = [ConnectionPool(endpoint.port, concurrency) for endpoint in endpoints]
+    offsets = np.cumsum(rng.exponential(1.0 / arrival_rate, size=len(plan)))
+    latencies = np.zeros(len(plan))
+    errors = 0
+    bytes_received = 0
+
+    async def send(i, edge_index, filename, scheduled):
+        nonlocal errors, bytes_received
+        try:
+            status, _, body = await pools[edge_index].fetch(filename)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            status, body = None, b''
+        latencies[i] = loop.time() - scheduled
+        if status != 200:
+            errors += 1
+        bytes_received += len(body)
+
+    start = loop.time()
+    tasks = []
+    for i, ((edge_index, filename), offset) in enumerate(zip(plan, offsets)):
+        scheduled = start + offset
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(send(i, edge_index, filename, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+    for pool in pools:
+        await pool.close()
+
+    report = {
+        'requests': len(plan),
+        'errors': errors,
+        'elapsed_s': elapsed,
+        'offered_rps': arrival_rate,
+        'throughput_rps': len(plan) / elapsed if elapsed else 0.0,
+        'throughput_mbps': bytes_received * 8 / elapsed / 1e6 if elapsed else 0.0,
+        'server_hit_rates': [endpoint.hit_rate() for endpoint in endpoints],
+        'server_requests': [endpoint.requests for endpoint in endpoints],
+    }
+    for q in (50, 90, 99):
+        report[f'p{q}_ms'] = float(np.percentile(latencies, q)) * 1000 if len(plan) else 0.0
+    return report
+
+
+async def run_live(main_server, servers, plan, arrival_rate, concurrency=64, upstream_connections=8, rng=None):
+    """启动集群、回放请求计划、关闭集群，返回 run_load 的报告（附带源站收到的请求数）"""
+    endpoints = await start_cluster(main_server, servers, upstream_connections)
+    try:
+        report = await run_load([endpoints[server] for server in servers], plan, arrival_rate, concurrency, rng)
+        report['origin_requests'] = endpoints[main_server].requests
+    finally:
+        await stop_cluster(endpoints)
+    return report
+
+
+def main(argv=None):
+    from server.server_initialization import generate_positions, initialize_servers
+    from server.user_initialization import generate_user_positions, generate_user_requests_zipf
+
+    parser = argparse.ArgumentParser(description='Replay a Zipf workload against a live localhost cluster')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--requests-per-user', type=int, default=5)
+    parser.add_argument('--servers', type=int, default=9)
+    parser.add_argument('--cache-strategy', default='COMPACT_LRU')
+    parser.add_argument('--cache-size', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=500.0, help='offered load, requests per second')
+    parser.add_argument('--concurrency', type=int, default=64, help='max connections per edge')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default='live_data')
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.data_dir):
+        shutil.rmtree(args.data_dir)
+    os.makedirs(args.data_dir)
+    main_server, servers = initialize_servers(args.data_dir, args.servers, generate_positions(args.servers, 500),
+                                              main_server_position=(0, 0), cache_size=args.cache_size,
+                                              cache_strategy_class=args.cache_strategy, top_n_files=[])
+    request_list = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+    positions = generate_user_positions(args.users, 1000, rng=random.Random(args.seed))
+    user_requests = generate_user_requests_zipf(request_list, args.users, args.requests_per_user, zipf_s=1.0,
+                                                rng=np.random.default_rng(args.seed))
+    user_positions = {f'user_{i + 1}': position for i, position in enumerate(positions)}
+    plan = build_plan(user_requests, user_positions, servers, args.requests_per_user)
+
+    try:
+        report = asyncio.run(run_live(main_server, servers, plan, args.rate, args.concurrency,
+                                      rng=np.random.default_rng(args.seed)))
+    finally:
+        for server in servers + [main_server]:
+            server.close()
+        shutil.rmtree(args.data_dir)
+
+    print(f"Requests: {report['requests']} ({report['errors']} errors) in {report['elapsed_s']:.2f}s, "
+          f"offered {report['offered_rps']:.0f} req/s, achieved {report['throughput_rps']:.0f} req/s, "
+          f"{report['throughput_mbps']:.0f} Mbit/s")
+    print(f"Latency p50/p90/p99: {report['p50_ms']:.1f} / {report['p90_ms']:.1f} / {report['p99_ms']:.1f} ms")
+    print(f"Origin requests: {report['origin_requests']}")
+    for i, (hit_rate, requests) in enumerate(zip(report['server_hit_rates'], report['server_requests'])):
+        print(f"Server {i + 1}: {requests} requests, hit rate {hit_rate:.1f}%")
+    return report
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
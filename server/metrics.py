@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+# 响应时间直方图的桶上界（秒），最后隐含 +Inf
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}' if labels else ''
+
+
+class MetricsExporter:
+    """
+    仿真运行期间以 Prometheus 文本格式发布每台服务器的计数器、吞吐量和响应时间直方图，
+    写到 path 指定的文件（原子替换），和/或通过 localhost:port 的 /metrics 提供。
+
+    请求循环每 every 个请求调用一次 maybe_publish()，距上次发布不足 interval 秒时直接返回；
+    直方图在发布时用 numpy 对新增的响应时间一次性分桶，请求循环中没有额外的逐请求开销。
+    """
+
+    def __init__(self, path=None, port=None, interval=5.0, every=500, buckets=DEFAULT_BUCKETS):
+        """
+        :param path: Prometheus 文本文件路径（可交给 node_exporter 的 textfile collector），None 表示不写文件
+        :param port: 不为 None 时在 127.0.0.1:port 上启动 HTTP 端点，0 表示随机端口（见 self.port）
+        :param interval: 两次发布之间的最短时间（秒）
+        :param every: 请求循环每隔多少个请求检查一次是否需要发布
+        """
+        self.path = path
+        self.interval = interval
+        self.every = every
+        self.buckets = np.asarray(buckets, dtype=float)
+        self.text = ''
+        self.publish_count = 0
+        self.publish_time = 0.0  # 发布本身花费的时间，用于确认开销可以忽略
+        self.cells_completed = 0
+        self._http = None
+        self.port = None
+        if port is not None:
+            self._start_http(port)
+        self.start_cell({})
+
+    def start_cell(self, labels):
+        """开始一个新的仿真单元，labels 为附加在所有指标上的标签，例如缓存策略和服务器数量"""
+        self.labels = dict(labels)
+        self.bucket_counts = np.zeros(len(self.buckets) + 1, dtype=np.int64)
+        self.observed = 0
+        self.observed_sum = 0.0
+        self.cell_start = time.monotonic()
+        self.last_publish = self.cell_start
+        self.last_observed = 0
+        self.throughput = 0.0
+
+    def end_cell(self, simulation, response_times):
+        """仿真单元结束：用最终的响应时间（可能已被时延模型替换）重建直方图并立即发布"""
+        self.cells_completed += 1
+        self.bucket_counts[:] = 0
+        self.observed = 0
+        self.observed_sum = 0.0
+        self.last_observed = 0
+        self.last_publish = self.cell_start  # 最终的吞吐量为整个单元的平均值
+        self.publish(simulation, response_times)
+
+    def maybe_publish(self, simulation, response_times):
+        if time.monotonic() - self.last_publish >= self.interval:
+            self.publish(simulation, response_times)
+
+    def publish(self, simulation, response_times):
+        start = time.monotonic()
+        new_times = np.asarray(response_times[self.observed:], dtype=float)
+        if len(new_times):
+            # 与 Prometheus 的 le 语义一致：值等于上界时落在该桶
+            self.bucket_counts += np.bincount(np.searchsorted(self.buckets, new_times, side='left'),
+                                              minlength=len(self.bucket_counts))
+            self.observed_sum += float(new_times.sum())
+            self.observed += len(new_times)
+        elapsed = start - self.last_publish
+        if elapsed > 0:
+            self.throughput = (self.observed - self.last_observed) / elapsed
+        self.last_observed = self.observed
+        self.last_publish = start
+
+        self.text = self.render(simulation)
+        if self.path is not None:
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(self.text)
+            os.replace(tmp_path, self.path)
+        self.publish_count += 1
+        self.publish_time += time.monotonic() - start
+
+    def render(self, simulation):
+        """生成 Prometheus 文本格式"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels({**self.labels, **labels})} {value}')
+
+        servers = simulation.servers
+        per_server = [{'server': str(i + 1)} for i in range(len(servers))]
+        routed = [simulation.request_counts_by_server.get(i, 0) for i in range(len(servers))]
+        hits = simulation.hit_counts_by_server
+        metric('cdn_server_routed_requests_total', 'counter', 'Requests routed to the server by the scheduler.',
+               zip(per_server, routed))
+        metric('cdn_server_hits_total', 'counter', 'Requests served from the server cache.', zip(per_server, hits))
+        metric('cdn_server_misses_total', 'counter', 'Requests the server had to fetch upstream.',
+               zip(per_server, [count - hit for count, hit in zip(routed, hits)]))
+        metric('cdn_server_request_count', 'counter', 'Server.request_count.',
+               zip(per_server, [server.request_count for server in servers]))
+        metric('cdn_server_request_small_count', 'counter', 'Server.request_small_count.',
+               zip(per_server, [server.request_small_count for server in servers]))
+        metric('cdn_server_bytes_served_total', 'counter', 'Bytes served from the mapped content store.',
+               zip(per_server, [server.content.bytes_served if server.content is not None else 0
+                                for server in servers]))
+        metric('cdn_server_active_connections', 'gauge', 'Requests currently being processed by the server.',
+               zip(per_server, [server.active_connections for server in servers]))
+
+        metric('cdn_requests_total', 'counter', 'Requests simulated in the current cell.', [({}, self.observed)])
+        metric('cdn_throughput_requests_per_second', 'gauge', 'Simulated requests per wall-clock second.',
+               [({}, f'{self.throughput:.3f}')])
+        metric('cdn_hit_ratio', 'gauge', 'Cache hit ratio of the current cell.',
+               [({}, f'{simulation.total_hits / self.observed:.6f}' if self.observed else 0)])
+        metric('cdn_cells_completed_total', 'counter', 'Sweep cells finished by this process.',
+               [({}, self.cells_completed)])
+        metric('cdn_metrics_publish_seconds_total', 'counter', 'Wall time spent publishing metrics.',
+               [({}, f'{self.publish_time:.6f}')])
+
+        name = 'cdn_response_time_seconds'
+        lines.append(f'# HELP {name} Simulated response time per request.')
+        lines.append(f'# TYPE {name} histogram')
+        cumulative = np.cumsum(self.bucket_counts)
+        for bound, count in zip([f'{bound:g}' for bound in self.buckets] + ['+Inf'], cumulative.tolist()):
+            lines.append(f'{name}_bucket{_format_labels({**self.labels, "le": bound})} {count}')
+        lines.append(f'{name}_sum{_format_labels(self.labels)} {self.observed_sum:.6f}')
+        lines.append(f'{name}_count{_format_labels(self.labels)} {self.observed}')
+        return '\n'.join(lines) + '\n'
+
+    def _start_http(self, port):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = exporter.text.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.port = self._http.server_address[1]
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    def close(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
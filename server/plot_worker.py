@@ -0,0 +1,63 @@
+import multiprocessing
+import pickle
+import traceback
+
+
+def _run_chart(name, args, kwargs):
+    from server import plotting
+    getattr(plotting, name)(*args, **kwargs)
+
+
+def _worker_loop(tasks):
+    """后台绘图进程：依次取出绘图任务并执行，直到收到 None"""
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        name, payload = task
+        try:
+            args, kwargs = pickle.loads(payload)
+            _run_chart(name, args, kwargs)
+        except Exception:
+            print(f"Plot task {name} failed:\n{traceback.format_exc()}", flush=True)
+
+
+class PlotWorker:
+    """
+    把图表渲染移出仿真主循环：主进程只把结果记录放入队列，
+    由独立进程导入 matplotlib 并绘图，仿真不会等待渲染。
+    """
+
+    def __init__(self, background=True):
+        self.background = background
+        self.submitted = 0
+        self.tasks = None
+        self.process = None
+        if background:
+            # 使用 spawn 启动，子进程不继承主进程中的 sqlite 连接，主进程也无需导入 matplotlib
+            context = multiprocessing.get_context('spawn')
+            self.tasks = context.Queue()
+            self.process = context.Process(target=_worker_loop, args=(self.tasks,), daemon=True)
+            self.process.start()
+
+    def submit(self, name, *args, **kwargs):
+        """提交一个绘图任务，name 为 server.plotting 中的函数名"""
+        self.submitted += 1
+        if self.background:
+            # 立即序列化，之后主进程继续修改这些数据也不会影响图表
+            self.tasks.put((name, pickle.dumps((args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)))
+        else:
+            _run_chart(name, args, kwargs)
+
+    def close(self):
+        """等待所有已提交的图表绘制完成"""
+        if self.process is not None:
+            self.tasks.put(None)
+            self.process.join()
+            self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
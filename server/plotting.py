@@ -1,31 +1,435 @@
+import os
+from collections import Counter
+
+import matplotlib
+matplotlib.use('Agg')  # 只输出文件，可在后台进程中使用
 import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from server.user_initialization import generate_zipf_distribution
+
+def plot_positions(user_positions, server_positions, user_server_connections, filename="positions.png",
+                   density_threshold=20000):
+    """
+    绘制用户和服务器的位置图，并绘制用户与选择服务器之间的连线，最后保存为图片。
 
-def plot_positions(user_positions, server_positions, user_server_connections, filename="positions.png"):
-    """绘制用户和服务器的位置图，并绘制用户与选择服务器之间的连线，最后保存为图片"""
+    所有连线作为一个 LineCollection 一次性绘制；用户数超过 density_threshold 时，
+    改为把连线栅格化成密度图，避免生成数万个图元。
+    """
     # for idx, (user_pos, server_idx) in enumerate(user_server_connections):
     #     print(f"User {idx + 1} at {user_pos} is connected to Server {server_idx + 1} at {server_positions[server_idx]}")
 
-    user_x, user_y = zip(*user_positions)
-    server_x, server_y = zip(*server_positions)
+    users = np.asarray(user_positions, dtype=float)
+    servers = np.asarray(server_positions, dtype=float)
 
-    plt.figure(figsize=(10, 8))
+    fig, ax = plt.subplots(figsize=(10, 8))
 
     # 绘制用户与其对应的服务器之间的连线
-    for user_pos, server_index in user_server_connections:
-        server_pos = server_positions[server_index]
-        plt.plot([user_pos[0], server_pos[0]], [user_pos[1], server_pos[1]], color='gray', linewidth=0.5)
+    if user_server_connections:
+        starts = np.asarray([user_pos for user_pos, _ in user_server_connections], dtype=float)
+        ends = servers[[server_index for _, server_index in user_server_connections]]
+        if len(starts) > density_threshold:
+            _draw_link_density(ax, starts, ends)
+        else:
+            segments = np.stack([starts, ends], axis=1)
+            ax.add_collection(LineCollection(segments, colors='gray', linewidths=0.5, rasterized=True))
+            ax.autoscale_view()
 
     # 绘制用户和服务器的位置
-    plt.scatter(user_x, user_y, c='blue', label='Users', marker='o', s=1)
-    plt.scatter(server_x, server_y, c='red', label='Servers', marker='^', s=50)
-    plt.scatter(0, 0, c='green', label='Main Server', marker='s', s=80)  # 主服务器在原点
+    if len(users) <= density_threshold:
+        ax.scatter(users[:, 0], users[:, 1], c='blue', label='Users', marker='o', s=1)
+    ax.scatter(servers[:, 0], servers[:, 1], c='red', label='Servers', marker='^', s=50)
+    ax.scatter(0, 0, c='green', label='Main Server', marker='s', s=80)  # 主服务器在原点
+
+    ax.set_xlabel('X Position')
+    ax.set_ylabel('Y Position')
+    ax.set_title('User and Server Positions')
+    ax.legend()
+    ax.grid(True)
+    fig.savefig(filename)
+    plt.close(fig)
+
+def _draw_link_density(ax, starts, ends, bins=400, samples_per_link=24):
+    """沿每条连线均匀采样，用二维直方图表示连线密度"""
+    t = np.linspace(0.0, 1.0, samples_per_link)[:, None, None]
+    points = (starts[None, :, :] + t * (ends - starts)[None, :, :]).reshape(-1, 2)
+    x_range = (min(points[:, 0].min(), 0), max(points[:, 0].max(), 0))
+    y_range = (min(points[:, 1].min(), 0), max(points[:, 1].max(), 0))
+    density, x_edges, y_edges = np.histogram2d(points[:, 0], points[:, 1], bins=bins, range=[x_range, y_range])
+    ax.imshow(np.log1p(density.T), origin='lower', cmap='Greys', aspect='auto',
+              extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]))
+
+def render_cell_charts(record):
+    """根据一个仿真单元的结果记录绘制该单元的全部图表（位置图、命中率、负载分布、Zipf 对比）"""
+    num_servers = record['num_servers']
+    output_dir = record['output_dir']
+    if record.get('user_server_connections') is not None:
+        plot_positions(record['user_positions'], record['server_positions'], record['user_server_connections'],
+                       filename=os.path.join(output_dir, 'position', f"positions_{num_servers}.png"))
+    plot_hit_rate(record['request_counts'], record['request_small_counts'], num_servers, output_dir)
+    plot_server_request_distribution(record['request_counts'], output_dir=output_dir,
+                                     filename=f"server_request_distribution_{num_servers}.png")
+    verify_zipf_distribution(record['file_request_counts'], record['request_list'], zipf_s=record['zipf_s'],
+                             filename=os.path.join(output_dir, f"file_request_distribution_{num_servers}_servers.png"))
+
+def plot_server_request_distribution(request_counts, output_dir, filename="server_request_distribution.png"):
+    """
+    绘制每个服务器的请求分布图，并保存到指定的文件夹中
+    :param request_counts: 每个服务器处理的请求数
+    :param output_dir: 保存图表的文件夹路径
+    :param filename: 保存图表的文件名
+    """
+    # for i, server in enumerate(servers):
+    #     print(f"Server {i + 1} has {server.request_count} requests.")
+
+    # 创建子文件夹用于保存负载分布图表
+    server_distribution_dir = os.path.join(output_dir, "server_load_distribution")
+    os.makedirs(server_distribution_dir, exist_ok=True)
+
+    server_ids = [f"Server {i+1}" for i in range(len(request_counts))]
+
+    plt.figure(figsize=(12, 6))
+    plt.bar(server_ids, request_counts, color='skyblue')
+    plt.xlabel('Servers')
+    plt.ylabel('Number of Requests')
+    plt.title('Server Request Distribution')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+
+    # 保存图表到指定文件夹
+    save_path = os.path.join(server_distribution_dir, filename)
+    plt.savefig(save_path)
+    plt.close()
+
+def plot_scalability_analysis(results, filename="scalability_analysis.png", predicted=None):
+    """
+    绘制服务器数量与平均响应时间和标准差的关系图。
+
+    :param results: 包含每个服务器数量对应的总响应时间和标准差的列表
+    :param filename: 保存图表的文件名
+    :param predicted: 可选的解析估计 [(服务器数量, 平均响应时间 ms)]，以虚线叠加在平均响应时间曲线上
+    """
+    num_servers_list = [r[0] for r in results]
+    average_response_times = [r[1] * 1000 / (r[3]) for r in results]  # r[3] 是总请求数
+    response_time_stds = [r[2] for r in results]
+
+    fig, ax1 = plt.subplots()
+
+    color = 'tab:blue'
+    ax1.set_xlabel('Number of Servers')
+    ax1.set_ylabel('Average Response Time (ms)', color=color)
+    ax1.plot(num_servers_list, average_response_times, 'o-', color=color, label='Avg Response Time')
+    ax1.tick_params(axis='y', labelcolor=color)
+    y_values = list(average_response_times)
+    if predicted:
+        ax1.plot([p[0] for p in predicted], [p[1] for p in predicted], 'x:', color='tab:green',
+                 label='Analytical Estimate')
+        y_values += [p[1] for p in predicted]
+
+    # Manually adjust the y-axis limits if needed
+    ax1.set_ylim([min(y_values) - 10, max(y_values) + 10])
+
+    ax2 = ax1.twinx()
+    color = 'tab:orange'
+    ax2.set_ylabel('Standard Deviation (s)', color=color)
+    ax2.plot(num_servers_list, response_time_stds, 'o--', color=color, label='Std Dev')
+    ax2.tick_params(axis='y', labelcolor=color)
 
-    plt.xlabel('X Position')
-    plt.ylabel('Y Position')
-    plt.title('User and Server Positions')
+    # Ensure the right y-axis is in a comparable range
+    ax2.set_ylim([min(response_time_stds) - 0.01, max(response_time_stds) + 0.01])
+
+    fig.tight_layout(rect=[0, 0, 1, 0.95])  # Adjust the layout to make space for the title
+    plt.title('Scalability Analysis: Servers vs Response Time')
+    fig.legend(loc="upper left", bbox_to_anchor=(0.1, 0.9))
+    plt.subplots_adjust(top=0.9)  # Manually adjust the top space to fit the title
+    plt.savefig(filename)
+    plt.close()
+
+def plot_rectangular_response_time(num_servers_list, average_response_time_list, std_dev_list, filename):
+    """绘制仅当节点排列为矩形时的平均响应时间和标准差"""
+    fig, ax1 = plt.subplots()
+
+    color = 'tab:blue'
+    ax1.set_xlabel('Number of Servers')
+    ax1.set_ylabel('Average Response Time (ms)', color=color)
+    ax1.plot(num_servers_list, average_response_time_list, color=color, label='Avg Response Time', marker='o')
+    ax1.tick_params(axis='y', labelcolor=color)
+
+    # Manually adjust the y-axis limits if needed
+    ax1.set_ylim([min(average_response_time_list) - 10, max(average_response_time_list) + 10])
+
+    ax2 = ax1.twinx()
+    color = 'tab:orange'
+    ax2.set_ylabel('Standard Deviation (s)', color=color)
+    ax2.plot(num_servers_list, std_dev_list, color=color, linestyle='--', label='Std Dev', marker='o')
+    ax2.tick_params(axis='y', labelcolor=color)
+
+    # Ensure the right y-axis is in a comparable range
+    ax2.set_ylim([min(std_dev_list) - 0.01, max(std_dev_list) + 0.01])
+
+    fig.tight_layout(rect=[0, 0, 1, 0.95])  # Adjust layout to not cut off title
+    plt.title('Rectangular Grid - Average Response Time & Std Dev')
+    fig.legend(loc="upper left", bbox_to_anchor=(0.1, 0.9))
+    plt.savefig(filename)
+    plt.close()
+
+
+#
+# def plot_hexagonal_response_time(num_servers_list, average_response_time_list, std_dev_list, filename):
+#     """绘制完整六边形网格布局的平均响应时间和标准差"""
+#     # 完整六边形的服务器数量
+#     valid_num_servers = {6, 18, 36, 60}
+#
+#     # 筛选出有效的服务器数量对应的数据
+#     filtered_servers = [num for num in num_servers_list if num in valid_num_servers]
+#     filtered_avg_time = [average_response_time_list[i] for i, num in enumerate(num_servers_list) if num in valid_num_servers]
+#     filtered_std_dev = [std_dev_list[i] for i, num in enumerate(num_servers_list) if num in valid_num_servers]
+#
+#     fig, ax1 = plt.subplots()
+#
+#     color = 'tab:blue'
+#     ax1.set_xlabel('Number of Servers')
+#     ax1.set_ylabel('Average Response Time (ms)', color=color)
+#     ax1.plot(filtered_servers, filtered_avg_time, 'o-', color=color, label='Avg Response Time')
+#     ax1.tick_params(axis='y', labelcolor=color)
+#
+#     ax2 = ax1.twinx()
+#     color = 'tab:orange'
+#     ax2.set_ylabel('Standard Deviation (s)', color=color)
+#     ax2.plot(filtered_servers, filtered_std_dev, 'o--', color=color, label='Std Dev')
+#     ax2.tick_params(axis='y', labelcolor=color)
+#
+#     fig.tight_layout()
+#     fig.legend(loc='upper right', bbox_to_anchor=(1, 1), bbox_transform=ax1.transAxes)
+#     plt.title('Hexagonal Grid - Average Response Time & Std Dev')
+#     plt.savefig(filename)
+#     plt.close()
+
+
+def plot_ribbon_graph(num_servers_list, strategies_data, scheduler_type, output_dir='.'):
+    """
+    绘制四张图，分别显示不同调度器下缓存策略的平均时间对比和标准差对比。
+
+    :param num_servers_list: 服务器数量列表
+    :param strategies_data: 缓存策略数据字典，包含平均时间和标准差
+    :param scheduler_type: 调度器类型
+    :param output_dir: 保存图表的文件夹路径
+    """
+
+    # 绘制平均响应时间对比图
+    plt.figure(figsize=(12, 8))
+    for strategy_name, (avg_times, _) in strategies_data.items():
+        plt.plot(num_servers_list, avg_times, label=strategy_name)
+    plt.xlabel('Number of Servers')
+    plt.ylabel('Average Response Time (ms)')
+    plt.title(f'Average Response Time Comparison under {scheduler_type} Scheduler')
+    plt.legend(loc='upper left')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, f'{scheduler_type}_avg_response_time_comparison.png'))
+    plt.close()
+
+    # 绘制标准差对比图
+    plt.figure(figsize=(12, 8))
+    for strategy_name, (_, std_devs) in strategies_data.items():
+        plt.plot(num_servers_list, std_devs, label=strategy_name)
+    plt.xlabel('Number of Servers')
+    plt.ylabel('Standard Deviation (s)')
+    plt.title(f'Standard Deviation Comparison under {scheduler_type} Scheduler')
+    plt.legend(loc='upper left')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, f'{scheduler_type}_std_dev_comparison.png'))
+    plt.close()
+
+
+def plot_scheduler_comparison(num_servers_list, schedulers_data, cache_strategy, output_dir='.'):
+    """
+    对比不同调度器的负载均衡程度和时延。
+
+    :param schedulers_data: {调度器: {'avg_ms': [...], 'p99_ms': [...], 'load_cv': [...], 'routed': 最后一个单元每台服务器的请求数}}
+    :param cache_strategy: 缓存策略名，用于标题和文件名
+    """
+    fig, (ax_cv, ax_latency, ax_load) = plt.subplots(1, 3, figsize=(18, 6))
+    for scheduler_type, data in schedulers_data.items():
+        ax_cv.plot(num_servers_list, data['load_cv'], 'o-', markersize=3, label=scheduler_type)
+        line, = ax_latency.plot(num_servers_list, data['avg_ms'], 'o-', markersize=3, label=f'{scheduler_type} mean')
+        ax_latency.plot(num_servers_list, data['p99_ms'], '--', color=line.get_color(), label=f'{scheduler_type} p99')
+        ax_load.plot(sorted(data['routed'], reverse=True), label=scheduler_type)
+
+    ax_cv.set_xlabel('Number of Servers')
+    ax_cv.set_ylabel('Load CV (std / mean of requests per server)')
+    ax_cv.set_title('Load Imbalance')
+    ax_latency.set_xlabel('Number of Servers')
+    ax_latency.set_ylabel('Response Time (ms)')
+    ax_latency.set_title('Latency')
+    ax_load.set_xlabel(f'Server rank ({num_servers_list[-1]} servers)')
+    ax_load.set_ylabel('Requests Handled')
+    ax_load.set_title('Load Distribution')
+    for ax in (ax_cv, ax_latency, ax_load):
+        ax.grid(True)
+        ax.legend(fontsize='small')
+    fig.suptitle(f'Scheduler Comparison ({cache_strategy})')
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, f'{cache_strategy}_scheduler_comparison.png'))
+    plt.close(fig)
+
+def verify_zipf_distribution(user_requests, fixed_request_list, zipf_s, filename="files_distribution.png"):
+    """
+    验证用户请求的文件是否遵循Zipf分布。
+
+    :param user_requests: 用户请求的计数字典，键是文件名，值是请求次数或请求列表
+    :param fixed_request_list: 所有可请求的文件列表
+    :param zipf_s: Zipf分布的参数
+    :param filename: 保存图表的文件名
+    """
+    actual_file_counts = Counter()
+
+    # 如果 user_requests 的值是列表，首先将列表转换为次数
+    for key, value in user_requests.items():
+        if isinstance(value, list):
+            actual_file_counts[key] = len(value)  # 使用列表的长度作为计数
+        elif isinstance(value, int):
+            actual_file_counts[key] = value  # 如果已经是整数，直接使用
+
+    # 计算理想的Zipf分布
+    num_files = len(fixed_request_list)
+    ideal_weights = generate_zipf_distribution(num_files, s=zipf_s)
+    total_requests = sum(actual_file_counts.values())  # 计算请求总数
+    ideal_file_counts = ideal_weights * total_requests
+
+    # 绘制实际分布和理想分布的对比图
+    files = range(1, num_files + 1)
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(files, [actual_file_counts.get(file, 0) for file in fixed_request_list], 'o-', label='Actual Distribution')
+    plt.plot(files, ideal_file_counts, 'x--', label='Ideal Zipf Distribution')
+    plt.xlabel('File Rank')
+    plt.ylabel('Number of Requests')
+    plt.title('Comparison of Actual and Ideal Zipf Distribution')
     plt.legend()
     plt.grid(True)
+    plt.tight_layout()
     plt.savefig(filename)
     plt.close()
 
+def plot_hit_rate(request_counts, request_small_counts, num_servers, output_dir):
+    hit_rate_dir = os.path.join(output_dir, 'hit_rate')  # 子文件夹路径
+    os.makedirs(hit_rate_dir, exist_ok=True)
+    small_server_hit_rates = []
+
+    # 计算每个服务器的小服务器命中率
+    for request_count, request_small_count in zip(request_counts, request_small_counts):
+        if request_count > 0:  # 避免除以零
+            small_server_hit_rate = (request_small_count / request_count) * 100
+        else:
+            small_server_hit_rate = 0.0
+        small_server_hit_rates.append(small_server_hit_rate)
+
+    # 生成图表
+    plt.figure(figsize=(12, 6))
+    plt.bar([f"Server {i + 1}" for i in range(len(request_counts))], small_server_hit_rates, color='green')
+    plt.xlabel('Servers')
+    plt.ylabel('Hit Rate (%)')
+    plt.title(f'Small Server Hit Rate Distribution for {num_servers} Servers')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+
+    hit_rate_filename = os.path.join(hit_rate_dir, f"small_server_hit_rate_{num_servers}_servers.png")
+    plt.savefig(hit_rate_filename)  # 保存图表
+    plt.close()
 
+# def plot_rectangular_ribbon_graph(num_servers_list, strategies_data, filename):
+#     plt.figure(figsize=(12, 8))
+#
+#     for strategy_name, (avg_times, _) in strategies_data.items():
+#         # 使用 num_servers_list 过滤 avg_times 以匹配长度
+#         filtered_avg_times = [avg_times[num_servers_list.index(ns)] for ns in num_servers_list if ns in num_servers_list]
+#
+#         if len(num_servers_list) != len(filtered_avg_times):
+#             print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_avg_times)}. Skipping plot.")
+#             continue
+#
+#         plt.plot(num_servers_list, filtered_avg_times, label=strategy_name)
+#         plt.fill_between(num_servers_list, filtered_avg_times, alpha=0.2)
+#
+#     plt.xlabel('Number of Servers')
+#     plt.ylabel('Average Response Time (ms)')
+#     plt.title('Rectangular Grid - Average Response Time Comparison')
+#     plt.legend(loc='upper left')
+#     plt.grid(True)
+#     plt.tight_layout()
+#     plt.savefig(filename)
+#     plt.close()
+#
+# def plot_rectangular_std_ribbon_graph(num_servers_list, strategies_data, filename):
+#     plt.figure(figsize=(12, 8))
+#
+#     for strategy_name, (_, std_devs) in strategies_data.items():
+#         # 使用 num_servers_list 过滤 std_devs 以匹配长度
+#         filtered_std_devs = [std_devs[num_servers_list.index(ns)] for ns in num_servers_list if ns in num_servers_list]
+#
+#         if len(num_servers_list) != len(filtered_std_devs):
+#             print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_std_devs)}. Skipping plot.")
+#             continue
+#
+#         plt.plot(num_servers_list, filtered_std_devs, label=strategy_name)
+#         plt.fill_between(num_servers_list, filtered_std_devs, alpha=0.2)
+#
+#     plt.xlabel('Number of Servers')
+#     plt.ylabel('Standard Deviation (s)')
+#     plt.title('Rectangular Grid - Standard Deviation Comparison')
+#     plt.legend(loc='upper left')
+#     plt.grid(True)
+#     plt.tight_layout()
+#     plt.savefig(filename)
+#     plt.close()
+
+def filter_valid_data(num_servers_list, data):
+    # 过滤出与 num_servers_list 长度一致的数据
+    return [data[i] for i in range(len(data)) if i < len(num_servers_list)]
+
+def plot_rectangular_ribbon_graph(num_servers_list, strategies_data, filename):
+    plt.figure(figsize=(12, 8))
+
+    for strategy_name, (avg_times, _) in strategies_data.items():
+        # 过滤出有效的数据点
+        filtered_avg_times = filter_valid_data(num_servers_list, avg_times)
+
+        if len(num_servers_list) != len(filtered_avg_times):
+            print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_avg_times)}. Skipping plot.")
+            continue
+
+        plt.plot(num_servers_list, filtered_avg_times, label=strategy_name)
+
+    plt.xlabel('Number of Servers')
+    plt.ylabel('Average Response Time (ms)')
+    plt.title('Rectangular Grid - Average Response Time Comparison')
+    plt.legend(loc='upper left')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.close()
+
+def plot_rectangular_std_ribbon_graph(num_servers_list, strategies_data, filename):
+    plt.figure(figsize=(12, 8))
+
+    for strategy_name, (_, std_devs) in strategies_data.items():
+        # 过滤出有效的数据点
+        filtered_std_devs = filter_valid_data(num_servers_list, std_devs)
+
+        if len(num_servers_list) != len(filtered_std_devs):
+            print(f"Warning: Length mismatch in strategy {strategy_name}. Expected {len(num_servers_list)}, got {len(filtered_std_devs)}. Skipping plot.")
+            continue
+
+        plt.plot(num_servers_list, filtered_std_devs, label=strategy_name)
+
+    plt.xlabel('Number of Servers')
+    plt.ylabel('Standard Deviation (s)')
+    plt.title('Rectangular Grid - Standard Deviation Comparison')
+    plt.legend(loc='upper left')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.close()
@@ -0,0 +1,112 @@
+class PopularityPrefetcher:
+    """
+    在线流行度跟踪与主动推送。
+
+    每个区域（挂在同一区域节点下的边缘节点；没有区域层时每个边缘节点自成一个区域）维护按请求数
+    指数衰减的文件计数，每隔 interval 个请求把各区域最热、但边缘节点尚未缓存的文件推送过去，
+    每轮推送的总字节数不超过 push_budget。
+    """
+
+    def __init__(self, servers, file_sizes, half_life=1000, interval=200, push_budget=4 * 1024 * 1024, top_k=None):
+        """
+        :param file_sizes: 文件名 -> 文件大小（字节），通常为源站的 catalog
+        :param half_life: 计数衰减一半所经过的请求数
+        :param interval: 每隔多少个请求推送一轮
+        :param push_budget: 每轮推送的字节数上限
+        :param top_k: 每个区域只考虑最热的 top_k 个文件，默认为边缘节点的缓存容量
+        """
+        self.file_sizes = file_sizes
+        self.half_life = half_life
+        self.interval = interval
+        self.push_budget = push_budget
+        self.top_k = top_k
+        self.region_of = {}
+        self.region_servers = {}
+        for server in servers:
+            upstream = server.main_server
+            region = upstream if upstream is not None and upstream.tier == 'region' else server
+            self.region_of[server] = region
+            self.region_servers.setdefault(region, []).append(server)
+        self.scores = {region: {} for region in self.region_servers}
+        # 前向衰减：第 t 个请求的权重为 2 ** ((t - base) / half_life)，比较相对大小时与逐个衰减等价
+        self.clock = 0
+        self.base = 0
+        self.pushed = {server: set() for server in servers}  # 已推送但尚未被请求过的文件
+        self.push_count = 0
+        self.bytes_pushed = 0
+        self.useful_pushes = 0  # 推送后第一次被请求时直接命中的次数
+
+    def record(self, server, filename, hit):
+        """登记一次路由到 server 的请求；hit 表示是否在该边缘节点命中"""
+        weight = 2.0 ** ((self.clock - self.base) / self.half_life)
+        scores = self.scores[self.region_of[server]]
+        scores[filename] = scores.get(filename, 0.0) + weight
+        if weight > 1e100:
+            self._rescale(weight)
+
+        pushed = self.pushed[server]
+        if filename in pushed:
+            pushed.discard(filename)
+            if hit:
+                self.useful_pushes += 1
+
+        self.clock += 1
+        if self.clock % self.interval == 0:
+            self.push()
+
+    def _rescale(self, weight):
+        """权重过大时整体缩放，避免浮点溢出"""
+        for scores in self.scores.values():
+            for filename in scores:
+                scores[filename] /= weight
+        self.base = self.clock
+
+    def push(self):
+        """
+        按衰减计数从高到低为各边缘节点挑选热门文件（每台最多挑满缓存容量），未缓存的文件占用本轮预算，直到用完。
+        之后每台节点先刷新已缓存的入选文件，再按计数从低到高推送新文件，使越热的文件越晚进入、越晚被淘汰，
+        本轮推送不会把更热的入选文件挤出缓存。
+        """
+        candidates = []
+        for region, scores in self.scores.items():
+            top_k = self.top_k or max(server.max_files for server in self.region_servers[region])
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            candidates.extend((score, filename, region) for filename, score in ranked)
+        candidates.sort(key=lambda item: item[0], reverse=True)
+
+        budget = self.push_budget
+        plans = {}  # 边缘节点 -> [(文件名, 是否已缓存)]，按计数从高到低
+        for _, filename, region in candidates:
+            size = self.file_sizes.get(filename, 0)
+            for server in self.region_servers[region]:
+                plan = plans.setdefault(server, [])
+                if len(plan) >= server.max_files:
+                    continue
+                # contains 只查询不改变替换状态；推送时被淘汰的文件之后也能再次推送
+                cached = server.cache_strategy.contains(filename)
+                if not cached:
+                    if size > budget:
+                        continue
+                    budget -= size
+                plan.append((filename, cached))
+
+        for server, plan in plans.items():
+            for filename, cached in reversed(plan):
+                if cached:
+                    server.add_file(filename)  # 由缓存策略决定是否更新顺序（LRU 移到最近使用端）
+            for filename, cached in reversed(plan):
+                if cached:
+                    continue
+                server.add_file(filename)
+                if not server.cache_strategy.contains(filename):
+                    continue  # 缓存策略拒绝接纳
+                self.pushed[server].add(filename)
+                self.push_count += 1
+                self.bytes_pushed += self.file_sizes.get(filename, 0)
+
+    def stats(self):
+        return {
+            'prefetch_pushes': self.push_count,
+            'prefetch_bytes': self.bytes_pushed,
+            'prefetch_useful': self.useful_pushes,
+        }
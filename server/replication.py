@@ -0,0 +1,74 @@
+import math
+from statistics import NormalDist
+
+
+def t_quantile(p, df):
+    """学生 t 分布的分位数：df<=2 用精确公式，其余用 Cornish-Fisher 展开（df>=3 时相对误差约 0.1% 以内）"""
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def confidence_interval(samples, confidence=0.95):
+    """返回样本均值和置信区间半宽"""
+    n = len(samples)
+    mean = sum(samples) / n
+    if n < 2:
+        return mean, float('inf')
+    variance = sum((x - mean) ** 2 for x in samples) / (n - 1)
+    return mean, t_quantile(0.5 + confidence / 2, n - 1) * math.sqrt(variance / n)
+
+
+def run_replications(run_cell, strategies, baseline=None, seeds=None, min_replications=3, max_replications=30,
+                     relative_precision=0.05, absolute_precision=0.0, confidence=0.95):
+    """
+    使用公共随机数（同一次重复中所有策略共用同一个种子）重复运行一个仿真单元，
+    直到每个策略相对基准策略的差值置信区间足够窄，或达到最大重复次数。
+
+    :param run_cell: run_cell(strategy, seed) -> 指标值（例如平均响应时间 ms）
+    :param strategies: 参与比较的策略列表
+    :param baseline: 基准策略，默认为第一个策略
+    :param seeds: 种子序列，默认为 0, 1, 2, ...
+    :param relative_precision: 差值置信区间半宽不超过 |差值均值| 的这个比例即停止
+    :param absolute_precision: 半宽不超过该绝对值时也停止（用于差值接近 0 的情况）
+    :return: 包含每个策略的样本、均值置信区间和与基准的差值置信区间的字典
+    """
+    baseline = baseline if baseline is not None else strategies[0]
+    seeds = list(seeds) if seeds is not None else list(range(max_replications))
+    samples = {strategy: [] for strategy in strategies}
+    summary = None
+
+    for replication, seed in enumerate(seeds[:max_replications], start=1):
+        for strategy in strategies:
+            samples[strategy].append(run_cell(strategy, seed))
+
+        summary = _summarize(samples, baseline, confidence)
+        summary['replications'] = replication
+        summary['seeds'] = seeds[:replication]
+        if replication >= min_replications and all(
+                half_width <= max(relative_precision * abs(mean), absolute_precision)
+                for mean, half_width in summary['differences'].values()):
+            summary['converged'] = True
+            return summary
+
+    if summary is not None:
+        summary['converged'] = False
+    return summary
+
+
+def _summarize(samples, baseline, confidence):
+    means = {strategy: confidence_interval(values, confidence) for strategy, values in samples.items()}
+    differences = {}
+    for strategy, values in samples.items():
+        if strategy == baseline:
+            continue
+        paired = [value - base for value, base in zip(values, samples[baseline])]
+        differences[strategy] = confidence_interval(paired, confidence)
+    return {'baseline': baseline, 'samples': samples, 'means': means, 'differences': differences}
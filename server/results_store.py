@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+# 唯一确定一个仿真单元的参数列
+# variant 为拓扑等可选仿真参数的 JSON 文本，未使用可选参数时为空字符串
+KEY_COLUMNS = ('layout', 'cache_strategy', 'scheduler', 'num_servers', 'seed',
+               'num_users', 'num_requests_per_user', 'max_files_per_server', 'variant')
+TEXT_KEY_COLUMNS = ('layout', 'cache_strategy', 'scheduler', 'variant')
+
+
+def cell_variant(options):
+    """把可选仿真参数（值为 None 的忽略）编码为稳定的 JSON 文本，作为结果键的一部分"""
+    options = {name: value for name, value in (options or {}).items() if value is not None}
+    return json.dumps(options, sort_keys=True, separators=(',', ':')) if options else ''
+
+
+def build_cell_record(user_simulation, servers, elapsed, origins=None):
+    """
+    从一次仿真中提取需要持久化的指标：均值、标准差、分位数、命中率和每台服务器的计数器
+
+    :param origins: 多源站时的全部源站，记录每个源站的回源请求数和平均回源时延
+    """
+    times = np.array([entry[2] for entry in user_simulation.user_response_times], dtype=float)
+    routed = np.array([user_simulation.request_counts_by_server[i] for i in range(len(servers))], dtype=float)
+    total_requests = len(times)
+    total_response_time = float(times.sum()) if total_requests else 0.0
+    record = {
+        'total_requests': total_requests,
+        'total_response_time': total_response_time,
+        'mean_response_ms': total_response_time * 1000 / total_requests if total_requests else 0.0,
+        'std_response_s': float(times.std()) if total_requests > 1 else 0.0,
+        'hit_rate': user_simulation.total_hits / total_requests * 100 if total_requests else 0.0,
+        'server_request_counts': [server.request_count for server in servers],
+        'server_small_counts': [server.request_small_count for server in servers],
+        'server_hits': list(user_simulation.hit_counts_by_server),
+        'server_routed': [int(count) for count in routed],
+        # 路由到各服务器的请求数的变异系数，衡量负载均衡程度
+        'load_cv': float(routed.std() / routed.mean()) if routed.sum() else 0.0,
+        'elapsed_s': elapsed,
+        'tier_requests': dict(user_simulation.tier_requests),
+        'tier_hits': dict(user_simulation.tier_hits),
+        'tier_latency_s': dict(user_simulation.tier_latency),
+        'peer_probes': sum(server.peer_probes for server in servers),
+        'peer_hits': sum(server.peer_hits for server in servers),
+        'peer_false_positives': sum(server.peer_false_positives for server in servers),
+        'digest_refreshes': sum(server.digest_refreshes for server in servers),
+        'digest_bytes_sent': sum(server.digest_bytes_sent for server in servers),
+        'coalesced_requests': sum(server.coalesced_count for server in servers),
+        'duplicate_fetches': sum(server.duplicate_fetch_count for server in servers),
+    }
+    if any(server.content is not None for server in servers):
+        record['server_bytes_served'] = [server.content.bytes_served for server in servers]
+        record['server_serve_mbps'] = [server.content.throughput() * 8 / 1e6 for server in servers]
+    if origins:
+        record['origin_request_counts'] = [user_simulation.origin_requests[origin] for origin in origins]
+        record['origin_avg_latency_s'] = [user_simulation.origin_latency[origin] / user_simulation.origin_requests[origin]
+                                          if user_simulation.origin_requests[origin] else 0.0 for origin in origins]
+    if user_simulation.latency_model is not None:
+        record['latency_breakdown_ms'] = user_simulation.latency_model.breakdown()
+    if user_simulation.prefetcher is not None:
+        record.update(user_simulation.prefetcher.stats())
+    for q in (50, 90, 99):
+        record[f'p{q}_ms'] = float(np.percentile(times, q)) * 1000 if total_requests else 0.0
+    return record
+
+
+class ResultsStore:
+    """
+    扫描结果的追加式存储（sqlite）：每个完成的仿真单元写入一行，每个指标占一列，
+    首次出现的新指标会自动加列；列表/字典类指标以 JSON 文本保存。
+    重启扫描时用 has_cell/get_cell 跳过已完成的单元。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        key_sql = ', '.join(f'{column} {"TEXT" if column in TEXT_KEY_COLUMNS else "INTEGER"}'
+                            for column in KEY_COLUMNS)
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS cells (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                          f'created_at REAL, {key_sql})')
+        self.columns = self._load_columns()
+        if 'variant' not in self.columns:
+            # 旧结果文件没有 variant 列，已有的单元都是未使用可选参数的仿真
+            self.conn.execute("ALTER TABLE cells ADD COLUMN variant TEXT DEFAULT ''")
+            self.columns = self._load_columns()
+        self.conn.commit()
+
+    def _load_columns(self):
+        return {row[1]: row[2] for row in self.conn.execute('PRAGMA table_info(cells)')}
+
+    def _ensure_column(self, name, value):
+        if name in self.columns:
+            return
+        if isinstance(value, bool) or isinstance(value, (int, np.integer)):
+            column_type = 'INTEGER'
+        elif isinstance(value, (float, np.floating)):
+            column_type = 'REAL'
+        else:
+            column_type = 'TEXT'
+        self.conn.execute(f'ALTER TABLE cells ADD COLUMN "{name}" {column_type}')
+        self.columns[name] = column_type
+
+    def _where(self, key):
+        clause = ' AND '.join(f'{column} IS ?' for column in KEY_COLUMNS)
+        return clause, [key.get(column, '' if column == 'variant' else None) for column in KEY_COLUMNS]
+
+    def has_cell(self, key):
+        clause, params = self._where(key)
+        return self.conn.execute(f'SELECT 1 FROM cells WHERE {clause} LIMIT 1', params).fetchone() is not None
+
+    def get_cell(self, key):
+        """返回已保存的单元记录（JSON 列已解码），不存在时返回 None"""
+        clause, params = self._where(key)
+        cursor = self.conn.execute(f'SELECT * FROM cells WHERE {clause} ORDER BY id DESC LIMIT 1', params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        names = [description[0] for description in cursor.description]
+        return {name: _decode(value) for name, value in zip(names, row)}
+
+    def append(self, record):
+        """追加一个已完成单元的记录"""
+        record = dict(record)
+        record.setdefault('created_at', time.time())
+        record.setdefault('variant', '')
+        for name, value in record.items():
+            self._ensure_column(name, value)
+        names = list(record)
+        values = [_encode(record[name]) for name in names]
+        placeholders = ', '.join('?' for _ in names)
+        quoted = ', '.join(f'"{name}"' for name in names)
+        self.conn.execute(f'INSERT INTO cells ({quoted}) VALUES ({placeholders})', values)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+
+def _encode(value):
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+def _decode(value):
+    if isinstance(value, str) and value[:1] in ('[', '{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def load_results(path):
+    """把结果文件读取为 pandas DataFrame，JSON 列解码为列表/字典"""
+    import pandas as pd
+
+    conn = sqlite3.connect(path)
+    try:
+        frame = pd.read_sql_query('SELECT * FROM cells ORDER BY id', conn)
+    finally:
+        conn.close()
+    for column in frame.columns:
+        if not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].astype(object).map(_decode)
+    return frame
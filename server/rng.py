@@ -0,0 +1,30 @@
+import random
+
+import numpy as np
+
+# 每个随机组件使用独立的随机数流，新增或修改某个组件的抽样不会影响其他组件
+STREAM_NAMES = ('user_positions', 'user_requests', 'file_sizes', 'cache', 'scheduler', 'region_cache', 'warmup',
+                'workload')
+
+
+class RandomStreams:
+    """
+    由一个种子派生出的按组件划分的随机数流。
+
+    相同种子下，不同缓存策略看到的用户位置、请求序列和文件大小完全相同（公共随机数），
+    因此策略之间的差异不再混入抽样噪声。
+    """
+
+    def __init__(self, seed):
+        self.seed = seed
+
+    def _sequence(self, name, index):
+        return np.random.SeedSequence(self.seed, spawn_key=(STREAM_NAMES.index(name),) + tuple(index))
+
+    def numpy(self, name, *index):
+        """返回组件 name（可带下标，例如服务器编号）的 numpy Generator"""
+        return np.random.Generator(np.random.PCG64(self._sequence(name, index)))
+
+    def python(self, name, *index):
+        """返回组件 name（可带下标）的 random.Random 实例"""
+        return random.Random(int(self._sequence(name, index).generate_state(2, np.uint64)[0]))
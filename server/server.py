@@ -1,27 +1,95 @@
+import math
 import os
 import sqlite3
-from matplotlib import pyplot as plt
 
 from modules.ARC_cache import ARCCache
+from modules.bloom_filter import BloomFilter
 from modules.FIFO_Cache import FIFOCache
 from modules.NoCache import NoCache
 from modules.RR_cache import RRCache
 
+def response_time(distance):
+    """距离对应的往返时延（秒）"""
+    return 2 * ((distance // 1000) + (distance % 1000) / 1000.0)
+
+
+class RequestTrace:
+    """记录一次请求在服务器层级之间经过的路径，最后一个服务器为实际提供文件的服务器"""
+
+    def __init__(self, now=None):
+        self.now = now  # 请求到达的仿真时间（秒），None 表示不模拟时间
+        self.wait = 0  # 等待进行中的回源请求所花的时间
+        self.coalesced = False
+        self.hops = []
+        self.peer = None  # 由对等节点提供文件时的对等节点
+        self.wasted_probes = []  # 摘要误报时白白探测过的对等节点
+        self.distance = 0  # 边缘节点之后各跳（含白费的探测）的距离之和，由仿真统计时填写
+
+    def served_by(self):
+        return self.hops[-1] if self.hops else None
+
+
 class Server:
-    def __init__(self, db_path, data_dir, position, size, max_files, cache_strategy):
+    def __init__(self, db_path, data_dir, position, size, max_files, cache_strategy, tier='edge'):
         self.db_path = db_path
         self.data_dir = data_dir
         self.position = position
         self.size = size
         self.max_files = max_files
         self.cache_strategy = cache_strategy if cache_strategy is not None else NoCache()
-        self.main_server = None
+        self.main_server = None  # 上游服务器：边缘节点指向区域节点或源站，区域节点指向源站
+        self.tier = tier  # 所在层级：edge / region / origin
+        self.catalog = {}  # 源站保存的文件名 -> 文件大小
+        self.region_servers = []  # 源站下挂的区域节点
+        self.origins = []  # 多源站时主源站登记的全部源站（第一个为主源站自身），单源站时为空
+        self.content = None  # MappedContentStore：设置后命中时返回 mmap 上的 memoryview 而不是 True
+        self._init_state()
         self.conn = sqlite3.connect(self.db_path)
         self._create_tables()
+
+    def _init_state(self):
+        """初始化一次仿真中会变化的状态：对等节点、摘要、进行中的回源请求和各项计数"""
+        # 协作缓存：邻近的边缘节点（从近到远）和本节点定期发布的缓存摘要
+        self.peers = []
+        # 多源站：文件名 -> 距离最近的保存了该文件的源站；为空时未命中都交给 main_server
+        self.origin_routes = {}
+        self.digest = None
+        self.digest_interval = 0  # 每处理多少个请求重建一次摘要，0 表示不发布摘要
+        self.digest_fp_rate = 0.01
+        self.requests_since_digest = 0
+        # 未命中合并：文件名 -> 进行中的回源请求完成的仿真时间
+        self.inflight = {}
+        self.coalesce = False
+        self.reset_counters()
+
+    def reset_counters(self):
+        """清零统计计数（例如预热结束、开始测量时），不改变缓存内容和摘要"""
+        self.digest_refreshes = 0
+        self.digest_bytes_sent = 0
+        self.peer_probes = 0
+        self.peer_hits = 0
+        self.peer_false_positives = 0
+        self.peer_served = 0
+        self.coalesced_count = 0  # 合并到进行中回源请求上的未命中数（即节省的回源次数）
+        self.duplicate_fetch_count = 0  # 未开启合并时，回源进行中又重复发出的回源次数
         self.active_connections = 0
         self.request_count = 0
         self.request_small_count = 0
 
+    def reset(self, clear_files=True):
+        """
+        清空数据库中的文件记录和统计计数，使服务器可以在下一个仿真单元中复用；之后需要换上新的缓存策略。
+
+        :param clear_files: 为 False 时保留文件记录（源站的文件目录在各单元之间不变）
+        """
+        if clear_files:
+            self.conn.execute('DELETE FROM files')
+            self.conn.commit()
+        if self.content is not None:
+            self.content.close()
+            self.content = None
+        self._init_state()
+
     def _create_tables(self):
         cursor = self.conn.cursor()
         cursor.execute('''
@@ -37,9 +105,12 @@ class Server:
         self.conn.commit()
 
     def _remove_file_from_db(self, filename):
+        """缓存淘汰或删除文件时调用：删除数据库记录并释放该文件的内存映射"""
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM files WHERE filename = ?', (filename,))
         self.conn.commit()
+        if self.content is not None:
+            self.content.release(filename)
 
     def _file_exists_in_db(self, filename):
         cursor = self.conn.cursor()
@@ -50,10 +121,15 @@ class Server:
         return exists
 
     def add_file(self, filename):
-        if not self.cache_strategy.access(filename):
-            self._add_file_to_db(filename)
-            self.cache_strategy.add(filename)
-            # print(f"File {filename} added to cache and database.")
+        """加入缓存（已在缓存中时由缓存策略决定是否更新顺序）；缓存策略负责同步数据库记录"""
+        self.cache_strategy.add(filename)
+
+    def get_or_fetch(self, filename, fetch):
+        """
+        对缓存只做一次查找：命中时返回 (True, None)；未命中时调用 fetch()，fetch 返回 (是否取到文件, 结果)，
+        取到文件时加入缓存（最多淘汰一项），返回 (False, 结果)。
+        """
+        return self.cache_strategy.get_or_fetch(filename, fetch)
 
     def remove_file(self, filename):
         self._remove_file_from_db(filename)
@@ -65,43 +141,125 @@ class Server:
         files = cursor.fetchall()
         print(f"Files in {self.db_path}: {[file[0] for file in files]}")
 
-    def process_request(self, filename):
+    def process_request(self, filename, trace=None):
+        """处理请求；未命中时沿 main_server 逐级向上获取。trace 为 RequestTrace 时记录经过的服务器"""
         self.active_connections += 1
+        if trace is not None:
+            trace.hops.append(self)
+        if self.digest_interval:
+            self.requests_since_digest += 1
+            if self.requests_since_digest >= self.digest_interval:
+                self.publish_digest()
         try:
-            # 尝试从缓存中获取文件
-            cached_content = self.cache_strategy.access(filename)
-            if cached_content:
-                # print(flush=True)
+            pending = self._pending_fetch(filename, trace)
+            if pending is not None:
+                if self.coalesce:
+                    # 同一文件的回源正在进行，等待它完成而不是再发一次回源请求
+                    self.coalesced_count += 1
+                    trace.wait = pending - trace.now
+                    trace.coalesced = True
+                    # 回源完成后由本节点提供文件，内容与其他取到文件的路径一致
+                    cached_content = self.content.serve(filename) if self.content is not None else True
+                    return cached_content, True, False
+                # 回源进行中又发出一次重复的回源，不查缓存
+                self.duplicate_fetch_count += 1
+                found, result = self._fetch(filename, trace)
+                if found:
+                    self.add_file(filename)
+                    self.request_count += 1
+                    self._track_fetch(filename, trace)
+                return result
+
+            hit, result = self.get_or_fetch(filename, lambda: self._fetch(filename, trace))
+            if hit:
                 # print(f"Cache hit for {filename} at {self.db_path}", flush=True)
                 self.request_count += 1
                 self.request_small_count += 1
+                cached_content = self.content.serve(filename) if self.content is not None else True
                 return cached_content, True, True  # (内容, 找到文件, 命中缓存)
-
-            # 如果缓存未命中，尝试从主服务器获取文件
-            if self.main_server:
-                # print(flush=True)
-                # print(f"Cache miss for {filename}. Requesting from main server.", flush=True)
-                file_content, found, _ = self.main_server.process_request(filename)
-                if found:
-                    # 再次检查缓存中是否已经存在文件，以避免重复添加
-                    if not self.cache_strategy.access(filename):
-                        self.add_file(filename)
-                        self.request_count += 1
-                        # print(flush=True)
-                        # print(f"File {filename} added to cache and database.", flush=True)
-                    return file_content, True, False  # (内容, 找到文件, 未命中缓存)
-
-                # print(flush=True)
-                # print(f"File {filename} not found on main server.", flush=True)
-                return b'File not found', False, False  # (未找到内容, 未找到文件, 未命中缓存)
-
-            # print(flush=True)
-            # print(f"File {filename} not found in storage and no main server to request from.", flush=True)
-            return b'File not found', False, False  # (未找到内容, 未找到文件, 未命中缓存)
+            if result[1]:
+                self.request_count += 1
+                self._track_fetch(filename, trace)
+            return result
 
         finally:
             self.active_connections -= 1
 
+    def _fetch(self, filename, trace):
+        """缓存未命中时获取文件，返回 (是否取到文件, (内容, 找到文件, 未命中缓存))"""
+        # 先根据摘要询问邻近的对等节点
+        peer, cached_content = self._fetch_from_peers(filename, trace)
+        if peer is not None:
+            return True, (cached_content, True, False)
+
+        # 再从主服务器（多源站时为最近的保存了该文件的源站）获取文件
+        upstream = self.origin_routes.get(filename, self.main_server)
+        if upstream:
+            # print(f"Cache miss for {filename}. Requesting from main server.", flush=True)
+            file_content, found, _ = upstream.process_request(filename, trace)
+            if found:
+                return True, (file_content, True, False)  # (内容, 找到文件, 未命中缓存)
+
+        # print(f"File {filename} not found.", flush=True)
+        return False, (b'File not found', False, False)  # (未找到内容, 未找到文件, 未命中缓存)
+
+    def _pending_fetch(self, filename, trace):
+        """返回该文件进行中的回源请求的完成时间；没有进行中的请求或未模拟时间时返回 None"""
+        if trace is None or trace.now is None or filename not in self.inflight:
+            return None
+        ready_time = self.inflight[filename]
+        if trace.now >= ready_time:
+            del self.inflight[filename]
+            return None
+        return ready_time
+
+    def _track_fetch(self, filename, trace):
+        """
+        边缘节点向上游取回文件后登记这次回源，完成时间为请求到达时间加上本节点之后各跳（含白费的对等探测）的往返时延。
+        上游层级不登记：trace.now 是请求到达边缘节点的时间。
+        """
+        if trace is None or trace.now is None or self.tier != 'edge' or self not in trace.hops:
+            return
+        hops = trace.hops[trace.hops.index(self):]
+        upstream = sum(response_time(math.dist(a.get_position(), b.get_position())) for a, b in zip(hops, hops[1:]))
+        upstream += sum(response_time(math.dist(self.get_position(), peer.get_position()))
+                        for peer in trace.wasted_probes)
+        self.begin_fetch(filename, trace.now + upstream)
+
+    def begin_fetch(self, filename, ready_time):
+        """登记一次回源请求，ready_time 之前到达的同一文件请求视为与它并发"""
+        if ready_time > self.inflight.get(filename, float('-inf')):
+            self.inflight[filename] = ready_time
+
+    def publish_digest(self):
+        """用当前缓存内容重建 Bloom 过滤器摘要，并记录发送给对等节点的字节数"""
+        self.digest = BloomFilter.from_keys(self.cache_strategy.cache_content(), capacity=self.max_files,
+                                            fp_rate=self.digest_fp_rate)
+        self.requests_since_digest = 0
+        self.digest_refreshes += 1
+        self.digest_bytes_sent += self.digest.size_bytes() * len(self.peers)
+
+    def _fetch_from_peers(self, filename, trace=None):
+        """按距离从近到远检查对等节点的摘要，摘要包含该文件才真正探测；返回 (对等节点, 内容)"""
+        for peer in self.peers:
+            if peer.digest is None or filename not in peer.digest:
+                continue
+            self.peer_probes += 1
+            # 只检查对等节点是否缓存了该文件，不更新它的替换策略状态（这不是对等节点自己的请求）
+            if peer.cache_strategy.contains(filename):
+                cached_content = peer.content.serve(filename) if peer.content is not None else True
+                self.peer_hits += 1
+                peer.peer_served += 1
+                if trace is not None:
+                    trace.hops.append(peer)
+                    trace.peer = peer
+                return peer, cached_content
+            # 摘要误报（或摘要已过期），这次探测白费了一个往返
+            self.peer_false_positives += 1
+            if trace is not None:
+                trace.wasted_probes.append(peer)
+        return None, None
+
     def request_file_from_main_server(self, filename):
         if self.main_server:
             file_content, found, _ = self.main_server.process_request(filename)
@@ -116,6 +274,12 @@ class Server:
     def get_position(self):
         return self.position
 
+    def close(self):
+        """释放内存映射并关闭数据库连接"""
+        if self.content is not None:
+            self.content.close()
+        self.conn.close()
+
     def get_total_files(self):
         cursor = self.conn.cursor()
         cursor.execute('SELECT COUNT(*) FROM files')
@@ -127,6 +291,8 @@ class Server:
 
 
 def plot_server_load_distribution(servers, filename="server_load_distribution.png"):
+    from matplotlib import pyplot as plt  # 仅在绘图时导入，避免无界面运行时加载 matplotlib
+
     server_names = [f'Server {i + 1}' for i in range(len(servers))]
     request_counts = [server.request_count for server in servers]
 
@@ -11,52 +11,174 @@ from modules.LRU_cache import LRUCache
 from modules.NoCache import NoCache
 from modules.RR_cache import RRCache
 from modules.SimpleCache import SimpleCache
+from modules.compact_cache import create_compact_cache
+from server.content_store import MappedContentStore
 from server.file_operations import create_fixed_files
 from server.server import Server
+from server.timing import phase
+
+COMPACT_PREFIX = 'COMPACT_'
+
+def create_cache_strategy(cache_strategy_class, cache_size, server, file_ids=None, rng=None):
+    """根据策略名创建缓存策略；COMPACT_ 前缀表示基于整数 id 的数组实现，rng 供随机替换策略使用"""
+    if cache_strategy_class.startswith(COMPACT_PREFIX):
+        return create_compact_cache(cache_strategy_class[len(COMPACT_PREFIX):], cache_size, file_ids, server, rng=rng)
+    if cache_strategy_class == 'FIFO':
+        return FIFOCache(cache_size, server)
+    elif cache_strategy_class == 'RR':
+        return RRCache(cache_size, server, rng=rng)
+    elif cache_strategy_class == 'ARC':
+        return ARCCache(cache_size, server)
+    elif cache_strategy_class == 'LRU':
+        return LRUCache(cache_size, server)
+    elif cache_strategy_class == 'LFU':
+        return LFUCache(cache_size, server)
+    return NoCache()
+
+def initialize_servers(data_dir, num_servers, server_positions, main_server_position, cache_size, cache_strategy_class, top_n_files,
+                       streams=None, timer=None):
+    """
+    streams 为 RandomStreams，给文件大小和每台服务器的缓存提供独立的随机数流；None 时使用全局随机数。
+    timer 为 PhaseTimer 时单独记录创建文件的耗时。
+    """
+    main_server = initialize_origin(data_dir, main_server_position, cache_size, streams, timer)
+    servers = [initialize_edge(data_dir, i, server_positions[i], main_server, cache_size, cache_strategy_class,
+                               top_n_files, streams)
+               for i in range(num_servers)]
+    return main_server, servers
 
-def initialize_servers(data_dir, num_servers, server_positions, main_server_position, cache_size, cache_strategy_class, top_n_files):
-    servers = []
-
+def initialize_origin(data_dir, main_server_position, cache_size, streams=None, timer=None):
+    """创建源站并在 data_dir 中写入全部文件，源站的 catalog 记录文件名 -> 文件大小"""
     # Initialize main server with SimpleCache
-    main_server = Server(f"{data_dir}/main_server.db", data_dir, main_server_position, size=1000000, max_files=cache_size, cache_strategy=None)
+    main_server = Server(f"{data_dir}/main_server.db", data_dir, main_server_position, size=1000000, max_files=cache_size, cache_strategy=None,
+                         tier='origin')
     main_server.cache_strategy = SimpleCache(main_server)
 
     # Add all initial files to the main server using SimpleCache
-    fixed_files = create_fixed_files(data_dir, 100)
+    with phase(timer, 'file_creation'):
+        fixed_files = create_fixed_files(data_dir, 100, rng=streams.python('file_sizes') if streams else None)
     for filename, file_size in fixed_files:
         main_server.cache_strategy.add(filename)
+        main_server.catalog[filename] = file_size
 
     # Ensure that the main server files are in the database before initializing caches on other servers
     main_server.list_files()
-
-    # Initialize subsidiary servers with specified cache strategies
-    for i in range(num_servers):
-        server_db_path = f"{data_dir}/server_{i + 1}.db"
-        small_server = Server(server_db_path, data_dir, server_positions[i], size=100000, max_files=cache_size, cache_strategy=None)
-
-        # Apply specific cache strategy
-        if cache_strategy_class == 'FIFO':
-            small_server.cache_strategy = FIFOCache(cache_size, small_server)
-        elif cache_strategy_class == 'RR':
-            small_server.cache_strategy = RRCache(cache_size, small_server)
-        elif cache_strategy_class == 'ARC':
-            small_server.cache_strategy = ARCCache(cache_size, small_server)
-        elif cache_strategy_class == 'LRU':
-            small_server.cache_strategy = LRUCache(cache_size, small_server)
-        elif cache_strategy_class == 'LFU':
-            small_server.cache_strategy = LFUCache(cache_size, small_server)
-        else:
-            small_server.cache_strategy = NoCache()
-
-        small_server.main_server = main_server
-        servers.append(small_server)
-
-    # Now add top_n_files to each server using the appropriate cache strategy
-    for i, server in enumerate(servers, start=1):
-        for filename in top_n_files:
-            server.cache_strategy.add(filename)  # Use cache's add method
-
-    return main_server, servers
+    return main_server
+
+def initialize_edge(data_dir, index, position, main_server, cache_size, cache_strategy_class, top_n_files, streams=None,
+                    server=None):
+    """
+    创建第 index 台边缘节点并用 top_n_files 预热缓存。
+
+    :param server: 不为 None 时复用这台服务器（及其数据库连接），清空后换上新的缓存策略和位置
+    """
+    file_ids = {filename: i for i, filename in enumerate(main_server.catalog)}  # 紧凑缓存使用的文件 id
+    if server is None:
+        server = Server(f"{data_dir}/server_{index + 1}.db", data_dir, position, size=100000, max_files=cache_size,
+                        cache_strategy=None)
+    else:
+        server.reset()
+    server.position = position
+    server.max_files = cache_size
+
+    # Apply specific cache strategy
+    cache_rng = streams.python('cache', index) if streams else None
+    server.cache_strategy = create_cache_strategy(cache_strategy_class, cache_size, server, file_ids, rng=cache_rng)
+    server.main_server = main_server
+
+    # Now add top_n_files using the appropriate cache strategy
+    for filename in top_n_files:
+        server.cache_strategy.add(filename)  # Use cache's add method
+    return server
+
+def attach_regions(data_dir, servers, main_server, regions, streams=None):
+    """
+    在边缘节点和源站之间加入区域（二级）缓存节点，每个边缘节点挂到距离最近的区域节点下。
+
+    :param regions: 区域配置列表，每项为 {'position': (x, y), 'cache_strategy': 'LRU', 'cache_size': 50}
+    :return: 区域服务器列表
+    """
+    file_ids = {filename: i for i, filename in enumerate(main_server.catalog)}
+    region_servers = []
+    for k, region in enumerate(regions):
+        cache_size = region.get('cache_size', main_server.max_files)
+        region_server = Server(f"{data_dir}/region_{k + 1}.db", data_dir, tuple(region['position']), size=500000,
+                               max_files=cache_size, cache_strategy=None, tier='region')
+        region_server.cache_strategy = create_cache_strategy(region.get('cache_strategy', 'LRU'), cache_size, region_server,
+                                                             file_ids, rng=streams.python('region_cache', k) if streams else None)
+        region_server.main_server = main_server
+        region_servers.append(region_server)
+
+    for server in servers:
+        x, y = server.get_position()
+        server.main_server = min(region_servers,
+                                 key=lambda region: (region.position[0] - x) ** 2 + (region.position[1] - y) ** 2)
+    main_server.region_servers = region_servers
+    return region_servers
+
+def attach_origins(data_dir, servers, main_server, positions, replicas=1):
+    """
+    把文件目录分片（或复制）到多个地理分布的源站上，未命中时从最近的保存了该文件的源站获取。
+
+    主源站移到 positions[0]，其余位置各新建一个源站。文件按目录顺序轮流分配，第 i 个文件保存在第
+    i, i+1, ..., i+replicas-1 个源站（取模）上；目录按流行度排列，轮流分配使各源站的热度大致相同。
+    主源站的 catalog 仍是完整的文件目录（文件 id 和大小都从这里取），其余源站的 catalog 只含各自保存的文件。
+
+    :param positions: 全部源站的位置，第一个为主源站
+    :param replicas: 每个文件的副本数，1 为纯分片，等于源站数时为完全复制
+    :return: 全部源站列表（第一个为主源站）
+    """
+    replicas = max(1, min(replicas, len(positions)))
+    main_server.position = tuple(positions[0])
+    origins = [main_server]
+    for k, position in enumerate(positions[1:]):
+        origin = Server(f"{data_dir}/origin_{k + 2}.db", data_dir, tuple(position), size=main_server.size,
+                        max_files=main_server.max_files, cache_strategy=None, tier='origin')
+        origins.append(origin)
+
+    holders = {}
+    for i, filename in enumerate(main_server.catalog):
+        holders[filename] = [origins[(i + j) % len(origins)] for j in range(replicas)]
+    main_server.conn.execute('DELETE FROM files')
+    main_server.conn.commit()
+    for origin in origins:
+        origin.cache_strategy = SimpleCache(origin)
+        for filename, file_holders in holders.items():
+            if origin in file_holders:
+                origin.cache_strategy.add(filename)
+                if origin is not main_server:
+                    origin.catalog[filename] = main_server.catalog[filename]
+
+    # 直接回源的节点（没有区域节点的边缘节点和区域节点）各自记录每个文件最近的源站
+    for node in list(main_server.region_servers) + [server for server in servers if server.main_server is main_server]:
+        x, y = node.get_position()
+        distance = {origin: (origin.position[0] - x) ** 2 + (origin.position[1] - y) ** 2 for origin in origins}
+        node.origin_routes = {filename: min(file_holders, key=distance.get)
+                              for filename, file_holders in holders.items()}
+    main_server.origins = origins
+    return origins
+
+def attach_peers(servers, radius, digest_interval=500, fp_rate=0.01):
+    """
+    为每个边缘节点登记距离不超过 radius 的对等节点，并发布初始缓存摘要。
+
+    :param digest_interval: 每个节点每处理多少个请求重建一次摘要
+    :param fp_rate: 摘要的目标误报率
+    """
+    for server in servers:
+        x, y = server.get_position()
+        distances = [((peer.position[0] - x) ** 2 + (peer.position[1] - y) ** 2) ** 0.5 for peer in servers]
+        server.peers = [peer for distance, peer in sorted(zip(distances, servers), key=lambda item: item[0])
+                        if peer is not server and distance <= radius]
+        server.digest_interval = digest_interval
+        server.digest_fp_rate = fp_rate
+    for server in servers:
+        server.publish_digest()
+
+def enable_content_serving(servers):
+    """让服务器通过 mmap 提供 data_dir 中的真实文件内容"""
+    for server in servers:
+        server.content = MappedContentStore(server.data_dir)
 
 def generate_positions(num_servers, grid_range):
     """Generates a list of positions for the given number of servers."""
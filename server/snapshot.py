@@ -0,0 +1,137 @@
+import io
+import pickle
+import random
+import zlib
+
+import numpy as np
+
+from server.content_store import MappedContentStore
+from server.server import Server
+
+MAGIC = b'CDNSNAP1'
+
+# 不进入快照的 Server 属性：数据库连接和内存映射在恢复时由目标服务器提供，路径由目标服务器决定
+SERVER_EXCLUDED = ('conn', 'content', 'db_path', 'data_dir')
+# 不进入快照的 UserSimulation 属性：工作负载、用户索引和输出结果不属于预热状态，指标导出器持有线程和端口
+SIMULATION_EXCLUDED = ('servers', 'metrics', 'user_requests', 'user_db_path', 'user_positions', 'request_list',
+                       'request_log', 'user_response_times')
+CONTENT_COUNTERS = ('bytes_served', 'requests_served', 'serve_time')
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """服务器之间以及缓存、调度器对服务器的引用保存为服务器编号；全局 random 模块单独保存其状态"""
+
+    def __init__(self, file, server_ids):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.server_ids = server_ids
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Server):
+            return 'server', self.server_ids[id(obj)]
+        if obj is random:
+            return 'module', 'random'
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, servers):
+        super().__init__(file)
+        self.servers = servers
+
+    def persistent_load(self, pid):
+        kind, value = pid
+        if kind == 'server':
+            return self.servers[value]
+        if kind == 'module' and value == 'random':
+            return random
+        raise pickle.UnpicklingError(f'unknown persistent id {pid!r}')
+
+
+def _all_servers(main_server, servers):
+    return (list(main_server.origins) or [main_server]) + list(main_server.region_servers) + list(servers)
+
+
+def _server_state(server):
+    cursor = server.conn.cursor()
+    cursor.execute('SELECT filename FROM files ORDER BY id')
+    content = server.content
+    return {
+        'attributes': {name: value for name, value in vars(server).items() if name not in SERVER_EXCLUDED},
+        'files': [row[0] for row in cursor.fetchall()],
+        'content': {name: getattr(content, name) for name in CONTENT_COUNTERS} if content is not None else None,
+    }
+
+
+def save_snapshot(path, main_server, servers, simulation=None):
+    """
+    把仿真状态保存为压缩的二进制快照：每台服务器（源站、区域节点、边缘节点）的缓存策略内部结构、
+    数据库中的文件记录和各项计数，UserSimulation 的调度器、预取器和统计状态，以及全局随机数状态。
+
+    :return: 写入的字节数
+    """
+    all_servers = _all_servers(main_server, servers)
+    state = {
+        'servers': [_server_state(server) for server in all_servers],
+        'simulation': ({name: value for name, value in vars(simulation).items() if name not in SIMULATION_EXCLUDED}
+                       if simulation is not None else None),
+        'random_state': random.getstate(),
+        'numpy_random_state': np.random.get_state(),
+    }
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, {id(server): i for i, server in enumerate(all_servers)}).dump(state)
+    # 拓扑信息放在外层，恢复前先校验，避免把引用解析到错误的服务器上
+    snapshot = {
+        'layout': [(server.tier, tuple(server.position)) for server in all_servers],
+        'clock': simulation.start_time if simulation is not None else 0.0,
+        'state': buffer.getvalue(),
+    }
+    data = MAGIC + zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def load_snapshot(path, main_server, servers, simulation=None):
+    """
+    把快照恢复到拓扑相同（服务器层级和位置一致）的服务器上，可以从同一个预热状态分出多个实验。
+
+    simulation 不为 None 且快照中保存了 UserSimulation 状态时一并恢复；如果 simulation 使用了
+    不同类型的调度器（例如测量阶段换一种调度策略），保留它自己的调度器。
+
+    :return: 快照中记录的仿真时钟（秒），可作为下一阶段的 start_time
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f'{path} is not a simulation snapshot')
+    snapshot = pickle.loads(zlib.decompress(data[len(MAGIC):]))
+    all_servers = _all_servers(main_server, servers)
+    if snapshot['layout'] != [(server.tier, tuple(server.position)) for server in all_servers]:
+        raise ValueError('snapshot was taken on a different topology')
+    state = _SnapshotUnpickler(io.BytesIO(snapshot['state']), all_servers).load()
+
+    for server, server_state in zip(all_servers, state['servers']):
+        for name, value in server_state['attributes'].items():
+            setattr(server, name, value)
+        server.conn.execute('DELETE FROM files')
+        server.conn.executemany('INSERT INTO files (filename) VALUES (?)',
+                                [(filename,) for filename in server_state['files']])
+        server.conn.commit()
+        if server.content is not None:
+            server.content.close()
+            server.content = None
+        if server_state['content'] is not None:
+            server.content = MappedContentStore(server.data_dir)
+            for name, value in server_state['content'].items():
+                setattr(server.content, name, value)
+
+    if simulation is not None and state['simulation'] is not None:
+        attributes = dict(state['simulation'])
+        if type(attributes.get('scheduler')) is not type(simulation.scheduler):
+            attributes.pop('scheduler', None)
+        for name, value in attributes.items():
+            setattr(simulation, name, value)
+
+    random.setstate(state['random_state'])
+    np.random.set_state(state['numpy_random_state'])
+    return snapshot['clock']
@@ -0,0 +1,86 @@
+import cProfile
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """
+    按阶段累计墙钟时间（秒），阶段按第一次出现的顺序保存。
+    阶段可以嵌套，外层阶段只记录扣除内层阶段后的时间，因此各阶段之和等于总耗时。
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self._stack = []  # 正在计时的阶段：[名称, 开始时间, 内层阶段耗时]
+
+    @contextmanager
+    def phase(self, name):
+        entry = [name, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[1]
+            self.add(name, elapsed - entry[2])
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def merge(self, other):
+        """累加另一个计时器（或 {阶段: 秒} 字典）的结果"""
+        totals = other.totals if isinstance(other, PhaseTimer) else other
+        for name, seconds in totals.items():
+            self.add(name, seconds)
+
+    def as_dict(self):
+        return dict(self.totals)
+
+    def report(self):
+        total = sum(self.totals.values())
+        return ', '.join(f'{name} {seconds:.2f}s ({seconds / total * 100:.0f}%)' if total else f'{name} {seconds:.2f}s'
+                         for name, seconds in self.totals.items())
+
+
+@contextmanager
+def null_phase(name):
+    yield
+
+
+def phase(timer, name):
+    """timer 为 None 时返回空的上下文管理器，便于可选计时"""
+    return timer.phase(name) if timer is not None else null_phase(name)
+
+
+def profile_call(path, func, *args, **kwargs):
+    """用 cProfile 运行 func，并把结果写到 path（可用 pstats 或 snakeviz 查看）"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+@contextmanager
+def profile_method(obj, name, path):
+    """在上下文内只对 obj.name 的调用开启 cProfile（例如 send_request 热路径），退出时写出结果"""
+    profiler = cProfile.Profile()
+    method = getattr(obj, name)
+
+    def profiled(*args, **kwargs):
+        profiler.enable()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    setattr(obj, name, profiled)
+    try:
+        yield profiler
+    finally:
+        delattr(obj, name)
+        profiler.dump_stats(path)
@@ -0,0 +1,126 @@
+import os
+import shutil
+
+import numpy as np
+
+from server.server_initialization import initialize_edge, initialize_origin
+
+
+class Topology:
+    """
+    维护每个用户的最近服务器（即服务器的 Voronoi 划分）。
+
+    服务器位置变化时只重新计算受影响的部分：位置没变的服务器保持原有的 Voronoi 单元，
+    用户只需与新增或移动过的服务器比较距离；只有原本属于被移动或删除的服务器的用户才与全部服务器重新比较。
+    """
+
+    def __init__(self, user_positions):
+        self.users = np.asarray(user_positions, dtype=float).reshape(-1, 2)
+        self.server_positions = np.empty((0, 2))
+        self.nearest = np.full(len(self.users), -1, dtype=np.int64)
+        self.nearest_distance = np.full(len(self.users), np.inf)
+        self.reused_servers = 0  # 最近一次更新中位置未变的服务器数
+        self.recomputed_users = 0  # 最近一次更新中与全部服务器重新比较的用户数
+        self.reassigned_users = 0  # 最近一次更新中最近服务器发生变化的用户数
+
+    def _distances(self, users, servers):
+        dx = users[:, 0][:, None] - servers[:, 0][None, :]
+        dy = users[:, 1][:, None] - servers[:, 1][None, :]
+        return np.sqrt(dx * dx + dy * dy)
+
+    def update(self, server_positions):
+        """切换到新的服务器位置列表，返回最近服务器发生变化的用户下标"""
+        new = np.asarray(server_positions, dtype=float).reshape(-1, 2)
+        old = self.server_positions
+        common = min(len(old), len(new))
+        unchanged = np.all(old[:common] == new[:common], axis=1)
+        # 下标小于 stable 的服务器位置都没变；之后的服务器视为新增或移动过
+        stable = int(np.argmin(unchanged)) if not unchanged.all() else common
+        previous = self.nearest.copy()
+
+        if stable < len(new):
+            # 只与变化过的服务器比较；距离相等时保留下标较小的服务器，与逐个比较的结果一致
+            distances = self._distances(self.users, new[stable:])
+            best = np.argmin(distances, axis=1)
+            best_distance = distances[np.arange(len(self.users)), best]
+            closer = best_distance < self.nearest_distance
+            self.nearest[closer] = best[closer] + stable
+            self.nearest_distance[closer] = best_distance[closer]
+
+        # 原来的最近服务器被移动或删除的用户：与全部服务器重新比较
+        stale = np.flatnonzero(previous >= stable)
+        if len(stale) and len(new):
+            distances = self._distances(self.users[stale], new)
+            best = np.argmin(distances, axis=1)
+            self.nearest[stale] = best
+            self.nearest_distance[stale] = distances[np.arange(len(stale)), best]
+        elif len(stale):
+            self.nearest[stale] = -1
+            self.nearest_distance[stale] = np.inf
+
+        self.server_positions = new
+        self.reused_servers = stable
+        self.recomputed_users = len(stale)
+        changed = np.flatnonzero(self.nearest != previous)
+        self.reassigned_users = len(changed)
+        return changed
+
+    def assignment(self, user_positions, servers):
+        """返回 {用户位置: 最近的服务器}，供 NearestServerScheduler 直接查表"""
+        return {tuple(position): servers[index] for position, index in zip(user_positions, self.nearest.tolist())}
+
+
+class IncrementalCluster:
+    """
+    在整个扫描中复用的集群：源站、文件目录和用户索引只创建一次，服务器数量变化时
+    复用已有边缘节点（清空缓存后换上新位置），只新建多出来的节点、关闭多余的节点，
+    并通过 Topology 增量更新用户的最近服务器。
+    """
+
+    def __init__(self, data_dir, cache_size, user_positions, streams=None, timer=None):
+        """
+        :param user_positions: 用户位置列表，与用户名 user_1, user_2 ... 一一对应
+        """
+        self.data_dir = data_dir
+        self.cache_size = cache_size
+        self.streams = streams
+        if os.path.exists(data_dir):
+            shutil.rmtree(data_dir)
+        os.makedirs(data_dir, exist_ok=True)
+        self.main_server = initialize_origin(data_dir, (0, 0), cache_size, streams, timer)
+        self.user_positions = [tuple(position) for position in user_positions]
+        self.user_index = {f'user_{i + 1}': position for i, position in enumerate(self.user_positions)}
+        self.topology = Topology(self.user_positions)
+        self.servers = []
+
+    def resize(self, server_positions, cache_strategy_class, top_n_files):
+        """切换到 len(server_positions) 台边缘节点，所有节点的缓存和计数都清空，返回 (源站, 边缘节点列表)"""
+        self.main_server.reset(clear_files=False)
+        for region_server in self.main_server.region_servers:
+            region_server.close()
+            os.remove(region_server.db_path)
+        self.main_server.region_servers = []
+        # 多源站每个单元重新分片（主源站的文件记录也由 attach_origins 重建），这里只关闭其余源站
+        for origin in self.main_server.origins[1:]:
+            origin.close()
+            os.remove(origin.db_path)
+        self.main_server.origins = []
+        for server in self.servers[len(server_positions):]:
+            server.close()
+            os.remove(server.db_path)
+        self.servers = [
+            initialize_edge(self.data_dir, i, tuple(position), self.main_server, self.cache_size, cache_strategy_class,
+                            top_n_files, self.streams, server=self.servers[i] if i < len(self.servers) else None)
+            for i, position in enumerate(server_positions)
+        ]
+        self.topology.update(server_positions)
+        return self.main_server, self.servers
+
+    def assignment(self):
+        return self.topology.assignment(self.user_positions, self.servers)
+
+    def close(self):
+        for server in self.servers + self.main_server.region_servers + (self.main_server.origins or [self.main_server]):
+            server.close()
+        if os.path.exists(self.data_dir):
+            shutil.rmtree(self.data_dir)
@@ -29,3 +29,12 @@ def get_user_position(db_path, username): # 根据用户名获取用户位置
     result = cursor.fetchone()
     conn.close()
     return (result[0], result[1]) if result else (None, None)
+
+
+def get_user_positions(db_path): # 一次读出所有用户的位置，返回 {用户名: (x, y)}
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT username, x, y FROM users')
+    positions = {username: (x, y) for username, x, y in cursor.fetchall()}
+    conn.close()
+    return positions
@@ -4,11 +4,11 @@ import random
 import sqlite3
 import numpy as np
 
-def initialize_users(user_db_path, num_users, grid_size):
+def initialize_users(user_db_path, num_users, grid_size, rng=None):
     """初始化用户数据库并生成用户位置"""
     initialize_user_database(user_db_path)
     fixed_users = []
-    user_positions = generate_user_positions(num_users, grid_size)
+    user_positions = generate_user_positions(num_users, grid_size, rng=rng)
     for i, position in enumerate(user_positions):
         username = f'user_{i + 1}'
         x, y = position
@@ -16,10 +16,11 @@ def initialize_users(user_db_path, num_users, grid_size):
         fixed_users.append(username)
     return fixed_users, user_positions
 
-def generate_user_positions(num_users, grid_size):
-    """生成用户的位置，随机分布在给定范围内"""
+def generate_user_positions(num_users, grid_size, rng=None):
+    """生成用户的位置，随机分布在给定范围内；rng 为 random.Random 实例，默认使用全局 random"""
+    rng = rng if rng is not None else random
     half_grid_size = grid_size // 2
-    positions = [(random.uniform(-half_grid_size, half_grid_size), random.uniform(-half_grid_size, half_grid_size)) for _ in range(num_users)]
+    positions = [(rng.uniform(-half_grid_size, half_grid_size), rng.uniform(-half_grid_size, half_grid_size)) for _ in range(num_users)]
     return positions
 
 def initialize_user_database(user_db_path):
@@ -50,14 +51,15 @@ def generate_zipf_distribution(num_files, s):
     weights /= weights.sum()
     return weights
 
-def generate_user_requests_zipf(fixed_request_list, num_users, num_requests_per_user, zipf_s):
-    """为每个用户生成请求，文件根据齐普夫分布的概率被请求"""
+def generate_user_requests_zipf(fixed_request_list, num_users, num_requests_per_user, zipf_s, rng=None):
+    """为每个用户生成请求，文件根据齐普夫分布的概率被请求；rng 为 numpy Generator，默认使用全局 np.random"""
+    rng = rng if rng is not None else np.random
     num_files = len(fixed_request_list)
     weights = generate_zipf_distribution(num_files, s=zipf_s)
 
     user_requests = {}
     for i in range(num_users):
-        requested_files = np.random.choice(fixed_request_list, size=num_requests_per_user, p=weights)
+        requested_files = rng.choice(fixed_request_list, size=num_requests_per_user, p=weights)
         user_requests[f'user_{i + 1}'] = list(requested_files)
     return user_requests
 
@@ -5,25 +5,35 @@ import math
 import sqlite3
 
 import numpy as np
-import pandas as pd
 
-from server.user_db import get_user_position
+from server.server import RequestTrace, response_time
+from server.user_db import get_user_position, get_user_positions
 from modules.nearest_server import NearestServerScheduler
 from modules.round_robin import RoundRobinScheduler
 from modules.distance_round_robin import DistanceRoundRobinScheduler
+from modules.consistent_hash import ConsistentHashScheduler
+from modules.power_of_two import PowerOfTwoChoicesScheduler
 from collections import Counter
 
-
-import matplotlib.pyplot as plt
-
 class UserSimulation:
-    def __init__(self, servers, request_list, user_db_path, request_interval, scheduler, user_requests=None):
+    def __init__(self, servers, request_list, user_db_path, request_interval, scheduler, user_requests=None, rng=None,
+                 arrival_rate=None, prefetcher=None, latency_model=None, metrics=None, user_positions=None):
         self.servers = servers
         self.request_list = request_list
         self.user_db_path = user_db_path
         self.request_interval = request_interval
         self.scheduler = scheduler  # 保存调度器实例
         self.user_requests = user_requests or {}
+        self.arrival_rate = arrival_rate  # 每秒到达的请求数；设置后第 i 个请求在 i / arrival_rate 秒到达
+        self.start_time = 0.0  # 本次仿真第一个请求的到达时间；连续调用 simulate_requests 时接着上一次的时钟
+        self.prefetcher = prefetcher  # 可选的 PopularityPrefetcher，登记每个请求并定期主动推送
+        # 可选的 LatencyModel：设置后每个请求的时延在仿真结束时按大小、带宽和排队统一重新计算
+        self.latency_model = latency_model
+        self.metrics = metrics  # 可选的 MetricsExporter：仿真过程中按限定频率发布实时指标
+        # 用户名 -> 位置的内存索引，避免每个请求都查询一次用户数据库；不在索引中的用户仍回退到数据库查询
+        if user_positions is None:
+            user_positions = get_user_positions(user_db_path) if user_db_path and os.path.exists(user_db_path) else {}
+        self.user_positions = user_positions
         self.request_counts = {str(filename): 0 for filename in request_list}
         self.user_response_times = []  # 每次请求的响应时间
         self.total_hits = 0
@@ -32,28 +42,89 @@ class UserSimulation:
         self.request_counts_by_server = {i: 0 for i in range(len(servers))}  # 初始化请求计数字典
         self.hit_counts_by_server = [0] * len(servers)
         self.request_log = []  # 用于存储每次请求的日志信息
+        self.user_server_index = {}  # 每个用户最近一次被分配到的服务器下标，用于绘制位置图
         self.file_request_counts = Counter()
+        # 按层级（edge / region / origin）统计：到达该层的请求数、在该层命中的请求数、进入该层的链路时延
+        self.tier_requests = Counter()
+        self.tier_hits = Counter()
+        self.tier_latency = Counter()
+        # 按源站统计：到达每个源站的回源请求数和进入该源站的链路时延（多源站时比较各源站的负载和回源代价）
+        self.origin_requests = Counter()
+        self.origin_latency = Counter()
 
         if scheduler == 'nearest':
             self.scheduler = NearestServerScheduler(servers)
         elif scheduler == 'round_robin':
             self.scheduler = RoundRobinScheduler(servers)
         elif scheduler == 'distance_round_robin':
-            self.scheduler = DistanceRoundRobinScheduler(servers)
+            self.scheduler = DistanceRoundRobinScheduler(servers, rng=rng)
+        elif scheduler == 'consistent_hash':
+            self.scheduler = ConsistentHashScheduler(servers)
+        elif scheduler == 'bounded_consistent_hash':
+            self.scheduler = ConsistentHashScheduler(servers, load_factor=1.25)
+        elif scheduler == 'power_of_two':
+            self.scheduler = PowerOfTwoChoicesScheduler(servers, rng=rng)
         else:
             raise ValueError("Unsupported scheduler type")
 
     def calculate_response_time(self, distance):
         """根据距离计算响应时间"""
-        return 2 * ((distance // 1000) + (distance % 1000) / 1000.0)
+        return response_time(distance)
+
+    def _account_trace(self, trace, edge_response_time):
+        """按请求经过的路径统计各层级的到达数、命中数和时延，返回边缘节点之后各跳的时延之和"""
+        upstream_response_time = 0
+        previous = None
+        for hop in trace.hops:
+            tier = 'peer' if hop is trace.peer else hop.tier
+            self.tier_requests[tier] += 1
+            if previous is None:
+                self.tier_latency[tier] += edge_response_time
+            else:
+                hop_distance = self.scheduler.calculate_distance(previous.get_position(), hop.get_position())
+                trace.distance += hop_distance
+                hop_response_time = self.calculate_response_time(hop_distance)
+                self.tier_latency[tier] += hop_response_time
+                if tier == 'origin':
+                    self.origin_requests[hop] += 1
+                    self.origin_latency[hop] += hop_response_time
+                upstream_response_time += hop_response_time
+            previous = hop
+        if trace.wasted_probes:
+            # 摘要误报的探测：从边缘节点到对等节点的往返也计入时延
+            edge = trace.hops[0]
+            for peer in trace.wasted_probes:
+                probe_distance = self.scheduler.calculate_distance(edge.get_position(), peer.get_position())
+                trace.distance += probe_distance
+                probe_time = self.calculate_response_time(probe_distance)
+                self.tier_requests['peer'] += 1
+                self.tier_latency['peer'] += probe_time
+                upstream_response_time += probe_time
+        served_by = trace.served_by()
+        if served_by is not None and not trace.coalesced:
+            self.tier_hits['peer' if served_by is trace.peer else served_by.tier] += 1
+        return upstream_response_time
+
+    def tier_stats(self):
+        """返回每个层级的到达请求数、命中率（%）和平均链路时延（秒）"""
+        return {
+            tier: {
+                'requests': requests,
+                'hit_rate': self.tier_hits[tier] / requests * 100,
+                'avg_latency': self.tier_latency[tier] / requests,
+            }
+            for tier, requests in self.tier_requests.items()
+        }
 
-    def send_request(self, request, username):
+    def send_request(self, request, username, now=None):
         request = str(request)  # 将 numpy.str_ 转换为普通的 Python 字符串
         self.request_counts[request] += 1  # 更新请求计数
-        user_position = get_user_position(self.user_db_path, username)
+        user_position = self.user_positions.get(username)
+        if user_position is None:
+            user_position = get_user_position(self.user_db_path, username)
         self.file_request_counts[request] += 1
         if user_position != (None, None):
-            nearest_server = self.scheduler.get_next_server(user_position)
+            nearest_server = self.scheduler.get_next_server(user_position, request)
             if nearest_server is None:
                 self.total_misses += 1
                 return 0, False  # 无法找到最近的服务器，返回
@@ -61,33 +132,36 @@ class UserSimulation:
             # 记录哪个服务器处理了请求
             server_index = self.servers.index(nearest_server)
             self.request_counts_by_server[server_index] += 1
+            self.user_server_index[username] = server_index
             self.request_log.append(f"Request for {request} by {username} handled by Server {server_index + 1}")
 
             server_position = nearest_server.get_position()
             distance = self.scheduler.calculate_distance(server_position, user_position)
             simulated_response_time = self.calculate_response_time(distance)
 
-            # 获取服务器响应，接收三个返回值
-            response, found, cached = nearest_server.process_request(request)
+            # 获取服务器响应，接收三个返回值；trace 记录请求经过的各级服务器
+            trace = RequestTrace(now)
+            response, found, cached = nearest_server.process_request(request, trace)
+
+            if self.prefetcher is not None:
+                self.prefetcher.record(nearest_server, request, found and cached)
 
             if found:
+                upstream_response_time = self._account_trace(trace, simulated_response_time)
+                if self.latency_model is not None:
+                    self.latency_model.record(now, trace, distance + trace.distance, request)
                 if cached:
                     self.hit_counts_by_server[server_index] += 1
                     self.total_hits += 1
-                    print(flush=True)
                     # print('simulated_response_time:', simulated_response_time, flush=True)
                     return simulated_response_time, True  # 缓存命中
                 else:
-                    # 未命中缓存，但在主服务器找到了文件
-                    main_server_position = nearest_server.main_server.get_position()
-                    server_to_main_distance = self.scheduler.calculate_distance(server_position, main_server_position)
-                    main_server_response_time = self.calculate_response_time(server_to_main_distance)
-                    total_response_time = simulated_response_time + main_server_response_time
-
-                    # 直接调用 nearest_server 的 add_file 方法
-                    nearest_server.add_file(request)
+                    # 未命中缓存，但在上游（区域节点或源站）找到了文件，时延为沿路径各跳之和；
+                    # 合并到进行中的回源请求时，时延为等待该请求完成的时间
+                    # 回源由服务器自己登记为进行中的请求（见 Server._track_fetch）
+                    total_response_time = simulated_response_time + upstream_response_time + trace.wait
+                    # 文件已由 process_request 在取回时加入缓存
                     # print('total_response_time:', total_response_time, flush=True)
-                    print(flush=True)
                     return total_response_time, False  # 未命中缓存但找到文件
 
             # 未找到文件的情况，记录未命中
@@ -98,9 +172,45 @@ class UserSimulation:
             return 0, False  # 如果用户位置无效，返回0和未命中
 
     def simulate_requests(self, num_requests_per_user):
+        def requests():
+            request_index = 0
+            for username, user_requests in self.user_requests.items():
+                for request in user_requests[:num_requests_per_user]:
+                    now = self.start_time + request_index / self.arrival_rate if self.arrival_rate else None
+                    request_index += 1
+                    yield username, request, now
+
+        total_response_time, std_dev_response_time, count = self._simulate(requests())
+        if self.arrival_rate:
+            self.start_time += count / self.arrival_rate
+        self.total_requests = len(self.user_requests) * num_requests_per_user
+        return total_response_time, std_dev_response_time
+
+    def simulate_stream(self, workload, num_requests=None, duration=None):
+        """
+        按 StreamingWorkload 生成的请求流仿真，请求的到达时刻由工作负载决定（从 start_time 起算）。
+
+        :param num_requests: 最多仿真的请求数
+        :param duration: 最多仿真的时长（秒）
+        """
+        start_time = self.start_time
+        end_time = [start_time if duration is None else start_time + duration]
+
+        def requests():
+            for t, username, request in workload.requests(num_requests, duration):
+                now = start_time + t
+                end_time[0] = max(end_time[0], now)
+                yield username, request, now
+
+        total_response_time, std_dev_response_time, count = self._simulate(requests())
+        self.start_time = end_time[0]
+        self.total_requests = count
+        return total_response_time, std_dev_response_time
+
+    def _simulate(self, requests):
+        """依次发送 requests 中的 (用户名, 文件名, 到达时刻)，返回 (总响应时间, 响应时间标准差, 请求数)"""
         total_response_time = 0
         user_response_times = []  # 用于存储每次请求的响应时间
-        total_requests = len(self.user_requests) * num_requests_per_user
 
         # 重置统计数据
         self.user_response_times.clear()
@@ -108,23 +218,44 @@ class UserSimulation:
         self.total_requests = 0
         self.request_counts_by_server = {i: 0 for i in range(len(self.servers))}
         self.hit_counts_by_server = [0] * len(self.servers)
+        self.tier_requests.clear()
+        self.tier_hits.clear()
+        self.tier_latency.clear()
+        self.origin_requests.clear()
+        self.origin_latency.clear()
+        if self.latency_model is not None:
+            self.latency_model.clear()
+        modeled_slots = []  # 由时延模型重新计算时延的请求在 user_response_times 中的位置
+
+        request_index = 0
+        for username, request, now in requests:
+            request_index += 1
+            modeled = len(self.latency_model.times) if self.latency_model is not None else 0
+            response_time, hit = self.send_request(request, username, now)
+            if self.latency_model is not None and len(self.latency_model.times) > modeled:
+                modeled_slots.append(len(user_response_times))
+            total_response_time += response_time
+            user_response_times.append(response_time)  # 记录每次请求的响应时间
+            self.user_response_times.append([username, request, response_time])
+            if self.metrics is not None and request_index % self.metrics.every == 0:
+                self.metrics.maybe_publish(self, user_response_times)
 
-        for username, requests in self.user_requests.items():
-            for i, request in enumerate(requests[:num_requests_per_user]):
-                response_time, hit = self.send_request(request, username)
-                total_response_time += response_time
-                user_response_times.append(response_time)  # 记录每次请求的响应时间
-                self.user_response_times.append([username, request, response_time])
+        if modeled_slots:
+            # 一次性按时延模型计算所有请求的时延，替换仿真循环中的距离估计
+            for slot, response_time in zip(modeled_slots, self.latency_model.response_times().tolist()):
+                user_response_times[slot] = response_time
+                self.user_response_times[slot][2] = response_time
+            total_response_time = sum(user_response_times)
+        if self.metrics is not None:
+            self.metrics.end_cell(self, user_response_times)
 
         # 计算响应时间的标准差
         std_dev_response_time = calculate_response_time_std(user_response_times)
 
-        self.total_requests = total_requests
-
         # 打印最终统计结果
         print(f"Total response time: {total_response_time:.2f}s")
 
-        return total_response_time, std_dev_response_time
+        return total_response_time, std_dev_response_time, request_index
 
 
     def print_server_hit_rates(self):
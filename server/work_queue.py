@@ -0,0 +1,200 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+
+def _to_json(value):
+    # numpy 标量等带 item() 的值转换为 Python 数值
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class WorkQueue:
+    """
+    保存在共享路径上的持久化任务队列（sqlite），多个主机上的 worker 通过租约领取任务。
+
+    领取任务时先把租约已过期的任务放回队列，再在同一个写事务中把最早的待执行任务租给该 worker；
+    完成任务时只有仍持有租约的 worker 能写回结果，因此租约过期后被重新执行的任务只会记录一次结果。
+    使用默认的回滚日志模式而不是 WAL：WAL 依赖共享内存，在网络文件系统上不可用。
+    """
+
+    def __init__(self, path, lease_seconds=600.0, timeout=60.0, max_attempts=3):
+        """
+        :param lease_seconds: 租约时长（秒），worker 执行期间定期续约，超过该时长未续约的任务会被重新放回队列
+        :param timeout: 等待其他进程释放数据库锁的最长时间（秒）
+        :param max_attempts: 租约过期的任务已被领取这么多次时标记为失败（例如每次都让 worker 崩溃的单元）
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT NOT NULL UNIQUE,
+            payload TEXT NOT NULL,
+            state TEXT NOT NULL,
+            worker TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            finished_at REAL
+        )''')
+
+    def enqueue(self, payloads):
+        """加入任务（可 JSON 序列化的字典），内容相同的任务只保留一个；返回新加入的任务数"""
+        rows = [(json.dumps(payload, sort_keys=True), json.dumps(payload), PENDING) for payload in payloads]
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany('INSERT OR IGNORE INTO tasks (key, payload, state) VALUES (?, ?, ?)', rows)
+            added = self.conn.total_changes - before
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def requeue_expired(self, now=None):
+        """把租约已过期的任务放回队列，尝试次数已达 max_attempts 的标记为失败；返回处理的任务数"""
+        cursor = self.conn.execute(
+            'UPDATE tasks SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, worker = NULL, '
+            'lease_expires = NULL, error = ? WHERE state = ? AND lease_expires < ?',
+            (self.max_attempts, PENDING, FAILED, 'lease expired', LEASED, now or time.time()))
+        return cursor.rowcount
+
+    def claim(self, worker):
+        """领取一个任务，返回 (任务 id, payload)；没有待执行的任务时返回 None"""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.requeue_expired(now)
+            row = self.conn.execute('SELECT id, payload FROM tasks WHERE state = ? ORDER BY id LIMIT 1',
+                                    (PENDING,)).fetchone()
+            if row is not None:
+                self.conn.execute('UPDATE tasks SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 '
+                                  'WHERE id = ?', (LEASED, worker, now + self.lease_seconds, row[0]))
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def renew(self, task_id, worker):
+        """续约，返回是否仍持有该任务的租约"""
+        cursor = self.conn.execute('UPDATE tasks SET lease_expires = ? WHERE id = ? AND state = ? AND worker = ?',
+                                   (time.time() + self.lease_seconds, task_id, LEASED, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, task_id, worker, result):
+        """写回结果；租约已失效（任务已被放回队列或由其他 worker 领取）时丢弃结果并返回 False"""
+        cursor = self.conn.execute(
+            'UPDATE tasks SET state = ?, result = ?, finished_at = ?, lease_expires = NULL '
+            'WHERE id = ? AND state = ? AND worker = ?',
+            (DONE, json.dumps(result, default=_to_json), time.time(), task_id, LEASED, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, task_id, worker, error, max_attempts=None):
+        """记录失败；尝试次数未达到 max_attempts（默认为队列的 max_attempts）时放回队列，否则标记为失败"""
+        max_attempts = max_attempts if max_attempts is not None else self.max_attempts
+        cursor = self.conn.execute(
+            'UPDATE tasks SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, worker = NULL, '
+            'lease_expires = NULL, error = ? WHERE id = ? AND state = ? AND worker = ?',
+            (max_attempts, PENDING, FAILED, error, task_id, LEASED, worker))
+        return cursor.rowcount == 1
+
+    def counts(self):
+        """返回 {状态: 任务数}"""
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        counts.update(self.conn.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state'))
+        return counts
+
+    def unfinished(self):
+        """待执行和租约中的任务数"""
+        counts = self.counts()
+        return counts[PENDING] + counts[LEASED]
+
+    def results(self):
+        """按任务顺序返回已完成任务的 (payload, 结果, worker)"""
+        rows = self.conn.execute('SELECT payload, result, worker FROM tasks WHERE state = ? ORDER BY id', (DONE,))
+        return [(json.loads(payload), json.loads(result), worker) for payload, result, worker in rows]
+
+    def errors(self):
+        """返回失败任务的 (payload, 错误信息)"""
+        rows = self.conn.execute('SELECT payload, error FROM tasks WHERE state = ? ORDER BY id', (FAILED,))
+        return [(json.loads(payload), error) for payload, error in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+class _LeaseKeeper:
+    """在后台线程中定期为正在执行的任务续约（使用独立的数据库连接）"""
+
+    def __init__(self, queue, task_id, worker):
+        self.queue = queue
+        self.task_id = task_id
+        self.worker = worker
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # sqlite 连接不能跨线程使用，在线程内打开
+        queue = WorkQueue(self.queue.path, self.queue.lease_seconds, self.queue.timeout)
+        try:
+            while not self.stopped.wait(queue.lease_seconds / 3):
+                if not queue.renew(self.task_id, self.worker):
+                    return
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run_worker(queue, run_task, worker=None, poll_interval=1.0, max_attempts=None, max_tasks=None):
+    """
+    循环领取并执行任务，直到队列中既没有待执行也没有租约中的任务（其他 worker 的租约可能过期，需要接手）。
+
+    :param run_task: run_task(payload) -> 可 JSON 序列化的结果
+    :param max_attempts: 任务抛出异常时的最多尝试次数，None 表示使用队列的 max_attempts
+    :param max_tasks: 最多执行的任务数，None 表示不限
+    :return: 本 worker 完成的任务数
+    """
+    worker = worker or default_worker_id()
+    completed = 0
+    while max_tasks is None or completed < max_tasks:
+        task = queue.claim(worker)
+        if task is None:
+            if not queue.unfinished():
+                break
+            time.sleep(poll_interval)
+            continue
+        task_id, payload = task
+        with _LeaseKeeper(queue, task_id, worker):
+            try:
+                result = run_task(payload)
+            except Exception:
+                queue.fail(task_id, worker, traceback.format_exc(), max_attempts)
+                continue
+        if queue.complete(task_id, worker, result):
+            completed += 1
+    return completed
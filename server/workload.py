@@ -0,0 +1,135 @@
+import numpy as np
+
+from server.user_initialization import generate_zipf_distribution
+
+
+class StreamingWorkload:
+    """
+    随时间变化的请求流，按块惰性生成，每块都是 numpy 数组，生成上亿个请求也不需要把它们全部放进内存。
+
+    - 请求速率按日周期变化：λ(t) = rate · (1 + diurnal_amplitude · cos(2π (t - diurnal_peak) / diurnal_period))，
+      用速率为 λ 上界的泊松过程生成候选时刻，再按 λ(t) / λ_max 的概率接受（thinning）；
+    - 流行度为按排名的齐普夫分布，排名通过在 CDF 上 searchsorted 一次性抽取；
+    - 流行度变化：每隔 churn_interval 秒，排名最末的 churn_new 个文件作为新内容进入排名最前，其余文件依次后移，
+      rank_drift > 0 时各文件的排名再加上标准差为 rank_drift 的随机扰动；
+    - 突发流量（flash crowd）：在给定时间窗口内，某个区域内的用户以额外的速率请求同一个文件。
+    """
+
+    def __init__(self, request_list, user_positions, zipf_s=1.0, rate=100.0, diurnal_amplitude=0.0,
+                 diurnal_period=86400.0, diurnal_peak=0.0, churn_interval=None, churn_new=1, rank_drift=0.0,
+                 flash_crowds=None, chunk_size=65536, rng=None):
+        """
+        :param request_list: 文件列表，初始排名即列表顺序
+        :param user_positions: 用户位置列表，与用户名 user_1, user_2 ... 一一对应
+        :param rate: 平均请求速率（每秒请求数）
+        :param diurnal_amplitude: 日周期振幅，0 表示速率恒定，取值 [0, 1)
+        :param flash_crowds: 突发事件列表，每项为
+            {'file': 文件名, 'start': 开始时间, 'duration': 持续秒数, 'rate': 额外请求速率,
+             'center': (x, y), 'radius': 区域半径}；不给 center 时所有用户都参与
+        :param rng: numpy Generator
+        """
+        self.request_list = list(request_list)
+        self.user_positions = np.asarray(user_positions, dtype=float).reshape(-1, 2)
+        self.rate = rate
+        self.diurnal_amplitude = diurnal_amplitude
+        self.diurnal_period = diurnal_period
+        self.diurnal_peak = diurnal_peak
+        self.churn_interval = churn_interval
+        self.churn_new = churn_new
+        self.rank_drift = rank_drift
+        self.chunk_size = chunk_size
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.cdf = np.cumsum(generate_zipf_distribution(len(self.request_list), zipf_s))
+        self.order = np.arange(len(self.request_list))  # 排名 -> 文件下标
+        self.epoch = 0
+        self.file_index = {filename: i for i, filename in enumerate(self.request_list)}
+        self.flash_crowds = []
+        for event in flash_crowds or []:
+            if 'center' in event:
+                offsets = self.user_positions - np.asarray(event['center'], dtype=float)
+                users = np.flatnonzero(np.hypot(offsets[:, 0], offsets[:, 1]) <= event['radius'])
+            else:
+                users = np.arange(len(self.user_positions))
+            self.flash_crowds.append((float(event['start']), float(event['start'] + event['duration']),
+                                      float(event['rate']), self.file_index[event['file']], users))
+        self._clock = 0.0  # 最后一个候选到达时刻
+
+    def rate_at(self, times):
+        """时刻 times（标量或数组）的请求速率"""
+        phase = 2 * np.pi * (np.asarray(times) - self.diurnal_peak) / self.diurnal_period
+        return self.rate * (1 + self.diurnal_amplitude * np.cos(phase))
+
+    def _advance_epoch(self, epoch):
+        """把流行度排名推进到第 epoch 个周期"""
+        n = len(self.order)
+        while self.epoch < epoch:
+            new = min(self.churn_new, n)
+            if new:
+                self.order = np.concatenate([self.order[n - new:], self.order[:n - new]])
+            if self.rank_drift > 0:
+                keys = np.arange(n) + self.rng.normal(0, self.rank_drift, n)
+                self.order = self.order[np.argsort(keys, kind='stable')]
+            self.epoch += 1
+
+    def _base_chunk(self):
+        max_rate = self.rate * (1 + self.diurnal_amplitude)
+        times = self._clock + np.cumsum(self.rng.exponential(1 / max_rate, self.chunk_size))
+        self._clock = float(times[-1])
+        if self.diurnal_amplitude:
+            times = times[self.rng.random(len(times)) * max_rate < self.rate_at(times)]
+        ranks = np.searchsorted(self.cdf, self.rng.random(len(times)) * self.cdf[-1], side='right')
+        ranks = np.minimum(ranks, len(self.order) - 1)
+        files = np.empty(len(times), dtype=np.int64)
+        if self.churn_interval:
+            epochs = (times // self.churn_interval).astype(np.int64)
+            for epoch in np.unique(epochs).tolist():
+                self._advance_epoch(epoch)
+                in_epoch = epochs == epoch
+                files[in_epoch] = self.order[ranks[in_epoch]]
+        else:
+            files[:] = self.order[ranks]
+        users = self.rng.integers(0, len(self.user_positions), len(times))
+        return times, users, files
+
+    def chunks(self):
+        """无限的请求块生成器，每块为按时间排序的 (到达时刻, 用户下标, 文件下标) 三个数组"""
+        while True:
+            start = self._clock
+            times, users, files = self._base_chunk()
+            end = self._clock
+            extra = [(times, users, files)]
+            for event_start, event_end, event_rate, file_index, event_users in self.flash_crowds:
+                low, high = max(start, event_start), min(end, event_end)
+                if high <= low or not len(event_users):
+                    continue
+                count = self.rng.poisson(event_rate * (high - low))
+                extra.append((self.rng.uniform(low, high, count), self.rng.choice(event_users, count),
+                              np.full(count, file_index, dtype=np.int64)))
+            if len(extra) > 1:
+                times, users, files = (np.concatenate(parts) for parts in zip(*extra))
+                order = np.argsort(times, kind='stable')
+                times, users, files = times[order], users[order], files[order]
+            yield times, users, files
+
+    def stream(self, num_requests=None, duration=None):
+        """生成最多 num_requests 个请求、或到 duration 秒为止的请求块"""
+        emitted = 0
+        for times, users, files in self.chunks():
+            keep = len(times)
+            if duration is not None:
+                keep = int(np.searchsorted(times, duration, side='left'))
+            if num_requests is not None:
+                keep = min(keep, num_requests - emitted)
+            done = keep < len(times) or (num_requests is not None and emitted + keep >= num_requests)
+            emitted += keep
+            if keep:
+                yield times[:keep], users[:keep], files[:keep]
+            if done:
+                return
+
+    def requests(self, num_requests=None, duration=None):
+        """逐个生成 (到达时刻, 用户名, 文件名)"""
+        names = self.request_list
+        for times, users, files in self.stream(num_requests, duration):
+            for t, user, file_index in zip(times.tolist(), users.tolist(), files.tolist()):
+                yield t, f'user_{user + 1}', names[file_index]
@@ -0,0 +1,36 @@
+from server.adaptive_sweep import adaptive_server_counts, coarse_server_counts, refine_intervals
+
+
+def test_coarse_counts_include_both_ends():
+    assert coarse_server_counts(6, 64, 5) == [6, 20, 35, 50, 64]
+    assert coarse_server_counts(6, 7, 5) == [6, 7]
+    assert coarse_server_counts(6, 6) == [6]
+
+
+def test_smooth_curves_are_not_refined():
+    counts = [6, 20, 35, 50, 64]
+    curves = {'LRU': {'mean_response_ms': [600 - 2 * n for n in counts]},
+              'FIFO': {'mean_response_ms': [650 - 2 * n for n in counts]}}
+    assert refine_intervals(counts, curves) == set()
+
+
+def test_crossing_strategies_are_refined():
+    counts = [6, 20, 35, 50, 64]
+    curves = {'LRU': {'hit_rate': [50.0] * 5}, 'FIFO': {'hit_rate': [45 + n / 5 for n in counts]}}
+    assert refine_intervals(counts, curves) == {(20, 35)}
+
+
+def test_sampling_concentrates_around_the_bend():
+    evaluated = []
+
+    def evaluate(num_servers):
+        evaluated.append(num_servers)
+        return {'LRU': {'mean_response_ms': 1000.0 - 20 * min(num_servers, 23)}}
+
+    counts, samples = adaptive_server_counts(evaluate, 6, 64, num_points=5)
+    assert counts == sorted(samples) == sorted(evaluated)
+    assert len(evaluated) == len(set(evaluated)) < 20
+    # 拐点两侧被加密到相邻的整数
+    assert 22 in counts and 23 in counts and 24 in counts
+    # 远离拐点的平坦部分保持粗粒度
+    assert not [n for n in counts if 50 < n < 64]
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from server.analytical import characteristic_time, estimate_cell, hit_probabilities, hit_ratio, main
+from server.user_initialization import generate_zipf_distribution
+
+POPULARITY = generate_zipf_distribution(100, 1.0)
+
+
+def simulate(cache_size, promote, num_requests=100000):
+    """独立引用模型下直接模拟 LRU（promote=True）或 FIFO 缓存的命中率"""
+    requests = np.random.default_rng(0).choice(len(POPULARITY), size=num_requests, p=POPULARITY)
+    cache, hits = OrderedDict(), 0
+    for request in requests.tolist():
+        if request in cache:
+            hits += 1
+            if promote:
+                cache.move_to_end(request)
+        else:
+            cache[request] = True
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+    return hits / num_requests
+
+
+@pytest.mark.parametrize('model', ['lru', 'fifo'])
+def test_characteristic_time_fills_the_cache(model):
+    t = characteristic_time(POPULARITY, 20, model)
+    assert hit_probabilities(POPULARITY, 20, model).sum() == pytest.approx(20)
+    assert np.isfinite(t) and np.isinf(characteristic_time(POPULARITY, 100, model))
+    assert hit_ratio(POPULARITY, 100, model) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('cache_size', [5, 20, 50])
+def test_che_approximation_matches_simulation(cache_size):
+    assert hit_ratio(POPULARITY, cache_size, 'lru') == pytest.approx(simulate(cache_size, True), abs=0.015)
+    assert hit_ratio(POPULARITY, cache_size, 'fifo') == pytest.approx(simulate(cache_size, False), abs=0.015)
+    assert hit_ratio(POPULARITY, cache_size, 'lfu') > hit_ratio(POPULARITY, cache_size, 'lru')
+
+
+def test_cold_start_correction():
+    steady = hit_ratio(POPULARITY, 20, 'lru')
+    assert hit_ratio(POPULARITY, 20, 'lru', num_requests=200) < hit_ratio(POPULARITY, 20, 'lru', num_requests=5000) < steady
+    assert hit_ratio(POPULARITY, 20, 'lru', 200, preloaded=20) > hit_ratio(POPULARITY, 20, 'lru', 200)
+
+
+def test_estimate_cell_per_server_and_fleet():
+    users = [(-10, 0), (-20, 0), (-30, 0), (40, 0)]
+    servers = [(-20, 0), (40, 0)]
+    estimate = estimate_cell(users, servers, 20, 'LRU', origin_position=(0, 0))
+    assert estimate['server_share'] == [0.75, 0.25]
+    hit = hit_ratio(POPULARITY, 20, 'lru')
+    assert estimate['server_hit_ratio'] == pytest.approx([hit, hit])
+    # 往返时延 2·d 毫秒：用户到节点的平均距离加上未命中时节点到源站的距离
+    expected = [2 * (20 / 3 + (1 - hit) * 20), 2 * (0 + (1 - hit) * 40)]
+    assert estimate['server_mean_ms'] == pytest.approx(expected)
+    assert estimate['mean_response_ms'] == pytest.approx(0.75 * expected[0] + 0.25 * expected[1])
+    assert estimate['hit_rate'] == pytest.approx(hit * 100)
+
+    with pytest.raises(ValueError):
+        estimate_cell(users, servers, 20, 'ARC')
+
+
+def test_cli(capsys):
+    assert main(['--users', '500', '--min-servers', '4', '--max-servers', '5', '--cache-strategies', 'LRU']) == 0
+    assert capsys.readouterr().out.count('LRU:') == 2
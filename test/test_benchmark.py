@@ -0,0 +1,37 @@
+import json
+
+from server.benchmark import bench_caches, compare, main
+
+
+def test_cache_bench_reports_rate_memory_and_hit_rate():
+    strategies = ('LRU', 'COMPACT_LRU')
+    results, info = bench_caches(strategies=strategies, num_ops=500, catalog=1000, cache_size=100)
+    expected = {f'{suite}/{strategy}/{workload}/ops_per_s' for suite in ('cache', 'server_cache')
+                for strategy in strategies for workload in ('zipf', 'scan')}
+    assert set(results) == expected | {f'cache/{strategy}/bytes_per_entry' for strategy in strategies}
+    assert all(metric['value'] > 0 for metric in results.values())
+    # 循环扫描比缓存大的目录时 LRU 一次也不会命中
+    assert info['cache/LRU/scan/hit_rate'] == 0
+    assert info['cache/LRU/zipf/hit_rate'] == info['cache/COMPACT_LRU/zipf/hit_rate'] > 0
+    # 不计入服务器和键本身时，紧凑 LRU 每项占用的内存明显小于 OrderedDict 实现
+    assert results['cache/COMPACT_LRU/bytes_per_entry']['value'] * 2 < results['cache/LRU/bytes_per_entry']['value']
+
+
+def test_compare_flags_regressions_in_the_right_direction(tmp_path):
+    def report(ops, memory, latency):
+        return {'results': {
+            'cache/LRU/zipf/ops_per_s': {'value': ops, 'unit': 'ops/s', 'higher_is_better': True},
+            'cache/LRU/bytes_per_entry': {'value': memory, 'unit': 'B', 'higher_is_better': False},
+            'scheduler/nearest/64/us_per_request': {'value': latency, 'unit': 'us', 'higher_is_better': False},
+        }}
+
+    baseline, current = report(1000, 100, 10), report(850, 95, 5)
+    statuses = {name: status for name, _, _, _, status in compare(baseline, current, threshold=0.10)}
+    assert statuses == {'cache/LRU/zipf/ops_per_s': 'regression', 'cache/LRU/bytes_per_entry': 'ok',
+                        'scheduler/nearest/64/us_per_request': 'improvement'}
+
+    baseline_path, current_path = tmp_path / 'base.json', tmp_path / 'current.json'
+    baseline_path.write_text(json.dumps(baseline))
+    current_path.write_text(json.dumps(current))
+    assert main(['compare', str(baseline_path), str(current_path)]) == 1
+    assert main(['compare', str(baseline_path), str(current_path), '--threshold', '0.2']) == 0
@@ -0,0 +1,49 @@
+from server.server import RequestTrace
+from server.server_initialization import enable_content_serving, initialize_servers
+
+
+def make_edge(tmp_path, coalesce):
+    main_server, servers = initialize_servers(str(tmp_path), 1, [(300, 400)], (0, 0), cache_size=5,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    servers[0].coalesce = coalesce
+    return main_server, servers[0]
+
+
+def cold_burst(edge, arrivals):
+    """同一冷文件的一串请求；第一个请求回源，边缘节点到源站相距 500，往返 1 秒"""
+    traces = []
+    for now in arrivals:
+        trace = RequestTrace(now)
+        _, found, cached = edge.process_request('fixed_file_3.txt', trace)
+        assert found
+        traces.append(trace)
+    return traces
+
+
+def test_concurrent_misses_wait_on_one_origin_fetch(tmp_path):
+    main_server, edge = make_edge(tmp_path, coalesce=True)
+    traces = cold_burst(edge, [0.0, 0.25, 0.5, 1.5])
+    assert edge.coalesced_count == 2 and edge.duplicate_fetch_count == 0
+    assert [trace.wait for trace in traces[1:3]] == [0.75, 0.5]
+    assert main_server.request_count == 1
+    # 回源完成后到达的请求直接命中缓存
+    assert traces[3].hops == [edge]
+
+
+def test_without_coalescing_each_concurrent_miss_goes_to_origin(tmp_path):
+    main_server, edge = make_edge(tmp_path, coalesce=False)
+    cold_burst(edge, [0.0, 0.25, 0.5])
+    assert edge.coalesced_count == 0 and edge.duplicate_fetch_count == 2
+    assert main_server.request_count == 3
+
+
+def test_coalesced_miss_serves_content(tmp_path):
+    main_server, edge = make_edge(tmp_path, coalesce=True)
+    enable_content_serving([main_server, edge])
+    first, second = RequestTrace(0.0), RequestTrace(0.25)
+    fetched, _, _ = edge.process_request('fixed_file_3.txt', first)
+    content, found, cached = edge.process_request('fixed_file_3.txt', second)
+    assert second.coalesced and found and not cached
+    expected = (tmp_path / 'fixed_file_3.txt').read_bytes()
+    assert bytes(fetched) == bytes(content) == expected
+    assert edge.content.requests_served == 1 and edge.content.bytes_served == len(expected)
@@ -0,0 +1,130 @@
+import random
+import tracemalloc
+from collections import OrderedDict
+
+from modules.compact_cache import (CompactARCCache, CompactFIFOCache, CompactLFUCache, CompactLRUCache,
+                                   CompactRRCache, FileIdCache)
+
+
+def _zipf_trace(num_objects, length, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(num_objects)]
+    return rng.choices(range(num_objects), weights=weights, k=length)
+
+
+def test_lru_matches_ordered_dict():
+    cache = CompactLRUCache(8, 50)
+    reference = OrderedDict()
+    for oid in _zipf_trace(50, 2000):
+        hit = cache.access(oid)
+        assert hit == (oid in reference)
+        if hit:
+            reference.move_to_end(oid)
+        else:
+            if len(reference) >= 8:
+                assert cache.add(oid) == reference.popitem(last=False)[0]
+            else:
+                assert cache.add(oid) is None
+            reference[oid] = True
+        assert cache.cache_content() == list(reference)
+
+
+def test_fifo_keeps_insertion_order():
+    cache = CompactFIFOCache(3, 10)
+    for oid in (1, 2, 3):
+        cache.add(oid)
+    assert cache.access(1)
+    assert cache.add(4) == 1
+    assert cache.cache_content() == [2, 3, 4]
+
+
+def test_rr_swap_remove_keeps_index_consistent():
+    cache = CompactRRCache(16, 100, rng=random.Random(1))
+    for oid in _zipf_trace(100, 3000, seed=2):
+        if not cache.access(oid):
+            cache.add(oid)
+        content = cache.cache_content()
+        assert len(content) == len(set(content)) == len(cache) <= 16
+        for slot, cached in enumerate(content):
+            assert cache.slot_of[cached] == slot
+    cache.remove(content[0])
+    assert not cache.access(content[0])
+
+
+def test_lfu_evicts_least_frequent_then_oldest():
+    cache = CompactLFUCache(3, 10)
+    for oid in (1, 2, 3):
+        cache.add(oid)
+    cache.access(1)
+    cache.access(1)
+    cache.access(3)
+    assert cache.add(4) == 2
+    assert cache.frequency(1) == 3
+    assert cache.add(5) == 4
+    assert cache.cache_content() == [5, 3, 1]
+
+
+def test_arc_ghost_hit_promotes_to_t2():
+    cache = CompactARCCache(2, 10)
+    cache.add(1)
+    cache.add(2)
+    cache.access(2)
+    assert cache.add(3) == 1
+    assert not cache.access(1)  # 幽灵项不算命中
+    cache.add(1)
+    assert cache.p > 0
+    assert 1 in cache.lists.keys(1)
+    for oid in _zipf_trace(10, 2000):
+        if not cache.access(oid):
+            cache.add(oid)
+        size = cache.lists.size
+        assert size[0] + size[1] <= 2
+        assert sum(size) <= 4
+
+
+def test_file_id_cache_translates_names():
+    file_ids = {f'fixed_file_{i}.txt': i - 1 for i in range(1, 6)}
+    cache = FileIdCache(CompactLRUCache(2, len(file_ids)), file_ids)
+    cache.add('fixed_file_1.txt')
+    cache.add('fixed_file_2.txt')
+    assert cache.add('fixed_file_3.txt') == 'fixed_file_1.txt'
+    assert cache.access('fixed_file_3.txt')
+    assert not cache.access('unknown.txt')
+    assert cache.cache_content() == ['fixed_file_2.txt', 'fixed_file_3.txt']
+
+
+def test_lru_entry_memory_is_an_order_smaller():
+    n = 20000
+    names = [f'fixed_file_{i}.txt' for i in range(n)]
+    tracemalloc.start()
+    reference = OrderedDict()
+    for i in range(n):
+        reference[f'fixed_file_{i}.txt'] = True
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    cache = CompactLRUCache(n, len(names))
+    for i in range(n):
+        cache.add(i)
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert compact_bytes * 10 < dict_bytes
+
+
+def test_index_arrays_widen_for_large_catalogs():
+    small = CompactLRUCache(100, 30000)
+    large = CompactLRUCache(100, 40000)
+    assert small.slot_of.itemsize == 2 and large.slot_of.itemsize == 4
+    large.add(39999)
+    assert large.access(39999) and large.cache_content() == [39999]
+
+
+def test_contains_does_not_touch_policy_state():
+    arc = CompactARCCache(2, 10)
+    arc.add(1)
+    arc.add(2)
+    assert arc.contains(1) and not arc.contains(3)
+    assert arc.cache_content() == [1, 2] and arc.add(3) == 1
+    lfu = CompactLFUCache(2, 10)
+    lfu.add(1)
+    assert lfu.contains(1) and lfu.frequency(1) == 1
@@ -0,0 +1,51 @@
+from modules.consistent_hash import ConsistentHashScheduler
+
+
+class StubServer:
+    def __init__(self, position):
+        self.position = position
+
+    def get_position(self):
+        return self.position
+
+
+SERVERS = [StubServer((x, y)) for x in (0, 100, 200, 900) for y in (0, 100)]
+
+
+def test_same_file_goes_to_same_server_within_latency_bound():
+    scheduler = ConsistentHashScheduler(SERVERS, latency_bound=250)
+    chosen = {scheduler.get_next_server((50, 50), f'file_{i}') for i in range(200)}
+    # 内容被划分到多个邻近节点，远处（x=900）的节点不在候选范围内
+    assert len(chosen) > 2 and all(server.position[0] < 900 for server in chosen)
+    for i in range(20):
+        first = scheduler.get_next_server((50, 50), f'file_{i}')
+        assert scheduler.get_next_server((60, 40), f'file_{i}') is first
+
+
+def test_bounded_load_spreads_a_single_hot_file():
+    scheduler = ConsistentHashScheduler(SERVERS[:6], latency_bound=1000, load_factor=1.25)
+    for _ in range(600):
+        scheduler.get_next_server((100, 50), 'hot_file')
+    assert max(scheduler.assigned) <= 1.25 * 600 / 6 + 1
+
+
+def test_bounded_load_is_relative_to_the_candidate_set():
+    # 只有 x < 900 的 6 台服务器是候选；全局平均负载远低于它们的负载，上限仍然有效
+    scheduler = ConsistentHashScheduler(SERVERS, latency_bound=250, load_factor=1.25)
+    for _ in range(600):
+        scheduler.get_next_server((100, 50), 'hot_file')
+    assert len(scheduler.candidates((100, 50))) == 6
+    assert max(scheduler.assigned) <= 1.25 * 600 / 6 + 1
+
+
+def test_removing_a_server_only_moves_its_own_files():
+    files = [f'file_{i}' for i in range(300)]
+    before = ConsistentHashScheduler(SERVERS, latency_bound=2000)
+    placement = {name: before.get_next_server((50, 50), name) for name in files}
+    removed = SERVERS[2]
+    # 去掉一台服务器并打乱剩余服务器的顺序
+    after = ConsistentHashScheduler([server for server in reversed(SERVERS) if server is not removed],
+                                    latency_bound=2000)
+    for name in files:
+        if placement[name] is not removed:
+            assert after.get_next_server((50, 50), name) is placement[name]
@@ -0,0 +1,51 @@
+import os
+
+from server.server_initialization import enable_content_serving, initialize_servers
+
+
+def test_hits_return_file_bytes_and_eviction_releases_mapping(tmp_path):
+    data_dir = str(tmp_path)
+    main_server, servers = initialize_servers(data_dir, 1, [(100, 100)], (0, 0), cache_size=1,
+                                              cache_strategy_class='FIFO', top_n_files=[])
+    edge = servers[0]
+    enable_content_serving([edge, main_server])
+
+    content, found, cached = edge.process_request('fixed_file_1.txt')
+    assert found and not cached
+    with open(os.path.join(data_dir, 'fixed_file_1.txt'), 'rb') as f:
+        expected = f.read()
+    assert isinstance(content, memoryview) and content == expected  # 未命中时由源站的映射提供
+    assert main_server.content.bytes_served == len(expected)
+
+    content, _, cached = edge.process_request('fixed_file_1.txt')
+    assert cached and content == expected and 'fixed_file_1.txt' in edge.content
+
+    # 容量为 1，加入另一个文件会淘汰 fixed_file_1 并释放它的映射
+    edge.process_request('fixed_file_2.txt')
+    assert 'fixed_file_1.txt' not in edge.content and edge.content.released_count == 1
+    assert edge.content.throughput() > 0
+
+    edge.close()
+    main_server.close()
+    assert not edge.content.mappings and not main_server.content.mappings
+
+
+def test_released_mapping_keeps_callers_views_valid(tmp_path):
+    data_dir = str(tmp_path)
+    main_server, servers = initialize_servers(data_dir, 1, [(100, 100)], (0, 0), cache_size=1,
+                                              cache_strategy_class='LRU', top_n_files=[])
+    edge = servers[0]
+    enable_content_serving([edge])
+    edge.process_request('fixed_file_1.txt')
+    held, _, cached = edge.process_request('fixed_file_1.txt')
+    assert cached
+    expected = bytes(held)
+
+    # 淘汰 fixed_file_1：调用方的视图仍然可用，映射等视图释放后才关闭
+    edge.process_request('fixed_file_2.txt')
+    assert 'fixed_file_1.txt' not in edge.content and bytes(held) == expected
+    assert len(edge.content.closing) == 1
+    held.release()
+    edge.content.close()
+    assert not edge.content.closing
+    main_server.close()
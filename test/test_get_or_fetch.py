@@ -0,0 +1,77 @@
+import pytest
+
+from modules.LRU_cache import LRUCache
+from server.server_initialization import initialize_servers
+from server.user_simulation import UserSimulation
+
+STRATEGIES = ['LRU', 'LFU', 'FIFO', 'RR', 'ARC', 'COMPACT_LRU', 'COMPACT_LFU', 'COMPACT_ARC']
+FILES = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+
+
+def build(tmp_path, strategy, cache_size=3):
+    data_dir = str(tmp_path / 'data')
+    tmp_path.joinpath('data').mkdir()
+    main_server, servers = initialize_servers(data_dir, 1, [(10, 10)], main_server_position=(0, 0),
+                                              cache_size=cache_size, cache_strategy_class=strategy, top_n_files=[])
+    simulation = UserSimulation(servers, FILES, None, request_interval=0.5, scheduler='nearest',
+                                user_positions={'user_1': (0, 0)})
+    return main_server, servers[0], simulation
+
+
+def db_files(server):
+    return sorted(row[0] for row in server.conn.execute('SELECT filename FROM files'))
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES)
+def test_misses_are_admitted_and_mirrored(tmp_path, strategy):
+    main_server, edge, simulation = build(tmp_path, strategy)
+    for filename in FILES[:5]:
+        assert simulation.send_request(filename, 'user_1')[1] is False
+    content = edge.cache_strategy.cache_content()
+    assert len(content) == 3 and sorted(content) == db_files(edge)
+    assert simulation.send_request(content[-1], 'user_1')[1] is True
+
+
+class CountingLRU(LRUCache):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.calls = []
+
+    def access(self, filename):
+        self.calls.append('access')
+        return super().access(filename)
+
+    def evict(self):
+        self.calls.append('evict')
+        return super().evict()
+
+    def _admit(self, filename):
+        self.calls.append('admit')
+        return super()._admit(filename)
+
+
+def test_one_lookup_per_request(tmp_path):
+    main_server, edge, simulation = build(tmp_path, 'LRU', cache_size=1)
+    edge.cache_strategy = CountingLRU(1, edge)
+    simulation.send_request(FILES[0], 'user_1')
+    assert edge.cache_strategy.calls == ['access', 'admit']
+    edge.cache_strategy.calls.clear()
+    simulation.send_request(FILES[0], 'user_1')
+    assert edge.cache_strategy.calls == ['access']
+    edge.cache_strategy.calls.clear()
+    simulation.send_request(FILES[1], 'user_1')
+    assert edge.cache_strategy.calls == ['access', 'admit', 'evict']
+
+
+def test_lfu_frequency_is_not_inflated(tmp_path):
+    _, edge, simulation = build(tmp_path, 'LFU')
+    simulation.send_request(FILES[0], 'user_1')
+    assert edge.cache_strategy.cache[FILES[0]] == 1
+    simulation.send_request(FILES[0], 'user_1')
+    assert edge.cache_strategy.cache[FILES[0]] == 2
+
+
+def test_arc_miss_is_not_promoted(tmp_path):
+    _, edge, simulation = build(tmp_path, 'ARC')
+    simulation.send_request(FILES[0], 'user_1')
+    assert FILES[0] in edge.cache_strategy.t1 and FILES[0] not in edge.cache_strategy.t2
@@ -0,0 +1,47 @@
+from server.server import RequestTrace
+from server.server_initialization import attach_regions, initialize_servers
+from server.user_simulation import UserSimulation
+
+
+def build(tmp_path, regions):
+    data_dir = str(tmp_path / 'data')
+    tmp_path.joinpath('data').mkdir()
+    positions = [(100, 100), (120, 100), (900, 900)]
+    main_server, servers = initialize_servers(data_dir, 3, positions, main_server_position=(0, 0), cache_size=5,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    region_servers = attach_regions(data_dir, servers, main_server, regions)
+    return main_server, servers, region_servers
+
+
+def test_edges_attach_to_nearest_region_and_trace_records_path(tmp_path):
+    regions = [{'position': (150, 150), 'cache_strategy': 'COMPACT_LRU', 'cache_size': 10},
+               {'position': (800, 800), 'cache_strategy': 'COMPACT_LRU', 'cache_size': 10}]
+    main_server, servers, region_servers = build(tmp_path, regions)
+    assert [server.main_server for server in servers] == [region_servers[0], region_servers[0], region_servers[1]]
+    assert all(region.main_server is main_server and region.tier == 'region' for region in region_servers)
+
+    trace = RequestTrace()
+    _, found, cached = servers[0].process_request('fixed_file_1.txt', trace)
+    assert found and not cached
+    assert [hop.tier for hop in trace.hops] == ['edge', 'region', 'origin']
+
+    # 同一区域内的另一个边缘节点由区域节点直接提供，不再回源
+    trace = RequestTrace()
+    servers[1].process_request('fixed_file_1.txt', trace)
+    assert trace.hops == [servers[1], region_servers[0]]
+
+
+def test_tier_accounting(tmp_path):
+    main_server, servers, region_servers = build(tmp_path, [{'position': (100, 110), 'cache_size': 10,
+                                                             'cache_strategy': 'COMPACT_LRU'}])
+    simulation = UserSimulation(servers, [f'fixed_file_{i}.txt' for i in range(1, 101)], None, request_interval=0.5,
+                                scheduler='nearest')
+    for server, request in ((servers[0], 'fixed_file_2.txt'), (servers[1], 'fixed_file_2.txt')):
+        trace = RequestTrace()
+        server.process_request(request, trace)
+        upstream = simulation._account_trace(trace, 0.1)
+        assert upstream > 0
+    stats = simulation.tier_stats()
+    assert stats['edge']['requests'] == 2 and stats['edge']['hit_rate'] == 0
+    assert stats['region']['requests'] == 2 and stats['region']['hit_rate'] == 50
+    assert stats['origin']['requests'] == 1 and stats['origin']['hit_rate'] == 100
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from server.latency import LatencyModel
+from server.server import RequestTrace
+
+
+class StubServer:
+    def __init__(self, tier):
+        self.tier = tier
+
+
+def make_trace(*hops):
+    trace = RequestTrace()
+    trace.hops.extend(hops)
+    return trace
+
+
+def test_components_match_sizes_bandwidth_and_distance():
+    edge, origin = StubServer('edge'), StubServer('origin')
+    model = LatencyModel({'small': 10_000, 'big': 5_000_000}, bandwidth={'edge': 1e6, 'origin': 1e7},
+                         service_rate=1e9)
+    model.record(0.0, make_trace(edge), 100, 'small')
+    model.record(0.0, make_trace(edge, origin), 600, 'big')
+    propagation, transfer, queueing = model.components()
+    assert np.allclose(propagation, [0.2, 1.2])
+    assert np.allclose(transfer, [0.01, 5.0])
+    assert np.all(queueing < 1e-6)
+
+
+def test_queueing_grows_with_server_load():
+    busy, idle = StubServer('edge'), StubServer('edge')
+    model = LatencyModel({}, service_rate=100, window=1.0)
+    for i in range(90):
+        model.record(i / 90, make_trace(busy), 0, 'f')
+    model.record(0.5, make_trace(idle), 0, 'f')
+    queueing = model.components()[2]
+    # 忙的节点 ρ=0.9：等待 0.9/(100·0.1) + 服务 0.01
+    assert queueing[0] == pytest.approx(0.1)
+    assert queueing[-1] == pytest.approx(0.01 / (100 * 0.99) + 0.01)
+
+
+def test_every_hop_on_the_path_adds_queueing_load():
+    edges = [StubServer('edge') for _ in range(90)]
+    region, origin, peer = StubServer('region'), StubServer('origin'), StubServer('edge')
+    model = LatencyModel({}, service_rate=100, window=1.0)
+    # 90 个边缘节点各有一次未命中经过同一个区域节点，其中一次还白白探测了一个对等节点
+    for i, edge in enumerate(edges):
+        trace = make_trace(edge, region, origin)
+        if i == 0:
+            trace.wasted_probes.append(peer)
+        model.record(i / 90, trace, 0, 'f')
+    queueing = model.components()[2]
+    lightly_loaded = 0.01 / (100 * 0.99) + 0.01  # 一个窗口内只有一次到达
+    busy = 0.1  # 90 次到达，ρ=0.9
+    # 边缘节点和对等节点各到达一次，区域节点和源站各到达 90 次，排队时延为路径上各跳之和
+    assert queueing[0] == pytest.approx(2 * lightly_loaded + 2 * busy)
+    assert queueing[1] == pytest.approx(lightly_loaded + 2 * busy)
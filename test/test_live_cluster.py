@@ -0,0 +1,33 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from server.live_cluster import build_plan, run_live
+from server.server_initialization import initialize_servers
+
+
+def test_replay_against_live_endpoints(tmp_path):
+    data_dir = str(tmp_path)
+    main_server, servers = initialize_servers(data_dir, 2, [(-100, 0), (100, 0)], (0, 0), cache_size=3,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    user_requests = {'user_1': ['fixed_file_1.txt', 'fixed_file_2.txt', 'fixed_file_1.txt'],
+                     'user_2': ['fixed_file_1.txt', 'fixed_file_1.txt', 'fixed_file_3.txt']}
+    plan = build_plan(user_requests, {'user_1': (-90, 0), 'user_2': (90, 0)}, servers, 3)
+    assert [edge for edge, _ in plan] == [0, 1, 0, 1, 0, 1]
+
+    report = asyncio.run(run_live(main_server, servers, plan, arrival_rate=200, concurrency=4,
+                                  rng=np.random.default_rng(0)))
+    assert report['errors'] == 0 and report['requests'] == 6
+    assert report['server_requests'] == [3, 3]
+    # 每个未命中都经 socket 回源一次（并发的未命中可能各自回源）
+    hits = [round(rate * 3 / 100) for rate in report['server_hit_rates']]
+    assert report['origin_requests'] == 6 - sum(hits)
+    assert report['origin_requests'] >= 4  # 每个边缘节点上每个文件的第一次请求必然回源
+    expected_bytes = sum(os.path.getsize(os.path.join(data_dir, filename)) for _, filename in plan)
+    assert report['throughput_mbps'] * report['elapsed_s'] * 1e6 / 8 == pytest.approx(expected_bytes)
+    assert report['p99_ms'] >= report['p50_ms'] > 0
+
+    for server in servers + [main_server]:
+        server.close()
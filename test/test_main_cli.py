@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+
+from main import parse_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_flags_override_config_file(tmp_path):
+    config_path = tmp_path / 'sweep.json'
+    config_path.write_text(json.dumps({'num_users': 200, 'cache_strategies': ['LRU'], 'seeds': [1, 2]}))
+    config = parse_args(['--config', str(config_path), '--users', '50', '--max-servers', '8'])
+    assert config['num_users'] == 50
+    assert config['cache_strategies'] == ['LRU']
+    assert config['seeds'] == [1, 2]
+    assert config['max_servers'] == 8
+    assert config['headless'] is False
+
+
+def test_headless_run_never_imports_matplotlib(tmp_path):
+    script = (
+        "import sys, main\n"
+        "main.main(sys.argv[1:])\n"
+        "assert 'matplotlib' not in sys.modules and 'pandas' not in sys.modules\n"
+    )
+    command = (
+        [sys.executable, '-c', script, '--headless', '--users', '20', '--requests-per-user', '2',
+         '--cache-strategies', 'COMPACT_LRU', '--schedulers', 'nearest', '--min-servers', '6', '--max-servers', '6',
+         '--seeds', '3', '--output-dir', str(tmp_path / 'results')])
+    env = {**os.environ, 'PYTHONPATH': ROOT}
+    result = subprocess.run(command, cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert 'Servers: 6, Avg response time' in result.stdout
+
+    # 再次运行时已完成的单元直接从结果文件读取
+    rerun = subprocess.run(command, cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert rerun.returncode == 0, rerun.stderr
+    assert 'skipping' in rerun.stdout
+
+
+def test_replicate_sweep_leaves_no_user_databases_behind(tmp_path):
+    command = [sys.executable, '-c', 'import sys, main; main.main(sys.argv[1:])', '--headless', '--replicate',
+               '--users', '20', '--requests-per-user', '2', '--cache-strategies', 'COMPACT_LRU', 'COMPACT_FIFO',
+               '--schedulers', 'nearest', '--min-servers', '6', '--max-servers', '6', '--seeds', '1', '2',
+               '--min-replications', '2', '--max-replications', '2', '--output-dir', str(tmp_path / 'results')]
+    env = {**os.environ, 'PYTHONPATH': ROOT}
+    result = subprocess.run(command, cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert 'replications: 2' in result.stdout
+    assert not list(tmp_path.glob('user_data_*.db'))
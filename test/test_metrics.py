@@ -0,0 +1,47 @@
+import urllib.request
+
+from server.metrics import MetricsExporter
+from server.server_initialization import initialize_servers
+from server.user_simulation import UserSimulation
+
+
+def make_simulation(tmp_path, metrics):
+    main_server, servers = initialize_servers(str(tmp_path), 2, [(100, 0), (0, 100)], (0, 0), cache_size=5,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    simulation = UserSimulation(servers, [f'fixed_file_{i}.txt' for i in range(1, 101)], None, request_interval=0.5,
+                                scheduler='round_robin', metrics=metrics)
+    return simulation
+
+
+def test_publish_is_rate_limited_and_histogram_is_cumulative(tmp_path):
+    metrics = MetricsExporter(path=str(tmp_path / 'cdn.prom'), interval=3600, buckets=(0.1, 1.0))
+    simulation = make_simulation(tmp_path, metrics)
+    simulation.request_counts_by_server = {0: 3, 1: 1}
+    simulation.hit_counts_by_server = [2, 0]
+    simulation.total_hits = 2
+    metrics.start_cell({'cache_strategy': 'COMPACT_LRU'})
+
+    metrics.maybe_publish(simulation, [0.05])
+    assert metrics.publish_count == 0  # 距上次发布不足 interval
+
+    metrics.publish(simulation, [0.05, 0.5])
+    metrics.end_cell(simulation, [0.05, 0.5, 1.0, 4.0])
+    text = (tmp_path / 'cdn.prom').read_text()
+    assert 'cdn_server_misses_total{cache_strategy="COMPACT_LRU",server="1"} 1' in text
+    assert 'cdn_response_time_seconds_bucket{cache_strategy="COMPACT_LRU",le="0.1"} 1' in text
+    assert 'cdn_response_time_seconds_bucket{cache_strategy="COMPACT_LRU",le="1"} 3' in text
+    assert 'cdn_response_time_seconds_bucket{cache_strategy="COMPACT_LRU",le="+Inf"} 4' in text
+    assert 'cdn_response_time_seconds_count{cache_strategy="COMPACT_LRU"} 4' in text
+    assert 'cdn_cells_completed_total{cache_strategy="COMPACT_LRU"} 1' in text
+
+
+def test_http_endpoint_serves_latest_text(tmp_path):
+    metrics = MetricsExporter(port=0)
+    try:
+        simulation = make_simulation(tmp_path, metrics)
+        metrics.publish(simulation, [0.2])
+        with urllib.request.urlopen(f'http://127.0.0.1:{metrics.port}/metrics') as response:
+            body = response.read().decode()
+        assert body == metrics.text and 'cdn_requests_total 1' in body
+    finally:
+        metrics.close()
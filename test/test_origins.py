@@ -0,0 +1,63 @@
+from server.results_store import build_cell_record
+from server.server import RequestTrace
+from server.server_initialization import attach_origins, attach_regions, initialize_servers
+from server.user_simulation import UserSimulation
+
+ORIGINS = [(0, 0), (-400, -400), (400, 400)]
+
+
+def build(tmp_path, replicas=1, regions=None):
+    data_dir = str(tmp_path / 'data')
+    tmp_path.joinpath('data').mkdir()
+    positions = [(-350, -350), (350, 350), (20, 0)]
+    main_server, servers = initialize_servers(data_dir, 3, positions, main_server_position=(0, 0), cache_size=5,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    if regions:
+        attach_regions(data_dir, servers, main_server, regions)
+    origins = attach_origins(data_dir, servers, main_server, ORIGINS, replicas=replicas)
+    return main_server, servers, origins
+
+
+def test_catalog_is_sharded_and_misses_go_to_the_holding_origin(tmp_path):
+    main_server, servers, origins = build(tmp_path)
+    assert origins[0] is main_server and [origin.tier for origin in origins] == ['origin'] * 3
+    held = [set(origin.cache_strategy.files) for origin in origins]
+    assert set.union(*held) == set(main_server.catalog) and sum(len(files) for files in held) == 100
+    assert len(main_server.catalog) == 100 and origins[1].catalog.keys() == held[1]
+
+    # fixed_file_1 在主源站，fixed_file_2 在 (-400, -400)，fixed_file_3 在 (400, 400)
+    for filename, origin in (('fixed_file_1.txt', origins[0]), ('fixed_file_2.txt', origins[1]),
+                             ('fixed_file_3.txt', origins[2])):
+        trace = RequestTrace()
+        _, found, cached = servers[0].process_request(filename, trace)
+        assert found and not cached and trace.hops == [servers[0], origin]
+
+
+def test_full_replication_uses_nearest_origin(tmp_path):
+    main_server, servers, origins = build(tmp_path, replicas=3)
+    assert all(len(origin.cache_strategy.files) == 100 for origin in origins)
+    for server, origin in zip(servers, (origins[1], origins[2], origins[0])):
+        assert set(server.origin_routes.values()) == {origin}
+
+
+def test_regions_route_to_origins(tmp_path):
+    main_server, servers, origins = build(tmp_path, regions=[{'position': (300, 300), 'cache_strategy': 'LRU'}])
+    region = main_server.region_servers[0]
+    assert servers[0].origin_routes == {} and region.origin_routes['fixed_file_2.txt'] is origins[1]
+    trace = RequestTrace()
+    servers[0].process_request('fixed_file_2.txt', trace)
+    assert trace.hops == [servers[0], region, origins[1]]
+
+
+def test_per_origin_accounting(tmp_path):
+    main_server, servers, origins = build(tmp_path)
+    files = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+    user_requests = {'user_1': files[:6]}
+    simulation = UserSimulation(servers, files, None, request_interval=0.5, scheduler='nearest',
+                                user_requests=user_requests, user_positions={'user_1': (-350, -340)})
+    simulation.simulate_requests(6)
+    record = build_cell_record(simulation, servers, 0.0, origins)
+    assert record['origin_request_counts'] == [2, 2, 2]
+    near, main, far = (record['origin_avg_latency_s'][i] for i in (1, 0, 2))
+    assert near < main < far
+    assert sum(record['origin_request_counts']) == record['tier_requests']['origin']
@@ -0,0 +1,53 @@
+from modules.bloom_filter import BloomFilter
+from server.server import RequestTrace
+from server.server_initialization import attach_peers, initialize_servers
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter.from_keys((f'file_{i}' for i in range(1000)), fp_rate=0.01)
+    assert all(f'file_{i}' in bloom for i in range(1000))
+    false_positives = sum(f'other_{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_miss_is_served_by_peer_whose_digest_holds_the_file(tmp_path):
+    data_dir = str(tmp_path)
+    main_server, servers = initialize_servers(data_dir, 3, [(100, 100), (150, 100), (900, 900)], (0, 0), cache_size=5,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    servers[1].add_file('fixed_file_7.txt')
+    attach_peers(servers, radius=200, digest_interval=1000)
+    assert servers[0].peers == [servers[1]] and servers[2].peers == []
+
+    trace = RequestTrace()
+    _, found, cached = servers[0].process_request('fixed_file_7.txt', trace)
+    assert found and not cached
+    assert trace.peer is servers[1] and main_server not in trace.hops
+    assert servers[0].peer_hits == 1 and servers[1].peer_served == 1
+
+    # 摘要过期：对等节点已删除文件，探测记为误报后回源
+    servers[1].remove_file('fixed_file_7.txt')
+    servers[0].remove_file('fixed_file_7.txt')
+    trace = RequestTrace()
+    servers[0].process_request('fixed_file_7.txt', trace)
+    assert trace.wasted_probes == [servers[1]] and trace.hops[-1] is main_server
+    assert servers[0].peer_false_positives == 1
+    assert servers[0].digest_bytes_sent == servers[0].digest.size_bytes()
+
+
+def serve_from_peer(data_dir, cache_strategy_class):
+    """两台相邻的边缘节点，第二台缓存了文件并通过摘要把它提供给第一台；返回第二台的缓存策略"""
+    _, servers = initialize_servers(data_dir, 2, [(100, 100), (150, 100)], (0, 0), cache_size=5,
+                                    cache_strategy_class=cache_strategy_class, top_n_files=[])
+    servers[1].add_file('fixed_file_7.txt')
+    attach_peers(servers, radius=200, digest_interval=1000)
+    assert servers[0].process_request('fixed_file_7.txt', RequestTrace())[1]
+    assert servers[1].peer_served == 1
+    return servers[1].cache_strategy
+
+
+def test_serving_a_peer_leaves_its_policy_state_unchanged(tmp_path):
+    (tmp_path / 'lfu').mkdir()
+    (tmp_path / 'arc').mkdir()
+    assert serve_from_peer(str(tmp_path / 'lfu'), 'LFU').cache['fixed_file_7.txt'] == 1
+    arc = serve_from_peer(str(tmp_path / 'arc'), 'ARC')
+    assert 'fixed_file_7.txt' in arc.t1 and 'fixed_file_7.txt' not in arc.t2
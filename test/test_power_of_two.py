@@ -0,0 +1,34 @@
+import random
+
+from modules.power_of_two import PowerOfTwoChoicesScheduler
+
+
+class StubServer:
+    def __init__(self, position):
+        self.position = position
+        self.request_count = 0
+
+    def get_position(self):
+        return self.position
+
+    def get_active_connections(self):
+        return 0
+
+
+def test_two_choices_balance_better_than_one():
+    servers = [StubServer((x * 100, y * 100)) for x in range(4) for y in range(4)]
+    positions = [(random.Random(i).uniform(0, 300), random.Random(-i).uniform(0, 300)) for i in range(50)]
+    loads = {}
+    for d in (1, 2):
+        scheduler = PowerOfTwoChoicesScheduler(servers, d=d, latency_bound=10000, rng=random.Random(7))
+        for i in range(8000):
+            scheduler.get_next_server(positions[i % len(positions)])
+        loads[d] = max(scheduler.assigned) - min(scheduler.assigned)
+    assert loads[2] * 5 < loads[1]
+
+
+def test_candidates_respect_latency_bound():
+    servers = [StubServer((0, 0)), StubServer((100, 0)), StubServer((1000, 0))]
+    scheduler = PowerOfTwoChoicesScheduler(servers, latency_bound=150, rng=random.Random(1))
+    chosen = {scheduler.get_next_server((10, 0)) for _ in range(50)}
+    assert chosen == set(servers[:2])
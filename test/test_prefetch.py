@@ -0,0 +1,73 @@
+from server.prefetch import PopularityPrefetcher
+from server.server_initialization import initialize_servers
+
+
+def test_pushes_rising_files_within_budget(tmp_path):
+    main_server, servers = initialize_servers(str(tmp_path), 2, [(100, 100), (-100, -100)], (0, 0), cache_size=3,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    sizes = {name: 1000 for name in main_server.catalog}
+    prefetcher = PopularityPrefetcher(servers, sizes, half_life=10, interval=10, push_budget=2500)
+
+    # 第一个边缘节点反复请求 file_5（命中不计入），第二个节点的请求分散
+    for i in range(9):
+        prefetcher.record(servers[0], 'fixed_file_5.txt', hit=False)
+    prefetcher.record(servers[1], 'fixed_file_6.txt', hit=False)
+
+    assert 'fixed_file_5.txt' in servers[0].cache_strategy.cache_content()
+    assert 'fixed_file_5.txt' not in servers[1].cache_strategy.cache_content()
+    assert prefetcher.push_count == 2 and prefetcher.bytes_pushed == 2000
+
+    prefetcher.record(servers[0], 'fixed_file_5.txt', hit=True)
+    assert prefetcher.useful_pushes == 1
+
+
+def test_decay_prefers_recent_requests(tmp_path):
+    main_server, servers = initialize_servers(str(tmp_path), 1, [(100, 100)], (0, 0), cache_size=1,
+                                              cache_strategy_class='COMPACT_LRU', top_n_files=[])
+    prefetcher = PopularityPrefetcher(servers, main_server.catalog, half_life=5, interval=1000, push_budget=10 ** 9)
+    for _ in range(20):
+        prefetcher.record(servers[0], 'fixed_file_1.txt', hit=False)
+    for _ in range(12):
+        prefetcher.record(servers[0], 'fixed_file_2.txt', hit=False)
+    prefetcher.push()
+    assert servers[0].cache_strategy.cache_content() == ['fixed_file_2.txt']
+
+
+def test_files_evicted_by_a_push_can_be_pushed_again(tmp_path):
+    main_server, servers = initialize_servers(str(tmp_path), 1, [(100, 100)], (0, 0), cache_size=1,
+                                              cache_strategy_class='LRU', top_n_files=[])
+    sizes = {name: 1000 for name in main_server.catalog}
+    prefetcher = PopularityPrefetcher(servers, sizes, half_life=10 ** 6, interval=10 ** 6, push_budget=1000)
+    prefetcher.record(servers[0], 'fixed_file_1.txt', hit=False)
+    prefetcher.push()
+    # 已缓存的文件不重复推送，也不占用预算
+    prefetcher.push()
+    assert prefetcher.push_count == 1
+
+    for _ in range(2):
+        prefetcher.record(servers[0], 'fixed_file_2.txt', hit=False)
+    prefetcher.push()
+    assert servers[0].cache_strategy.cache_content() == ['fixed_file_2.txt']
+    for _ in range(3):
+        prefetcher.record(servers[0], 'fixed_file_1.txt', hit=False)
+    prefetcher.push()
+    assert servers[0].cache_strategy.cache_content() == ['fixed_file_1.txt'] and prefetcher.push_count == 3
+
+
+def test_hottest_files_survive_a_push_with_more_candidates_than_free_slots(tmp_path):
+    main_server, servers = initialize_servers(str(tmp_path), 1, [(100, 100)], (0, 0), cache_size=3,
+                                              cache_strategy_class='LRU', top_n_files=[])
+    server = servers[0]
+    for name in ('fixed_file_1.txt', 'fixed_file_8.txt', 'fixed_file_9.txt'):
+        server.add_file(name)
+    sizes = {name: 1000 for name in main_server.catalog}
+    prefetcher = PopularityPrefetcher(servers, sizes, half_life=10 ** 6, interval=10 ** 6, push_budget=10 ** 9)
+    # file_1 最热且已缓存（在 LRU 的最久未使用端），file_2、file_3 其次，file_4 最冷
+    for name, count in (('fixed_file_1.txt', 4), ('fixed_file_2.txt', 3), ('fixed_file_3.txt', 2),
+                        ('fixed_file_4.txt', 1)):
+        for _ in range(count):
+            prefetcher.record(server, name, hit=False)
+    prefetcher.push()
+    # 已缓存的 file_1 被刷新到最近使用端，新推送的 file_3 先于 file_2 进入，最冷的 file_4 没有位置
+    assert server.cache_strategy.cache_content() == ['fixed_file_1.txt', 'fixed_file_3.txt', 'fixed_file_2.txt']
+    assert prefetcher.push_count == 2
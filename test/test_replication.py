@@ -0,0 +1,35 @@
+import random
+
+from server.replication import run_replications, t_quantile
+from server.rng import RandomStreams
+from server.user_initialization import generate_user_requests_zipf
+
+
+def test_t_quantile_matches_table():
+    for df, expected in [(1, 12.706), (2, 4.303), (4, 2.776), (10, 2.228), (30, 2.042)]:
+        assert abs(t_quantile(0.975, df) - expected) < 5e-3
+
+
+def test_streams_are_reproducible_and_independent():
+    files = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+    first = generate_user_requests_zipf(files, 50, 5, 1.0, rng=RandomStreams(7).numpy('user_requests'))
+    second = generate_user_requests_zipf(files, 50, 5, 1.0, rng=RandomStreams(7).numpy('user_requests'))
+    assert first == second
+    streams = RandomStreams(7)
+    assert streams.python('cache', 0).random() != streams.python('cache', 1).random()
+
+
+def test_common_random_numbers_stop_early():
+    def run_cell(strategy, seed):
+        # 种子带来的噪声远大于策略差异，但两者在同一种子下相互抵消
+        noise = random.Random(seed).gauss(0, 50)
+        return 400 + noise + {'LRU': 0.0, 'ARC': -20.0}[strategy] + random.Random(seed * 31 + len(strategy)).gauss(0, 0.5)
+
+    summary = run_replications(run_cell, ['LRU', 'ARC'], min_replications=3, max_replications=30,
+                               relative_precision=0.05)
+    assert summary['converged']
+    assert summary['replications'] < 10
+    mean, half_width = summary['differences']['ARC']
+    assert abs(mean + 20) < half_width + 1
+    # 不配对时每个策略自身均值的置信区间仍然很宽
+    assert summary['means']['LRU'][1] > half_width * 10
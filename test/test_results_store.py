@@ -0,0 +1,25 @@
+from server.results_store import ResultsStore, load_results
+
+KEY = {'layout': 'grid', 'cache_strategy': 'LRU', 'scheduler': 'nearest', 'num_servers': 6, 'seed': None,
+       'num_users': 100, 'num_requests_per_user': 5, 'max_files_per_server': 20}
+
+
+def test_append_skip_and_load(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    with ResultsStore(path) as store:
+        assert not store.has_cell(KEY)
+        store.append({**KEY, 'mean_response_ms': 412.5, 'server_request_counts': [3, 4, 5]})
+        assert store.has_cell(KEY)
+        assert not store.has_cell({**KEY, 'seed': 1})
+        # 新指标会自动加列
+        store.append({**KEY, 'num_servers': 7, 'mean_response_ms': 400.0, 'p99_ms': 980.0})
+
+    with ResultsStore(path) as store:
+        cell = store.get_cell(KEY)
+        assert cell['mean_response_ms'] == 412.5
+        assert cell['server_request_counts'] == [3, 4, 5]
+        assert cell['p99_ms'] is None
+
+    frame = load_results(path)
+    assert list(frame['num_servers']) == [6, 7]
+    assert frame.loc[0, 'server_request_counts'] == [3, 4, 5]
@@ -0,0 +1,64 @@
+import pytest
+
+from server.rng import RandomStreams
+from server.server_initialization import initialize_servers
+from server.snapshot import load_snapshot, save_snapshot
+from server.user_simulation import UserSimulation
+
+POSITIONS = [(-200, 0), (0, 0), (200, 0)]
+USERS = {f'user_{i + 1}': (i * 37 % 400 - 200, i * 53 % 300 - 150) for i in range(40)}
+FILES = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+
+
+def build(data_dir, cache_strategy, positions=POSITIONS):
+    data_dir.mkdir()
+    main_server, servers = initialize_servers(str(data_dir), len(positions), positions, (0, 0), cache_size=6,
+                                              cache_strategy_class=cache_strategy, top_n_files=[],
+                                              streams=RandomStreams(5))
+    return main_server, servers
+
+
+def simulation(servers, seed, requests_per_user):
+    streams = RandomStreams(seed)
+    rng = streams.numpy('user_requests')
+    user_requests = {user: [FILES[int(i)] for i in rng.zipf(1.3, requests_per_user) % 100] for user in USERS}
+    return UserSimulation(servers, FILES, None, request_interval=0.5, scheduler='power_of_two',
+                          user_requests=user_requests, rng=streams.python('scheduler'), arrival_rate=50,
+                          user_positions=USERS)
+
+
+@pytest.mark.parametrize('cache_strategy', ['RR', 'COMPACT_ARC', 'FIFO'])
+def test_fork_from_snapshot_replays_identically(tmp_path, cache_strategy):
+    main_server, servers = build(tmp_path / 'a', cache_strategy)
+    warm = simulation(servers, seed=1, requests_per_user=5)
+    warm.simulate_requests(5)
+    path = tmp_path / 'warm.snap'
+    assert save_snapshot(str(path), main_server, servers, warm) > 0
+
+    # 原集群直接继续测量
+    measure = simulation(servers, seed=2, requests_per_user=5)
+    load_snapshot(str(path), main_server, servers, warm)
+    measure.scheduler, measure.start_time = warm.scheduler, warm.start_time
+    measure.simulate_requests(5)
+
+    # 新建的相同拓扑从快照恢复后得到完全相同的结果
+    fork_main, fork_servers = build(tmp_path / 'b', cache_strategy)
+    fork_warm = simulation(fork_servers, seed=1, requests_per_user=5)
+    load_snapshot(str(path), fork_main, fork_servers, fork_warm)
+    assert [s.get_total_files() for s in fork_servers] == [len(s.cache_strategy.cache_content()) for s in servers]
+    fork = simulation(fork_servers, seed=2, requests_per_user=5)
+    fork.scheduler, fork.start_time = fork_warm.scheduler, fork_warm.start_time
+    fork.simulate_requests(5)
+
+    assert [entry[2] for entry in fork.user_response_times] == [entry[2] for entry in measure.user_response_times]
+    assert fork.hit_counts_by_server == measure.hit_counts_by_server
+    assert [s.request_count for s in fork_servers] == [s.request_count for s in servers]
+
+
+def test_snapshot_refuses_a_different_topology(tmp_path):
+    main_server, servers = build(tmp_path / 'a', 'COMPACT_LRU')
+    path = str(tmp_path / 'warm.snap')
+    save_snapshot(path, main_server, servers)
+    other_main, other_servers = build(tmp_path / 'b', 'COMPACT_LRU', positions=POSITIONS[:2])
+    with pytest.raises(ValueError):
+        load_snapshot(path, other_main, other_servers)
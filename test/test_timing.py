@@ -0,0 +1,40 @@
+import pstats
+import time
+
+from server.timing import PhaseTimer, phase, profile_method
+
+
+def test_nested_phases_are_exclusive():
+    timer = PhaseTimer()
+    with timer.phase('outer'):
+        time.sleep(0.02)
+        with timer.phase('inner'):
+            time.sleep(0.02)
+    with phase(None, 'ignored'):
+        pass
+    assert list(timer.as_dict()) == ['inner', 'outer']
+    assert 0.015 < timer.totals['outer'] < 0.035
+    assert timer.totals['inner'] >= 0.015
+
+    total = PhaseTimer()
+    total.merge(timer)
+    total.merge({'outer': 1.0})
+    assert total.totals['outer'] == timer.totals['outer'] + 1.0
+
+
+def test_profile_method_only_covers_hot_path(tmp_path):
+    class Worker:
+        def hot(self, n):
+            return sum(range(n))
+
+    def cold():
+        return sorted(range(1000))
+
+    worker = Worker()
+    path = tmp_path / 'hot.prof'
+    with profile_method(worker, 'hot', str(path)):
+        assert worker.hot(100) == 4950
+        cold()
+    assert 'hot' not in vars(worker)
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert 'hot' in functions and 'cold' not in functions
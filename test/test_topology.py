@@ -0,0 +1,48 @@
+import os
+import random
+
+import numpy as np
+
+from server.server_initialization import generate_positions
+from server.topology import IncrementalCluster, Topology
+
+
+def brute_force_nearest(users, servers):
+    return [min(range(len(servers)), key=lambda j: ((u[0] - servers[j][0]) ** 2 + (u[1] - servers[j][1]) ** 2) ** 0.5)
+            for u in users]
+
+
+def test_incremental_updates_match_full_recompute():
+    rng = random.Random(1)
+    users = [(rng.uniform(-500, 500), rng.uniform(-500, 500)) for _ in range(300)]
+    topology = Topology(users)
+    for num_servers in [6, 7, 8, 9, 12, 30, 31, 7]:
+        positions = generate_positions(num_servers, 500)
+        changed = topology.update(positions)
+        assert topology.nearest.tolist() == brute_force_nearest(users, positions)
+        assert len(changed) == topology.reassigned_users
+    # 7 -> 8 台时网格列数不变，前 7 台位置不变，只有离第 8 台更近的用户需要改变
+    topology.update(generate_positions(8, 500))
+    assert topology.reused_servers == 7 and topology.recomputed_users == 0
+
+
+def test_cluster_reuses_origin_and_resets_edges(tmp_path):
+    data_dir = str(tmp_path / 'data')
+    users = [(0.0, 0.0), (400.0, 400.0)]
+    cluster = IncrementalCluster(data_dir, 5, users)
+    catalog = dict(cluster.main_server.catalog)
+    main_server, servers = cluster.resize(generate_positions(4, 500), 'FIFO', top_n_files=[])
+    servers[0].process_request('fixed_file_1.txt')
+    assert servers[0].get_total_files() == 1 and main_server.request_count == 1
+
+    main_server, grown = cluster.resize(generate_positions(6, 500), 'FIFO', top_n_files=['fixed_file_2.txt'])
+    assert grown[0] is servers[0] and main_server.catalog == catalog
+    assert grown[0].cache_strategy.cache_content() == ['fixed_file_2.txt']
+    assert main_server.request_count == 0
+
+    _, shrunk = cluster.resize(generate_positions(2, 500), 'COMPACT_LRU', top_n_files=[])
+    assert len(shrunk) == 2 and not os.path.exists(grown[5].db_path)
+    assert cluster.assignment()[(400.0, 400.0)] is shrunk[int(np.argmin(
+        [np.hypot(400 - x, 400 - y) for x, y in generate_positions(2, 500)]))]
+    cluster.close()
+    assert not os.path.exists(data_dir)
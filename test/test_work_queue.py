@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from main import enqueue_sweep
+from server.results_store import load_results
+from server.work_queue import WorkQueue, run_worker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_expired_lease_is_reclaimed_and_late_result_dropped(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    queue = WorkQueue(path, lease_seconds=0.05)
+    assert queue.enqueue([{'cell': 1}, {'cell': 2}, {'cell': 1}]) == 2
+    assert queue.enqueue([{'cell': 2}]) == 0
+
+    task_id, payload = queue.claim('a')
+    assert payload == {'cell': 1}
+    time.sleep(0.1)
+    # worker a 的租约已过期，任务重新分配给 b，a 迟到的结果被丢弃
+    assert queue.claim('b') == (task_id, payload)
+    assert not queue.complete(task_id, 'a', {'mean': 1.0})
+    assert queue.complete(task_id, 'b', {'mean': 2.0})
+    assert queue.results() == [({'cell': 1}, {'mean': 2.0}, 'b')]
+    queue.close()
+
+
+def test_task_that_keeps_losing_its_lease_is_marked_failed(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=0.01, max_attempts=2)
+    queue.enqueue([{'cell': 1}])
+    # 每次领取后 worker 都"崩溃"（不续约也不完成），第二次过期后不再放回队列
+    for worker in ('a', 'b'):
+        assert queue.claim(worker) is not None
+        time.sleep(0.05)
+    assert queue.claim('c') is None
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 0, 'failed': 1}
+    assert queue.unfinished() == 0 and queue.errors() == [({'cell': 1}, 'lease expired')]
+    queue.close()
+
+
+def test_failed_tasks_are_retried_then_marked_failed(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+    queue.enqueue([{'cell': 1}, {'cell': 2}])
+    runs = []
+
+    def run_task(payload):
+        runs.append(payload['cell'])
+        if payload['cell'] == 2:
+            raise RuntimeError('boom')
+        return {'cell': payload['cell']}
+
+    assert run_worker(queue, run_task, 'w', poll_interval=0, max_attempts=2) == 1
+    assert runs == [1, 2, 2]
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 1, 'failed': 1}
+    [(payload, error)] = queue.errors()
+    assert payload == {'cell': 2} and 'boom' in error
+    queue.close()
+
+
+def test_local_workers_drain_the_sweep(tmp_path):
+    queue_path = str(tmp_path / 'queue.sqlite')
+    results_path = str(tmp_path / 'results.sqlite')
+    sweep = dict(num_requests_per_user=2, num_users=20, max_files_per_server=20, cache_strategies=['COMPACT_LRU'],
+                 scheduler_types=['nearest'], server_counts=[6, 7, 8], seeds=[3], output_root=str(tmp_path),
+                 results_path=results_path, options={})
+    driver = threading.Thread(target=enqueue_sweep, args=(queue_path,), kwargs={**sweep, 'poll_interval': 0.2})
+    driver.start()
+    queue = WorkQueue(queue_path)
+    while queue.counts()['pending'] < 3:
+        time.sleep(0.05)
+
+    env = {**os.environ, 'PYTHONPATH': ROOT}
+    workers = []
+    for i in range(2):
+        cwd = tmp_path / f'host_{i}'
+        cwd.mkdir()
+        workers.append(subprocess.Popen(
+            [sys.executable, '-c', 'import sys, main; main.main(sys.argv[1:])', '--queue', queue_path, '--worker'],
+            cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True))
+    for worker in workers:
+        stdout, stderr = worker.communicate(timeout=600)
+        assert worker.returncode == 0, stderr
+    driver.join(timeout=60)
+    assert not driver.is_alive()
+
+    # 每个单元只执行并记录一次
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 3, 'failed': 0}
+    queue.close()
+    assert sorted(load_results(results_path)['num_servers']) == [6, 7, 8]
@@ -0,0 +1,82 @@
+import numpy as np
+
+from server.workload import StreamingWorkload
+
+FILES = [f'fixed_file_{i}.txt' for i in range(1, 101)]
+
+
+def make_users(n=400, seed=0):
+    return np.random.default_rng(seed).uniform(-500, 500, (n, 2))
+
+
+def collect(workload, **kwargs):
+    chunks = list(workload.stream(**kwargs))
+    return tuple(np.concatenate(parts) for parts in zip(*chunks))
+
+
+def test_stream_is_sorted_and_bounded():
+    workload = StreamingWorkload(FILES, make_users(), rate=50, chunk_size=1000, rng=np.random.default_rng(1))
+    times, users, files = collect(workload, num_requests=2500)
+    assert len(times) == 2500 and np.all(np.diff(times) >= 0)
+    assert users.max() < 400 and files.max() < 100
+    # 平均速率约为 rate
+    assert abs(len(times) / times[-1] - 50) < 5
+
+    times, _, _ = collect(StreamingWorkload(FILES, make_users(), rate=50, rng=np.random.default_rng(1)), duration=10)
+    assert times[-1] < 10
+
+
+def test_stream_is_lazy():
+    workload = StreamingWorkload(FILES, make_users(), chunk_size=100, rng=np.random.default_rng(0))
+    first = next(workload.stream(num_requests=10 ** 9))
+    assert len(first[0]) == 100
+
+
+def test_diurnal_rate_peaks_and_troughs():
+    workload = StreamingWorkload(FILES, make_users(), rate=100, diurnal_amplitude=0.8, diurnal_period=100,
+                                 rng=np.random.default_rng(2))
+    times, _, _ = collect(workload, duration=1000)
+    phase = times % 100
+    peak = np.sum((phase < 25) | (phase >= 75))
+    trough = np.sum((phase >= 25) & (phase < 75))
+    assert peak > 2 * trough
+
+
+def test_churn_moves_tail_to_head():
+    workload = StreamingWorkload(FILES, make_users(), rate=1000, zipf_s=1.2, churn_interval=10,
+                                 rng=np.random.default_rng(3))
+    times, _, files = collect(workload, duration=20)
+    first = np.bincount(files[times < 10], minlength=100)
+    second = np.bincount(files[times >= 10], minlength=100)
+    assert first.argmax() == 0 and second.argmax() == 99
+
+
+def test_flash_crowd_targets_region_and_window():
+    users = make_users()
+    event = {'file': 'fixed_file_100.txt', 'start': 5, 'duration': 5, 'rate': 500, 'center': (0, 0), 'radius': 150}
+    workload = StreamingWorkload(FILES, users, rate=100, flash_crowds=[event], chunk_size=256,
+                                 rng=np.random.default_rng(4))
+    times, user_index, files = collect(workload, duration=15)
+    during = (times >= 5) & (times < 10)
+    flash = during & (files == 99)
+    assert flash.sum() > 2000 and (files[~during] == 99).sum() < 20
+    in_region = np.hypot(*users[user_index[flash]].T) <= 150
+    assert in_region.mean() > 0.95
+
+
+def test_simulate_stream(tmp_path):
+    from server.server_initialization import generate_positions, initialize_servers
+    from server.user_simulation import UserSimulation
+
+    users = make_users(50)
+    positions = {f'user_{i + 1}': tuple(position) for i, position in enumerate(users.tolist())}
+    main_server, servers = initialize_servers(str(tmp_path), 4, generate_positions(4, 500), (0, 0), cache_size=10,
+                                              cache_strategy_class='LRU', top_n_files=[])
+    simulation = UserSimulation(servers, FILES, None, request_interval=0.5, scheduler='nearest',
+                                user_positions=positions)
+    workload = StreamingWorkload(FILES, users, rate=20, chunk_size=64, rng=np.random.default_rng(5))
+    total, std = simulation.simulate_stream(workload, num_requests=300)
+    assert simulation.total_requests == 300 and len(simulation.user_response_times) == 300
+    assert total > 0 and 10 < simulation.start_time < 20
+    for server in servers + [main_server]:
+        server.close()